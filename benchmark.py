@@ -0,0 +1,323 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import torch
+
+from src.history import ObservationHistory
+from src.actuators import ServoActuator
+
+
+def _sync(device):
+    if torch.device(device).type == "cuda":
+        torch.cuda.synchronize()
+
+
+def bench_history(args):
+    # memory and per-step cost of the observation history as N grows
+    print(f"{'N':>4} {'MiB':>10} {'push us':>10} {'push+flat us':>14}")
+    frame = torch.randn((args.num_envs, args.frame_dim), device=args.device)
+    for n in args.lengths:
+        history = ObservationHistory(args.num_envs, args.frame_dim, n, device=args.device)
+        for _ in range(10):
+            history.push(frame)
+        _sync(args.device)
+
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            history.push(frame)
+        _sync(args.device)
+        push_us = (time.perf_counter() - start) / args.steps * 1e6
+
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            history.push(frame)
+            history.flat.sum()
+        _sync(args.device)
+        consume_us = (time.perf_counter() - start) / args.steps * 1e6
+
+        print(f"{n:>4} {history.nbytes() / 2**20:>10.2f} {push_us:>10.1f} {consume_us:>14.1f}")
+
+
+def bench_actuator(args):
+    # per-step cost of the batched servo model (run once per sim step, i.e. decimation times per control step)
+    cfg = {"deadband": 0.005, "stall_torque": 2.0, "no_load_speed": 6.5, "torque_constant": 0.8,
+           "current_limit": 2.0, "compile": args.compile}
+    print(f"{'envs':>8} {'us/call':>10}")
+    for num_envs in args.num_envs:
+        actuator = ServoActuator(cfg, num_envs, 12, device=args.device)
+        target, pos, vel = (torch.randn((num_envs, 12), device=args.device) for _ in range(3))
+        kp = torch.full((num_envs, 12), 20.0, device=args.device)
+        kv = torch.full((num_envs, 12), 0.5, device=args.device)
+        strength = torch.ones((num_envs, 12), device=args.device)
+        for _ in range(10):
+            actuator.compute(target, pos, vel, kp, kv, strength)
+        _sync(args.device)
+
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            actuator.compute(target, pos, vel, kp, kv, strength)
+        _sync(args.device)
+        print(f"{num_envs:>8} {(time.perf_counter() - start) / args.steps * 1e6:>10.1f}")
+
+
+def _run_training(name, train_args, nproc=None):
+    # runs train.py in a subprocess and returns the throughput it recorded in metadata.yaml
+    import yaml
+
+    save_dir = f"bench_{name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    if nproc is None:
+        cmd = [sys.executable, "train.py"]
+    else:
+        cmd = [sys.executable, "-m", "torch.distributed.run", "--standalone", f"--nproc_per_node={nproc}", "train.py"]
+    subprocess.run(cmd + train_args + ["--save_dir", save_dir], check=True)
+    with open(f"logs/{save_dir}/metadata.yaml") as f:
+        return yaml.safe_load(f)["throughput"]
+
+
+def bench_scaling(args):
+    # weak scaling of data-parallel training: every rank simulates the same number of envs
+    results = []
+    for nproc in args.ranks:
+        train_args = [
+            args.train_cfg, "--distributed", "--backend", args.backend,
+            "-B", str(args.envs_per_rank * nproc), "--max_iterations", str(args.max_iterations),
+        ]
+        if args.cpu:
+            train_args.append("--cpu")
+        results.append((nproc, _run_training(f"scaling_{nproc}", train_args, nproc=nproc)))
+
+    base = results[0][1]["samples_per_sec"]
+    print(f"{'ranks':>6} {'samples/s':>12} {'speedup':>8} {'efficiency':>11}")
+    for nproc, throughput in results:
+        speedup = throughput["samples_per_sec"] / base
+        print(f"{nproc:>6} {throughput['samples_per_sec']:>12.0f} {speedup:>8.2f} {speedup / nproc * results[0][0]:>11.2f}")
+
+
+def bench_pipeline(args):
+    # iterations/hour of the serial runner vs the pipelined actor/learner runner
+    results = {}
+    for name, extra in [("serial", []), ("pipelined", ["--pipelined"])]:
+        train_args = [args.train_cfg, "-B", str(args.num_envs), "--max_iterations", str(args.max_iterations)] + extra
+        if args.cpu:
+            train_args.append("--cpu")
+        results[name] = _run_training(f"pipeline_{name}", train_args)
+
+    print(f"{'runner':>10} {'iterations/h':>13} {'samples/s':>12}")
+    for name, throughput in results.items():
+        print(f"{name:>10} {throughput['iterations_per_hour']:>13.0f} {throughput['samples_per_sec']:>12.0f}")
+    speedup = results["pipelined"]["iterations_per_hour"] / results["serial"]["iterations_per_hour"]
+    print(f"speedup: {speedup:.2f}x")
+
+
+def bench_distill(args):
+    # wall-clock of online distillation (teacher queried every env step) vs cached teacher labels, same teacher. The
+    # online config is derived from the cached one so both train the same student and only the data path differs
+    import tempfile
+
+    import yaml
+
+    with open(args.cached_cfg) as f:
+        online_cfg = yaml.safe_load(f)
+    online_cfg["runner_class_name"] = "DistillationRunner"
+    online_cfg.pop("cache", None)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        online_path = os.path.join(tmp_dir, "distill_online.yaml")
+        with open(online_path, "w") as f:
+            yaml.safe_dump(online_cfg, f)
+        for name, train_cfg in [("online", online_path), ("cached", args.cached_cfg)]:
+            train_args = [
+                train_cfg, "--resume", args.teacher, "-B", str(args.num_envs),
+                "--max_iterations", str(args.max_iterations),
+            ]
+            if args.cpu:
+                train_args.append("--cpu")
+            results[name] = _run_training(f"distill_{name}", train_args)
+
+    print(f"{'runner':>10} {'iterations/h':>13} {'samples/s':>12}")
+    for name, throughput in results.items():
+        print(f"{name:>10} {throughput['iterations_per_hour']:>13.0f} {throughput['samples_per_sec']:>12.0f}")
+    speedup = results["cached"]["iterations_per_hour"] / results["online"]["iterations_per_hour"]
+    print(f"speedup: {speedup:.2f}x")
+
+
+def bench_startup(args):
+    # wall time of lightweight CLI invocations, against eagerly importing the heavy dependencies
+    commands = {
+        "runs.py show": [sys.executable, "runs.py", "show", args.run_dir],
+        "train.py --help": [sys.executable, "train.py", "--help"],
+        "eval.py --help": [sys.executable, "eval.py", "--help"],
+        "eager imports": [sys.executable, "-c", "import torch, genesis, rsl_rl.runners, pygame"],
+    }
+    print(f"{'command':>16} {'best s':>8} {'mean s':>8}")
+    for name, cmd in commands.items():
+        times = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            print(f"{name:>16} {'failed':>8}")
+            continue
+        print(f"{name:>16} {min(times):>8.3f} {sum(times) / len(times):>8.3f}")
+
+
+def bench_contacts(args):
+    # cost of the foot contact update relative to a whole env step
+    import genesis as gs
+    from env import ServobotEnv
+    from train import get_cfgs
+
+    gs.init(logging_level="warning", **({"backend": gs.cpu} if args.device == "cpu" else {}))
+    env_cfg, obs_cfg, reward_cfg, command_cfg, _ = get_cfgs()
+    env_cfg["foot_contacts"]["enabled"] = True
+    reward_cfg["reward_scales"].update({"feet_air_time": 1.0, "feet_slip": -0.05, "feet_contact_count": -0.05})
+    env = ServobotEnv(args.num_envs, env_cfg, obs_cfg, reward_cfg, command_cfg)
+    env.reset()
+    actions = torch.zeros((args.num_envs, env.num_actions), device=gs.device)
+    for _ in range(10):
+        env.step(actions.normal_(0.0, 0.5))
+    _sync(gs.device)
+
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        env.step(actions.normal_(0.0, 0.5))
+    _sync(gs.device)
+    step_us = (time.perf_counter() - start) / args.steps * 1e6
+
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        env.foot_contacts.update()
+    _sync(gs.device)
+    update_us = (time.perf_counter() - start) / args.steps * 1e6
+
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        for name in ("feet_air_time", "feet_slip", "feet_contact_count"):
+            env.reward_functions[name]()
+    _sync(gs.device)
+    reward_us = (time.perf_counter() - start) / args.steps * 1e6
+
+    print(f"env step:        {step_us:>9.1f} us")
+    print(f"contact update:  {update_us:>9.1f} us ({100 * update_us / step_us:.1f}% of a step)")
+    print(f"contact rewards: {reward_us:>9.1f} us ({100 * reward_us / step_us:.1f}% of a step)")
+    print(f"feet in contact: {env.foot_contacts.num_in_contact().float().mean().item():.2f} on average")
+
+
+def bench_checkpoints(args):
+    # disk usage and load time of a run's model_*.pt files against a checkpoint store holding the same checkpoints
+    import glob
+    import os
+    import tempfile
+
+    from src.checkpoints import CheckpointStore
+
+    paths = sorted(glob.glob(os.path.join(args.run_dir, "model_*.pt")))
+    if not paths:
+        raise FileNotFoundError(f"No model_*.pt in {args.run_dir}")
+    original = sum(os.path.getsize(path) for path in paths)
+    with tempfile.TemporaryDirectory() as root:
+        store = CheckpointStore(root)
+        for path in paths:
+            checkpoint = torch.load(path, map_location="cpu", weights_only=False)
+            key = f"bench/{os.path.basename(path)[:-3]}"
+            store.put(key, checkpoint)
+            store.put_inference_copy(key, checkpoint)
+        sizes = {"full": store.disk_usage()}
+        store.prune_optimizer("bench", 1)
+        store.gc(grace_s=0.0)
+        sizes["optimizer pruned"] = store.disk_usage()
+        for key in store.keys():
+            if not key.endswith(".fp16"):
+                store.delete(key)
+        store.gc(grace_s=0.0)
+        sizes["fp16 only"] = store.disk_usage()
+
+        print(f"{len(paths)} checkpoints, {original / 2**20:.1f} MiB as model_*.pt")
+        for name, size in sizes.items():
+            print(f"  store, {name:<17} {size / 2**20:>8.1f} MiB ({original / size:.1f}x smaller)")
+
+        key = f"bench/{os.path.basename(paths[-1])[:-3]}.fp16"
+        timings = {
+            "torch.load": lambda: torch.load(paths[-1], map_location="cpu", weights_only=False),
+            "store, lazy": lambda: store.get(key),
+            "store, read all": lambda: [t.sum() for t in store.get(key, dtype=torch.float32)["model_state_dict"].values()],
+        }
+        for name, load in timings.items():
+            start = time.perf_counter()
+            for _ in range(args.repeats):
+                load()
+            print(f"  load {name:<15} {(time.perf_counter() - start) / args.repeats * 1e3:>8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    history_parser = subparsers.add_parser("history", help="observation history buffer")
+    history_parser.add_argument("-B", "--num_envs", type=int, default=4096)
+    history_parser.add_argument("--frame_dim", type=int, default=45)
+    history_parser.add_argument("--lengths", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    history_parser.add_argument("--steps", type=int, default=1000)
+    history_parser.set_defaults(func=bench_history)
+
+    actuator_parser = subparsers.add_parser("actuator", help="servo actuator model")
+    actuator_parser.add_argument("-B", "--num_envs", type=int, nargs="+", default=[1024, 4096, 16384])
+    actuator_parser.add_argument("--steps", type=int, default=1000)
+    actuator_parser.add_argument("--compile", action="store_true", help="torch.compile the servo model")
+    actuator_parser.set_defaults(func=bench_actuator)
+
+    scaling_parser = subparsers.add_parser("scaling", help="data-parallel training samples/sec vs number of ranks")
+    scaling_parser.add_argument("train_cfg", type=str, nargs="?", default="config/default.yaml")
+    scaling_parser.add_argument("--ranks", type=int, nargs="+", default=[1, 2, 4])
+    scaling_parser.add_argument("--envs_per_rank", type=int, default=256)
+    scaling_parser.add_argument("--max_iterations", type=int, default=10)
+    scaling_parser.add_argument("--backend", type=str, default="gloo", choices=["gloo", "nccl"])
+    scaling_parser.add_argument("--cpu", action="store_true", help="run every rank on CPU")
+    scaling_parser.set_defaults(func=bench_scaling)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="serial vs pipelined PPO iterations/hour")
+    pipeline_parser.add_argument("train_cfg", type=str, nargs="?", default="config/default.yaml")
+    pipeline_parser.add_argument("-B", "--num_envs", type=int, default=4096)
+    pipeline_parser.add_argument("--max_iterations", type=int, default=50)
+    pipeline_parser.add_argument("--cpu", action="store_true")
+    pipeline_parser.set_defaults(func=bench_pipeline)
+
+    distill_parser = subparsers.add_parser("distill", help="online vs cached-label distillation wall-clock")
+    distill_parser.add_argument("--teacher", type=str, default="saved_models/servobot-energy/model_6800.pt")
+    distill_parser.add_argument(
+        "--cached_cfg", type=str, default="config/distill_cached.yaml",
+        help="cached-label config, the online run uses the same config with DistillationRunner",
+    )
+    distill_parser.add_argument("-B", "--num_envs", type=int, default=4096)
+    distill_parser.add_argument("--max_iterations", type=int, default=50)
+    distill_parser.add_argument("--cpu", action="store_true")
+    distill_parser.set_defaults(func=bench_distill)
+
+    startup_parser = subparsers.add_parser("startup", help="CLI startup time")
+    startup_parser.add_argument("--run_dir", type=str, default="saved_models/servobot-energy")
+    startup_parser.add_argument("--repeats", type=int, default=5)
+    startup_parser.set_defaults(func=bench_startup)
+
+    contacts_parser = subparsers.add_parser("contacts", help="foot contact update and reward cost per env step")
+    contacts_parser.add_argument("-B", "--num_envs", type=int, default=4096)
+    contacts_parser.add_argument("--steps", type=int, default=200)
+    contacts_parser.set_defaults(func=bench_contacts)
+
+    checkpoints_parser = subparsers.add_parser("checkpoints", help="checkpoint store disk usage and load time")
+    checkpoints_parser.add_argument("run_dir", type=str, help="run directory with model_*.pt files")
+    checkpoints_parser.add_argument("--repeats", type=int, default=20)
+    checkpoints_parser.set_defaults(func=bench_checkpoints)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Lets the tests import env, train and src.* the same way the scripts at the repository root do.
@@ -0,0 +1,163 @@
+import argparse
+import os
+import time
+
+import yaml
+
+from src.run_config import RunConfig
+from src.realtime import RealtimeScheduler
+from src.servo_bus import FakeServoBus, ServoBus, open_transport
+
+# Runs a trained policy on the physical servobot, or against a loopback fake servo bus. torch and pygame are
+# imported inside the commands so that --help stays fast; genesis and rsl_rl are never needed on the robot.
+
+
+def _percentiles(values_s):
+    values = sorted(values_s)
+    if not values:
+        return "n/a"
+    p50, p99 = (1e3 * values[min(len(values) - 1, int(q * len(values)))] for q in (0.5, 0.99))
+    return f"p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {1e3 * values[-1]:.2f} ms"
+
+
+def export(args):
+    from src.checkpoints import resolve_checkpoint
+    from src.deployment import export_actor
+
+    train_cfg = RunConfig.load(os.path.dirname(args.ckpt)).train
+    actor = export_actor(resolve_checkpoint(args.ckpt), train_cfg["policy"].get("activation", "elu"))
+    out = args.output or os.path.join(os.path.dirname(args.ckpt), "exported", "policy.pt")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    actor.save(out)
+    print(f"Exported actor to {out}")
+
+
+def run(args):
+    import torch
+
+    from src.checkpoints import resolve_checkpoint
+    from src.deployment import ObservationBuilder, export_actor, make_imu
+
+    # small MLP, a single thread has the lowest and steadiest latency
+    torch.set_num_threads(1)
+    env_cfg, obs_cfg, _, command_cfg, train_cfg = RunConfig.load(os.path.dirname(args.ckpt)).as_tuple()
+    with open(args.hardware_cfg) as f:
+        hw_cfg = yaml.safe_load(f)
+    bus_cfg = hw_cfg["bus"]
+    # before anything touches the bus
+    imu = make_imu(hw_cfg.get("imu"), simulated=args.loopback is not None, allow_static=args.allow_static_imu)
+    if args.loopback is None and hw_cfg["imu"]["type"] == "static":
+        print("WARNING: static IMU on real servos, the policy sees a level and motionless body")
+    if args.policy is not None:
+        policy = torch.jit.load(args.policy, map_location="cpu")
+    else:
+        policy = export_actor(resolve_checkpoint(args.ckpt), train_cfg["policy"].get("activation", "elu"))
+
+    fake = None
+    if args.loopback is not None:
+        fake = FakeServoBus(bus_cfg["ids"], baudrate=bus_cfg["baudrate"], kind=args.loopback).start()
+        transport = fake.client_transport or open_transport(fake.port, bus_cfg["baudrate"], bus_cfg["timeout"])
+        print(f"Loopback servo bus ({args.loopback}{', ' + fake.port if fake.port else ''})")
+    else:
+        transport = open_transport(bus_cfg["port"], bus_cfg["baudrate"], bus_cfg["timeout"])
+    bus = ServoBus(transport, bus_cfg["ids"], bus_cfg.get("directions"), bus_cfg.get("offsets"))
+    builder = ObservationBuilder(env_cfg, obs_cfg, command_cfg)
+    builder.set_command(args.command)
+
+    controller = None
+    if args.teleop != "none":
+        from src.controllers import Controller, ControllerThread
+
+        controller = ControllerThread(Controller(type=args.teleop)).start()
+
+    dt = 0.02  # ServobotEnv.dt, the policy's 50 Hz control rate
+    scheduler = RealtimeScheduler(dt)
+    report_ticks = max(1, int(args.report_every / dt))
+    ramp_ticks = max(1, int(hw_cfg.get("startup_ramp_s", 0.0) / dt))
+    total_ticks = int(args.duration / dt) if args.duration else None
+    read_times, infer_times, tick_latencies = [], [], []
+    start_pose = None
+    default_pose = builder.default_dof_pos.tolist()
+
+    scheduler.start()
+    try:
+        with torch.inference_mode():
+            while total_ticks is None or scheduler.ticks < total_ticks:
+                sample_time = time.perf_counter()
+                dof_pos, dof_vel = bus.read_state()
+                ang_vel, quat = imu.read()
+                read_done = time.perf_counter()
+
+                if scheduler.ticks < ramp_ticks:
+                    # ease into the default pose before handing control to the policy
+                    start_pose = start_pose or dof_pos
+                    alpha = (scheduler.ticks + 1) / ramp_ticks
+                    targets = [p + alpha * (d - p) for p, d in zip(start_pose, default_pose)]
+                    builder.build(ang_vel, quat, dof_pos, dof_vel)
+                else:
+                    if controller is not None:
+                        builder.set_command(controller.latest)
+                    obs = builder.build(ang_vel, quat, dof_pos, dof_vel)
+                    targets = builder.targets(policy(obs))
+                    infer_times.append(time.perf_counter() - read_done)
+                bus.write_positions(targets)
+                read_times.append(read_done - sample_time)
+                tick_latencies.append(time.perf_counter() - sample_time)
+
+                scheduler.wait()
+                if scheduler.ticks % report_ticks == 0:
+                    print(scheduler.report())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if controller is not None:
+            controller.stop()
+        print(scheduler.report())
+        print(f"bus read:          {_percentiles(read_times)}")
+        print(f"policy:            {_percentiles(infer_times)}")
+        print(f"sample -> command: {_percentiles(tick_latencies)} (host side)")
+        if fake is not None:
+            fake.stop()
+            print(f"sample -> command: {_percentiles(fake.latencies)} (measured at the fake bus, wire time included)")
+        bus.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a trained policy on the servobot")
+    subparsers = parser.add_subparsers(dest="subcommand", required=True)
+
+    export_parser = subparsers.add_parser("export", help="export a checkpoint's actor to TorchScript")
+    export_parser.add_argument("ckpt", type=str, help="model_*.pt inside a run directory")
+    export_parser.add_argument("-o", "--output", type=str, default=None, help="default: <run dir>/exported/policy.pt")
+    export_parser.set_defaults(func=export)
+
+    run_parser = subparsers.add_parser("run", help="run the policy at 50 Hz on the servo bus")
+    run_parser.add_argument("ckpt", type=str, help="model_*.pt inside a run directory, its config.yaml is used")
+    run_parser.add_argument("--policy", type=str, default=None, help="TorchScript actor from export (default: ckpt)")
+    run_parser.add_argument("--hardware_cfg", type=str, default="config/hardware.yaml")
+    run_parser.add_argument(
+        "--loopback",
+        type=str,
+        default=None,
+        choices=["socket", "pty"],
+        help="Run against a simulated servo bus instead of the port in the hardware config",
+    )
+    run_parser.add_argument(
+        "--allow-static-imu",
+        action="store_true",
+        help="Accept imu.type static on real servos, only for a robot fixed on a stand",
+    )
+    run_parser.add_argument("-t", "--teleop", type=str, default="none", choices=["none", "keyboard", "xbox", "ps4"])
+    run_parser.add_argument(
+        "--command", type=float, nargs=3, default=[0.0, 0.0, 0.0], help="Fixed command in [-1, 1] without teleop"
+    )
+    run_parser.add_argument("--duration", type=float, default=None, help="Seconds to run (default: until Ctrl-C)")
+    run_parser.add_argument("--report_every", type=float, default=5.0, help="Seconds between loop timing reports")
+    run_parser.set_defaults(func=run)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,13 @@ from rsl_rl.env import VecEnv
 from pathlib import Path
 from tensordict import TensorDict
 
+from src.history import ObservationHistory
+from src.latency import DelayQueue
+from src.actuators import make_actuator
+from src.episode_stats import EpisodeStatistics
+from src.contacts import FootContacts
+from src.gait import GaitTable
+
 
 def gs_rand_float(lower, upper, shape, device):
     return (upper - lower) * torch.rand(size=shape, device=device) + lower
@@ -22,8 +29,14 @@ class ServobotEnv(VecEnv):
         self.device = gs.device
         self.randomize_domain = randomize_domain
 
-        self.simulate_action_latency = True  # there is a 1 step latency on real robot
+        # there is a 1 step latency on real robot, see the "latency" block of env_cfg for per-env delays
+        self.simulate_action_latency = env_cfg.get("simulate_action_latency", True)
         self.dt = 0.02  # control frequency on real robot is 50hz
+        # "pd" uses Genesis's ideal PD, any other actuator model computes torques every sim step and advances its
+        # state once per control step (begin_step)
+        self.actuator_cfg = env_cfg.get("actuator", {"type": "pd"})
+        self.decimation = 1 if self.actuator_cfg["type"] == "pd" else self.actuator_cfg.get("decimation", 1)
+        self.sim_dt = self.dt / self.decimation
         self.max_episode_length = math.ceil(env_cfg["episode_length_s"] / self.dt)
 
         self.env_cfg = env_cfg
@@ -36,7 +49,7 @@ class ServobotEnv(VecEnv):
 
         # create scene
         self.scene = gs.Scene(
-            sim_options=gs.options.SimOptions(dt=self.dt, substeps=2),
+            sim_options=gs.options.SimOptions(dt=self.sim_dt, substeps=2),
             viewer_options=gs.options.ViewerOptions(
                 max_FPS=int(0.5 / self.dt),
                 camera_pos=(2.0, 0.0, 2.5),
@@ -45,7 +58,7 @@ class ServobotEnv(VecEnv):
             ),
             vis_options=gs.options.VisOptions(rendered_envs_idx=list(range(num_viewer_envs))),
             rigid_options=gs.options.RigidOptions(
-                dt=self.dt,
+                dt=self.sim_dt,
                 constraint_solver=gs.constraint_solver.Newton,
                 enable_collision=True,
                 enable_joint_limit=True,
@@ -65,6 +78,8 @@ class ServobotEnv(VecEnv):
         self.base_init_pos = torch.tensor(self.env_cfg["base_init_pos"], device=gs.device)
         self.base_init_quat = torch.tensor(self.env_cfg["base_init_quat"], device=gs.device)
         self.inv_base_init_quat = inv_quat(self.base_init_quat)
+        # broadcast view for the per-step relative orientation, no allocation
+        self.inv_base_init_quats = self.inv_base_init_quat.expand(self.num_envs, 4)
         self.robot = self.scene.add_entity(
             gs.morphs.URDF(
                 file=servobot_path,
@@ -84,11 +99,28 @@ class ServobotEnv(VecEnv):
         self.robot.set_dofs_kv([self.env_cfg["default_kv"]] * self.num_actions, self.motors_dof_idx)
 
         # prepare reward functions and multiply reward scales by dt
+        # episode_sums[name] are rows of one buffer so finished episodes are gathered and cleared in one op
         self.reward_functions, self.episode_sums = dict(), dict()
-        for name in self.reward_scales.keys():
+        self.episode_sums_buf = torch.zeros(
+            (len(self.reward_scales), self.num_envs), device=gs.device, dtype=gs.tc_float
+        )
+        for i, name in enumerate(self.reward_scales.keys()):
             self.reward_scales[name] *= self.dt
             self.reward_functions[name] = getattr(self, "_reward_" + name)
-            self.episode_sums[name] = torch.zeros((self.num_envs,), device=gs.device, dtype=gs.tc_float)
+            self.episode_sums[name] = self.episode_sums_buf[i]
+        stats_cfg = env_cfg.get("episode_stats", {})
+        self.episode_stats = EpisodeStatistics(
+            self.reward_scales.keys(),
+            stats_cfg.get("num_bins", 32),
+            self.max_episode_length,
+            gs.device,
+            ranges=stats_cfg.get("ranges"),
+            calibration_episodes=stats_cfg.get("calibration_episodes", 256),
+            recalibrate_overflow=stats_cfg.get("recalibrate_overflow", 0.05),
+        )
+        # steps actually run in the current episode, less than episode_length_buf when the runner randomized it
+        self.episode_steps = torch.zeros((self.num_envs,), device=gs.device, dtype=gs.tc_int)
+        self.termination_causes = torch.zeros((3, self.num_envs), device=gs.device, dtype=torch.bool)
 
         # initialize buffers
         self.base_lin_vel = torch.zeros((self.num_envs, 3), device=gs.device, dtype=gs.tc_float)
@@ -97,8 +129,14 @@ class ServobotEnv(VecEnv):
         self.global_gravity = torch.tensor([0.0, 0.0, -1.0], device=gs.device, dtype=gs.tc_float).repeat(
             self.num_envs, 1
         )
-        obs_buf_tensor = torch.zeros((self.num_envs, self.num_obs), device=gs.device, dtype=gs.tc_float)
-        self.obs_buf = TensorDict({"policy": obs_buf_tensor}, batch_size=[self.num_envs],device=gs.device)
+        # the policy sees the last history_length frames, flattened oldest first
+        self.history_length = obs_cfg.get("history_length", 1)
+        self.obs_history = ObservationHistory(
+            self.num_envs, self.num_obs, self.history_length, device=gs.device, dtype=gs.tc_float
+        )
+        self.obs_buf = TensorDict(
+            {"policy": self.obs_history.flat.clone()}, batch_size=[self.num_envs], device=gs.device
+        )
         self.rew_buf = torch.zeros((self.num_envs,), device=gs.device, dtype=gs.tc_float)
         self.reset_buf = torch.ones((self.num_envs,), device=gs.device, dtype=gs.tc_int)
         self.episode_length_buf = torch.zeros((self.num_envs,), device=gs.device, dtype=gs.tc_int)
@@ -115,6 +153,7 @@ class ServobotEnv(VecEnv):
         self.last_dof_vel = torch.zeros_like(self.actions)
         self.base_pos = torch.zeros((self.num_envs, 3), device=gs.device, dtype=gs.tc_float)
         self.base_quat = torch.zeros((self.num_envs, 4), device=gs.device, dtype=gs.tc_float)
+        self.base_euler = torch.zeros((self.num_envs, 3), device=gs.device, dtype=gs.tc_float)
         self.default_dof_pos = torch.tensor(
             [self.env_cfg["default_joint_angles"][name] for name in self.env_cfg["joint_names"]],
             device=gs.device,
@@ -135,8 +174,73 @@ class ServobotEnv(VecEnv):
         else:
             self.kp = torch.full((self.num_envs, self.num_actions), self.env_cfg["default_kp"], device=gs.device, dtype=gs.tc_float)
             self.kv = torch.full((self.num_envs, self.num_actions), self.env_cfg["default_kv"], device=gs.device, dtype=gs.tc_float)
+            self.motor_strength = torch.ones((self.num_envs, self.num_actions), device=gs.device, dtype=gs.tc_float)
             print("Domain randomization DISABLED")
         
+        # torques applied to the motors during the last sim step, used by the energy reward
+        self.actuator = make_actuator(self.actuator_cfg, self.num_envs, self.num_actions, gs.device, gs.tc_float)
+        if self.actuator is None:
+            self.torques = torch.zeros((self.num_envs, self.num_actions), device=gs.device, dtype=gs.tc_float)
+        else:
+            self.torques = self.actuator.torques
+
+        # sensor/actuator realism: per-env action and observation delays plus per-env observation noise
+        if self.simulate_action_latency:
+            latency_cfg = self.env_cfg.get("latency", {})
+            self.action_delay_range = latency_cfg.get("action_delay_steps", [1, 1])
+            self.obs_delay_range = latency_cfg.get("obs_delay_steps", [0, 0])
+        else:
+            self.action_delay_range = [0, 0]
+            self.obs_delay_range = [0, 0]
+        self.action_delay = DelayQueue(
+            self.num_envs, self.num_actions, self.action_delay_range[1], device=gs.device, dtype=gs.tc_float
+        )
+        self.exec_actions = self.action_delay.out
+        # sensor frame: ang_vel (3), projected gravity (3), dof_pos (12), dof_vel (12), already scaled
+        self.num_sensor_obs = 6 + 2 * self.num_actions
+        self.sensor_obs = torch.zeros((self.num_envs, self.num_sensor_obs), device=gs.device, dtype=gs.tc_float)
+        self.obs_delay = DelayQueue(
+            self.num_envs, self.num_sensor_obs, self.obs_delay_range[1], device=gs.device, dtype=gs.tc_float
+        )
+        noise_cfg = self.obs_cfg.get("noise", {})
+        self.add_noise = noise_cfg.get("add_noise", False)
+        if self.add_noise:
+            noise_scales = noise_cfg["noise_scales"]
+            self.noise_scale_vec = torch.cat(
+                [
+                    torch.full((3,), noise_scales["ang_vel"] * self.obs_scales["ang_vel"]),
+                    torch.full((3,), noise_scales["gravity"]),
+                    torch.full((self.num_actions,), noise_scales["dof_pos"] * self.obs_scales["dof_pos"]),
+                    torch.full((self.num_actions,), noise_scales["dof_vel"] * self.obs_scales["dof_vel"]),
+                ]
+            ).to(device=gs.device, dtype=gs.tc_float)
+            self.noise_level_range = noise_cfg.get("noise_level_range", [1.0, 1.0])
+            self.noise_level = torch.ones((self.num_envs, 1), device=gs.device, dtype=gs.tc_float)
+            self.noise_buf = torch.zeros_like(self.sensor_obs)
+
+        # foot contact state for the feet_* rewards, one bulk contact force query per control step
+        contacts_cfg = self.env_cfg.get("foot_contacts", {})
+        if contacts_cfg.get("enabled", False):
+            self.foot_contacts = FootContacts(self, contacts_cfg["foot_joint_names"], contacts_cfg["threshold"])
+        else:
+            self.foot_contacts = None
+            if any(name.startswith("feet_") for name in self.reward_scales):
+                raise ValueError("feet_* rewards need env_cfg['foot_contacts']['enabled']")
+
+        # gait phase clock and precomputed trot reference (python -m src.gait) for the gait_tracking reward
+        gait_cfg = self.env_cfg.get("gait", {})
+        self.gait_phase = torch.zeros((self.num_envs,), device=gs.device, dtype=gs.tc_float)
+        self.gait_phase_step = self.dt / gait_cfg.get("period_s", 0.4)
+        self.observe_phase = gait_cfg.get("observe_phase", False)
+        if gait_cfg.get("table_path"):
+            self.gait_table = GaitTable(gait_cfg["table_path"], gs.device)
+            if self.gait_table.joint_names != self.env_cfg["joint_names"]:
+                raise ValueError(f"{gait_cfg['table_path']} was built for joints {self.gait_table.joint_names}")
+        else:
+            self.gait_table = None
+            if "gait_tracking" in self.reward_scales:
+                raise ValueError("The gait_tracking reward needs env_cfg['gait']['table_path']")
+
         # reuse single-element tensor to avoid allocations in loops
         self._single_env_idx = torch.zeros((1,), dtype=torch.long, device=gs.device)
 
@@ -150,26 +254,33 @@ class ServobotEnv(VecEnv):
 
     def step(self, actions, command: tuple[float, float, float] = None):
         self.actions = torch.clip(actions, -self.env_cfg["clip_actions"], self.env_cfg["clip_actions"])
-        exec_actions = self.last_actions if self.simulate_action_latency else self.actions
-        target_dof_pos = exec_actions * self.env_cfg["action_scale"] + self.default_dof_pos
-        self.robot.control_dofs_position(target_dof_pos, self.motors_dof_idx)
-        self.scene.step()
+        self.exec_actions = self.action_delay.push(self.actions)
+        target_dof_pos = self.exec_actions * self.env_cfg["action_scale"] + self.default_dof_pos
+        if self.actuator is None:
+            self.robot.control_dofs_position(target_dof_pos, self.motors_dof_idx)
+            self.scene.step()
+            self.torques[:] = self.robot.get_dofs_control_force(self.motors_dof_idx)
+        else:
+            self.actuator.begin_step()
+            for _ in range(self.decimation):
+                self.actuator.compute(
+                    target_dof_pos,
+                    self.robot.get_dofs_position(self.motors_dof_idx),
+                    self.robot.get_dofs_velocity(self.motors_dof_idx),
+                    self.kp,
+                    self.kv,
+                    self.motor_strength,
+                )
+                self.robot.control_dofs_force(self.torques, self.motors_dof_idx)
+                self.scene.step()
 
         # update buffers
         self.episode_length_buf += 1
-        self.base_pos[:] = self.robot.get_pos()
-        self.base_quat[:] = self.robot.get_quat()
-        self.base_euler = quat_to_xyz(
-            transform_quat_by_quat(torch.ones_like(self.base_quat) * self.inv_base_init_quat, self.base_quat),
-            rpy=True,
-            degrees=True,
-        )
-        inv_base_quat = inv_quat(self.base_quat)
-        self.base_lin_vel[:] = transform_by_quat(self.robot.get_vel(), inv_base_quat)
-        self.base_ang_vel[:] = transform_by_quat(self.robot.get_ang(), inv_base_quat)
-        self.projected_gravity = transform_by_quat(self.global_gravity, inv_base_quat)
-        self.dof_pos[:] = self.robot.get_dofs_position(self.motors_dof_idx)
-        self.dof_vel[:] = self.robot.get_dofs_velocity(self.motors_dof_idx)
+        self.episode_steps += 1
+        self._update_state()
+        if self.foot_contacts is not None:
+            self.foot_contacts.update()
+        self.gait_phase.add_(self.gait_phase_step).remainder_(1.0)
 
         if command:
             # set command to input [-1.0, 1.0], scaled by command ranges
@@ -186,15 +297,31 @@ class ServobotEnv(VecEnv):
             )
             self._resample_commands(envs_idx)
 
-        # check termination and reset
-        self.reset_buf = self.episode_length_buf > self.max_episode_length
-        self.reset_buf |= torch.abs(self.base_euler[:, 1]) > self.env_cfg["termination_if_pitch_greater_than"]
-        self.reset_buf |= torch.abs(self.base_euler[:, 0]) > self.env_cfg["termination_if_roll_greater_than"]
-        time_out_idx = (self.episode_length_buf > self.max_episode_length).nonzero(as_tuple=False).reshape((-1,))
-        self.extras["time_outs"] = torch.zeros_like(self.reset_buf, device=gs.device, dtype=gs.tc_float)
-        self.extras["time_outs"][time_out_idx] = 1.0
-
-        self.reset_idx(self.reset_buf.nonzero(as_tuple=False).reshape((-1,)))
+        # check termination and reset, causes in the order of episode_stats.TERMINATION_CAUSES
+        torch.gt(self.episode_length_buf, self.max_episode_length, out=self.termination_causes[0])
+        torch.gt(
+            torch.abs(self.base_euler[:, 1]),
+            self.env_cfg["termination_if_pitch_greater_than"],
+            out=self.termination_causes[1],
+        )
+        torch.gt(
+            torch.abs(self.base_euler[:, 0]),
+            self.env_cfg["termination_if_roll_greater_than"],
+            out=self.termination_causes[2],
+        )
+        self.reset_buf = self.termination_causes.any(dim=0)
+        self.extras["time_outs"] = self.termination_causes[0].to(gs.tc_float)
+
+        envs_idx = self.reset_buf.nonzero(as_tuple=False).reshape((-1,))
+        if len(envs_idx) > 0:
+            # per-episode mean reward per second of each term, as the old extras["episode"] reported it
+            self.episode_stats.record(
+                self.episode_sums_buf[:, envs_idx] / self.env_cfg["episode_length_s"],
+                self.episode_length_buf[envs_idx],
+                self.termination_causes[:, envs_idx].T,
+                full=self.episode_steps[envs_idx] == self.episode_length_buf[envs_idx],
+            )
+        self.reset_idx(envs_idx)
 
         # compute reward
         self.rew_buf[:] = 0.0
@@ -203,19 +330,32 @@ class ServobotEnv(VecEnv):
             self.rew_buf += rew
             self.episode_sums[name] += rew
 
-        # compute observations
-        obs_buf_tensor = torch.cat(
-            [
-                self.base_ang_vel * self.obs_scales["ang_vel"],  # 3
-                self.projected_gravity,  # 3
-                self.commands * self.commands_scale,  # 3
-                (self.dof_pos - self.default_dof_pos) * self.obs_scales["dof_pos"],  # 12
-                self.dof_vel * self.obs_scales["dof_vel"],  # 12
-                self.actions,  # 12
-            ],
-            axis=-1,
+        # compute observations, only the sensor readings are noisy and delayed
+        torch.mul(self.base_ang_vel, self.obs_scales["ang_vel"], out=self.sensor_obs[:, 0:3])
+        self.sensor_obs[:, 3:6] = self.projected_gravity
+        torch.sub(self.dof_pos, self.default_dof_pos, out=self.sensor_obs[:, 6:6 + self.num_actions])
+        self.sensor_obs[:, 6:6 + self.num_actions] *= self.obs_scales["dof_pos"]
+        torch.mul(self.dof_vel, self.obs_scales["dof_vel"], out=self.sensor_obs[:, 6 + self.num_actions:])
+        if self.add_noise:
+            self.noise_buf.uniform_(-1.0, 1.0).mul_(self.noise_scale_vec).mul_(self.noise_level)
+            self.sensor_obs += self.noise_buf
+        sensor_obs = self.obs_delay.push(self.sensor_obs)
+        obs_terms = [
+            sensor_obs[:, 0:6],  # ang_vel 3, projected gravity 3
+            self.commands * self.commands_scale,  # 3
+            sensor_obs[:, 6:],  # dof_pos 12, dof_vel 12
+            self.actions,  # 12
+        ]
+        if self.observe_phase:
+            angle = 2 * math.pi * self.gait_phase.unsqueeze(1)
+            obs_terms += [torch.sin(angle), torch.cos(angle)]  # 2, num_obs has to include them
+        obs_buf_tensor = torch.cat(obs_terms, axis=-1)
+        self.obs_history.push(obs_buf_tensor)
+        # flat is a view into the ring buffer that the next push overwrites, while rsl_rl keeps the returned
+        # observations until after the next step (PPO stores them with the action taken from them), so copy it
+        self.obs_buf = TensorDict(
+            {"policy": self.obs_history.flat.clone()}, batch_size=[self.num_envs], device=gs.device
         )
-        self.obs_buf = TensorDict({"policy": obs_buf_tensor}, batch_size=[self.num_envs],device=gs.device)
 
         self.last_actions[:] = self.actions[:]
         self.last_dof_vel[:] = self.dof_vel[:]
@@ -224,6 +364,21 @@ class ServobotEnv(VecEnv):
 
         return self.obs_buf, self.rew_buf, self.reset_buf, self.extras
 
+    def _update_state(self):
+        self.base_pos[:] = self.robot.get_pos()
+        self.base_quat[:] = self.robot.get_quat()
+        self.base_euler[:] = quat_to_xyz(
+            transform_quat_by_quat(self.inv_base_init_quats, self.base_quat),
+            rpy=True,
+            degrees=True,
+        )
+        inv_base_quat = inv_quat(self.base_quat)
+        self.base_lin_vel[:] = transform_by_quat(self.robot.get_vel(), inv_base_quat)
+        self.base_ang_vel[:] = transform_by_quat(self.robot.get_ang(), inv_base_quat)
+        self.projected_gravity[:] = transform_by_quat(self.global_gravity, inv_base_quat)
+        self.dof_pos[:] = self.robot.get_dofs_position(self.motors_dof_idx)
+        self.dof_vel[:] = self.robot.get_dofs_velocity(self.motors_dof_idx)
+
     def get_observations(self):
         self.extras["observations"]["critic"] = self.obs_buf
         return self.obs_buf
@@ -294,10 +449,12 @@ class ServobotEnv(VecEnv):
         # apply all our awesome randomized domain values to the simulation
         # kp and kv stuff
         # Make kp a 2d array for each env and each motor
-        for env in envs_idx.cpu().tolist():
-            self._single_env_idx[0] = int(env)
-            self.robot.set_dofs_kp(self.kp[env].contiguous(), self.motors_dof_idx, self._single_env_idx)
-            self.robot.set_dofs_kv(self.kv[env].contiguous(), self.motors_dof_idx, self._single_env_idx)
+        # (actuator models read self.kp/self.kv/self.motor_strength directly, so only ideal PD needs this)
+        if self.actuator is None:
+            for env in envs_idx.cpu().tolist():
+                self._single_env_idx[0] = int(env)
+                self.robot.set_dofs_kp(self.kp[env].contiguous(), self.motors_dof_idx, self._single_env_idx)
+                self.robot.set_dofs_kv(self.kv[env].contiguous(), self.motors_dof_idx, self._single_env_idx)
         # friction on the feet
 
         # payload mass and position
@@ -332,16 +489,24 @@ class ServobotEnv(VecEnv):
         # reset buffers
         self.last_actions[envs_idx] = 0.0
         self.last_dof_vel[envs_idx] = 0.0
+        self.obs_history.reset(envs_idx)
+        if self.actuator is not None:
+            self.actuator.reset(envs_idx)
+        if self.foot_contacts is not None:
+            self.foot_contacts.reset(envs_idx)
+        self.action_delay.reset(envs_idx)
+        self.obs_delay.reset(envs_idx)
+        self.action_delay.resample_delay(envs_idx, self.action_delay_range)
+        self.obs_delay.resample_delay(envs_idx, self.obs_delay_range)
+        if self.add_noise:
+            self.noise_level[envs_idx] = gs_rand_float(*self.noise_level_range, (len(envs_idx), 1), gs.device)
         self.episode_length_buf[envs_idx] = 0
+        self.episode_steps[envs_idx] = 0
+        self.gait_phase[envs_idx] = 0.0
         self.reset_buf[envs_idx] = True
 
-        # fill extras
-        self.extras["episode"] = {}
-        for key in self.episode_sums.keys():
-            self.extras["episode"]["rew_" + key] = (
-                    torch.mean(self.episode_sums[key][envs_idx]).item() / self.env_cfg["episode_length_s"]
-            )
-            self.episode_sums[key][envs_idx] = 0.0
+        # finished episodes were recorded into episode_stats by step()
+        self.episode_sums_buf[:, envs_idx] = 0.0
 
         self._resample_commands(envs_idx)
         if self.randomize_domain:
@@ -382,23 +547,37 @@ class ServobotEnv(VecEnv):
     
     def _reward_energy(self): 
         # Penalize energy consumption (torque * velocity)
-        # For PD control: torque = kp * (target - current) + kv * (0 - vel)
         # This is inspired by this paper: https://arxiv.org/pdf/2111.01674
         # Should help the robot develop more efficient and 'natural' gaits over time
-        
-        # Calculate target positions from actions
-        exec_actions = self.last_actions if self.simulate_action_latency else self.actions
-        target_dof_pos = exec_actions * self.env_cfg["action_scale"] + self.default_dof_pos
-        
-        # Calculate PD torques
-        pos_error = target_dof_pos - self.dof_pos
-        vel_error = -self.dof_vel  # target velocity is 0
-        # These are actually different for each env if domain randomization is on
-        torques = self.kp * pos_error + self.kv * vel_error
+        # self.torques holds what was actually applied, including saturation of the actuator model
         
         # Energy = |torque * velocity|
-        return torch.sum(torch.abs(torques * self.dof_vel), dim=1)
+        return torch.sum(torch.abs(self.torques * self.dof_vel), dim=1)
     
+    def _reward_feet_air_time(self):
+        # Reward swings longer than the target air time, paid out at touchdown and only while asked to move
+        air_time = self.foot_contacts.last_air_time - self.reward_cfg["feet_air_time_target"]
+        reward = torch.sum(air_time * self.foot_contacts.first_contact, dim=1)
+        return reward * (torch.norm(self.commands[:, :2], dim=1) > 0.1)
+
+    def _reward_feet_slip(self):
+        # Penalize horizontal speed of feet that are on the ground
+        slip = torch.sum(torch.square(self.foot_contacts.velocities[..., :2]), dim=2)
+        return torch.sum(slip * self.foot_contacts.contact, dim=1)
+
+    def _reward_feet_contact_count(self):
+        # Penalize the number of feet on the ground differing from the target: all four when standing still,
+        # feet_contact_target (two for a trot) while moving
+        moving = torch.norm(self.commands[:, :2], dim=1) > 0.1
+        target = torch.where(moving, float(self.reward_cfg["feet_contact_target"]), float(self.foot_contacts.num_feet))
+        return torch.abs(self.foot_contacts.num_in_contact() - target)
+
+    def _reward_gait_tracking(self):
+        # Reward joint angles close to the nominal trot for the commanded velocity at the current gait phase
+        reference = self.gait_table.lookup(self.gait_phase, self.commands)
+        error = torch.sum(torch.square(self.dof_pos - reference), dim=1)
+        return torch.exp(-error / self.reward_cfg["gait_tracking_sigma"])
+
     def _reward_survival(self):
         # Small constant reward for survival
         # Scales with target velocity magnitude, which is inspired by https://arxiv.org/pdf/2111.01674 
@@ -1,32 +1,35 @@
 import argparse
 import os
-import pickle
-import torch
-import pygame
 
-from rsl_rl.runners import OnPolicyRunner
+from src.run_config import RunConfig
+from src.realtime import RealtimeScheduler
 
-import genesis as gs
-
-from env import ServobotEnv
-from src.controllers import Controller
+# torch, genesis, rsl_rl and pygame are imported inside main() so that --help stays fast
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--ckpt", type=str, default=None, help="Path to checkpoint to load (default: logs/servobot/model_100.pt)")
     parser.add_argument("-t", "--teleop", type=str, default="none", choices=["keyboard", "xbox", "ps4"])
+    parser.add_argument("--no_realtime", action="store_true", help="Step as fast as possible instead of at env.dt")
+    parser.add_argument("--report_every", type=float, default=5.0, help="Seconds between loop timing reports")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print controller key events")
     args = parser.parse_args()
 
-    
-    gs.init()
-
     ckpt_dir = os.path.dirname(args.ckpt) if args.ckpt else "logs/servobot"
-    
-    env_cfg, obs_cfg, reward_cfg, command_cfg, train_cfg = pickle.load(open(f"{ckpt_dir}/cfgs.pkl", "rb"))
-    if 'obs_groups' not in train_cfg:
-        train_cfg['obs_groups'] = {"policy": ["policy"], "critic": ["policy"]}
+    # config.yaml, or a migrated legacy cfgs.pkl
+    env_cfg, obs_cfg, reward_cfg, command_cfg, train_cfg = RunConfig.load(ckpt_dir).as_tuple()
     reward_cfg["reward_scales"] = {}
+
+    import torch
+    import genesis as gs
+    from rsl_rl.runners import OnPolicyRunner
+
+    from env import ServobotEnv
+    from src.controllers import Controller, ControllerThread
+    from src.checkpoints import is_pointer, load_checkpoint, resolve_checkpoint
+
+    gs.init()
     
     
     env = ServobotEnv(
@@ -42,23 +45,44 @@ def main():
         resume_path = "logs/servobot/model_100.pt"
     else:
         resume_path = args.ckpt
+    resume_path = resolve_checkpoint(resume_path)
     runner = OnPolicyRunner(env, train_cfg, ckpt_dir, device=gs.device)
-    runner.load(resume_path, map_location=gs.device)
+    if is_pointer(resume_path):
+        # memory-mapped from the checkpoint store, only the policy weights are read (the fp16 copy if there is one)
+        runner.alg.policy.load_state_dict(load_checkpoint(resume_path, inference=True)["model_state_dict"])
+    else:
+        runner.load(resume_path, map_location=gs.device)
     policy = runner.get_inference_policy(device=gs.device)
 
+    controller = None
     if args.teleop != "none":
-        controller = Controller(type=args.teleop)
-        controller.initialize()
+        controller = ControllerThread(Controller(type=args.teleop, verbose=args.verbose)).start()
 
+    # hold the real robot's control rate, reading whatever command the controller thread published last
+    scheduler = RealtimeScheduler(env.dt)
+    report_ticks = max(1, int(args.report_every / env.dt))
     obs, _ = env.reset()
-    with torch.no_grad():
-        while True:
-            actions = policy(obs)
-            if args.teleop != "none":
-                command = controller.get_command()
-                obs, rews, dones, infos = env.step(actions, command=command)
-            else:
-                obs, rews, dones, infos = env.step(actions)
+    scheduler.start()
+    try:
+        with torch.no_grad():
+            while True:
+                actions = policy(obs)
+                if controller is not None:
+                    obs, rews, dones, infos = env.step(actions, command=controller.latest)
+                else:
+                    obs, rews, dones, infos = env.step(actions)
+                if args.no_realtime:
+                    continue
+                scheduler.wait()
+                if scheduler.ticks % report_ticks == 0:
+                    print(scheduler.report())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if controller is not None:
+            controller.stop()
+        if not args.no_realtime:
+            print(scheduler.report())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,248 @@
+import argparse
+import glob
+import json
+import os
+import time
+
+import yaml
+
+from src.run_config import RunConfig, CONFIG_FILE
+
+# Lightweight run inspection. Keep heavy imports (torch, genesis, rsl_rl, pygame) out of this file so it starts
+# instantly.
+
+
+def show(args):
+    config = RunConfig.load(args.run_dir)
+    print(f"run:            {args.run_dir}")
+    print(f"schema version: {config.schema_version}")
+    print(f"content hash:   {config.content_hash()}")
+    metadata_path = os.path.join(args.run_dir, "metadata.yaml")
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            for key, value in yaml.safe_load(f).items():
+                print(f"{key + ':':<16}{value}")
+    if args.full:
+        print(json.dumps(config.sections(), indent=2))
+    else:
+        print(f"runner:         {config.train.get('runner_class_name')} / {config.train['policy']['class_name']}")
+        print(f"reward scales:  {config.reward['reward_scales']}")
+
+
+def migrate(args):
+    for run_dir in args.run_dirs:
+        config = RunConfig.load(run_dir)
+        if os.path.exists(os.path.join(run_dir, CONFIG_FILE)) and not args.force:
+            print(f"{run_dir}: already has {CONFIG_FILE}, skipping (use --force to rewrite)")
+            continue
+        content_hash = config.save(run_dir)
+        print(f"{run_dir}: wrote {CONFIG_FILE} (schema {config.schema_version}, hash {content_hash})")
+
+
+def _mib(num_bytes):
+    return f"{num_bytes / 2**20:.1f} MiB"
+
+
+def ckpt_pack(args):
+    # moves a run's model_*.pt files into a checkpoint store and leaves pointers behind
+    from src.checkpoints import CheckpointStore, POINTER_SUFFIX, run_key, write_pointer
+    import torch
+
+    store = CheckpointStore(args.store)
+    before = store.disk_usage()
+    for run_dir in args.run_dirs:
+        run = run_key(run_dir)
+        paths = sorted(
+            glob.glob(os.path.join(run_dir, "model_*.pt")),
+            key=lambda path: int(os.path.basename(path)[len("model_"):-len(".pt")]),
+        )
+        original = sum(os.path.getsize(path) for path in paths)
+        # older checkpoints are stored without optimizer state right away, rather than pruned afterwards
+        keep_from = len(paths) - args.keep_optimizer if args.keep_optimizer is not None else 0
+        for i, path in enumerate(paths):
+            checkpoint = torch.load(path, map_location="cpu", weights_only=False)
+            key = f"{run}/{os.path.splitext(os.path.basename(path))[0]}"
+            store.put(key, checkpoint, drop_optimizer=i < keep_from)
+            if args.fp16:
+                store.put_inference_copy(key, checkpoint)
+            write_pointer(os.path.splitext(path)[0] + POINTER_SUFFIX, store, key)
+            if not args.keep_files:
+                os.remove(path)
+        print(f"{run_dir} -> {run}: {len(paths)} checkpoints ({_mib(original)}), "
+              f"optimizer state dropped from {max(0, keep_from)}")
+    after = store.disk_usage()
+    print(f"store {args.store}: {_mib(before)} -> {_mib(after)}")
+
+
+def ckpt_list(args):
+    from src.checkpoints import CheckpointStore
+
+    store = CheckpointStore(args.store)
+    for key in store.keys(args.prefix):
+        manifest = store.manifest(key)
+        parts = [name for name in manifest["checkpoint"] if name.endswith("state_dict")]
+        print(f"{key:<48} {'fp16' if manifest['half'] else 'fp32'}  {', '.join(parts)}")
+    print(f"{_mib(store.disk_usage())} on disk")
+
+
+def ckpt_prune(args):
+    from src.checkpoints import CheckpointStore
+
+    store = CheckpointStore(args.store)
+    before = store.disk_usage()
+    runs = sorted({os.path.dirname(key) for key in store.keys()}) if not args.runs else args.runs
+    for run in runs:
+        print(f"{run}: optimizer state dropped from {store.prune_optimizer(run, args.keep_optimizer)} checkpoints")
+    removed, _ = store.gc(args.grace)
+    print(f"removed {removed} unreferenced objects, {_mib(before)} -> {_mib(store.disk_usage())}")
+
+
+def ckpt_gc(args):
+    from src.checkpoints import CheckpointStore
+
+    store = CheckpointStore(args.store)
+    removed, freed = store.gc(args.grace)
+    print(f"removed {removed} unreferenced objects ({_mib(freed)}), {_mib(store.disk_usage())} on disk")
+
+
+def _indexed_runs(args, run_dirs):
+    from src.tb_index import RunIndex
+
+    for run_dir in run_dirs:
+        index = RunIndex(run_dir, args.index)
+        if not args.no_update:
+            index.update()
+        yield run_dir, index
+
+
+def tb_index(args):
+    from src.tb_index import RunIndex, find_runs
+
+    start = time.perf_counter()
+    runs = find_runs(args.roots)
+    new = total = 0
+    for run_dir in runs:
+        index = RunIndex(run_dir, args.index)
+        new += index.update()
+        total += index.num_points()
+    elapsed = time.perf_counter() - start
+    print(f"{len(runs)} runs, {new} new of {total} points indexed in {elapsed:.2f} s ({args.index})")
+
+
+def tb_tags(args):
+    for _, index in _indexed_runs(args, [args.run_dir]):
+        for tag in index.tags():
+            print(f"{tag:<48} {index.meta['tags'][tag]['count']:>8} points")
+
+
+def tb_best(args):
+    from src.tb_index import best, find_runs
+
+    results = []
+    for run_dir, index in _indexed_runs(args, find_runs(args.roots)):
+        steps, values = index.series(args.tag)
+        point = best(steps, values, args.min, args.smooth)
+        if point is not None:
+            results.append((run_dir, point[0], point[1], values[-1], steps[-1]))
+    results.sort(key=lambda result: result[2], reverse=not args.min)
+    print(f"{'run':<48} {'best step':>10} {'best':>12} {'last':>12} {'last step':>10}")
+    for run_dir, step, value, last, last_step in results[: args.top]:
+        print(f"{run_dir:<48} {step:>10} {value:>12.4f} {last:>12.4f} {last_step:>10}")
+
+
+def tb_diff(args):
+    from src.tb_index import align
+
+    (_, index_a), (_, index_b) = _indexed_runs(args, [args.run_a, args.run_b])
+    points = align(index_a.series(args.tag), index_b.series(args.tag), args.smooth)
+    if not points:
+        print(f"no common steps for {args.tag}")
+        return
+    stride = max(1, len(points) // args.points)
+    print(f"{args.tag}: b - a over {len(points)} common steps (a = {args.run_a}, b = {args.run_b})")
+    print(f"{'step':>10} {'a':>12} {'b':>12} {'b - a':>12}")
+    for step, a, b in points[::stride] + ([points[-1]] if (len(points) - 1) % stride else []):
+        print(f"{step:>10} {a:>12.4f} {b:>12.4f} {b - a:>12.4f}")
+    diffs = [b - a for _, a, b in points]
+    ahead = sum(diff > 0 for diff in diffs)
+    print(f"mean b - a {sum(diffs) / len(diffs):.4f}, b ahead at {ahead}/{len(diffs)} steps")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and maintain training runs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    show_parser = subparsers.add_parser("show", help="print a run's config and metadata")
+    show_parser.add_argument("run_dir", type=str)
+    show_parser.add_argument("--full", action="store_true", help="print every config section")
+    show_parser.set_defaults(func=show)
+
+    migrate_parser = subparsers.add_parser("migrate", help="write config.yaml for runs that only have cfgs.pkl")
+    migrate_parser.add_argument("run_dirs", type=str, nargs="+")
+    migrate_parser.add_argument("--force", action="store_true")
+    migrate_parser.set_defaults(func=migrate)
+
+    ckpt_parser = subparsers.add_parser("ckpt", help="content-addressed checkpoint store, see src/checkpoints.py")
+    ckpt_subparsers = ckpt_parser.add_subparsers(dest="ckpt_command", required=True)
+
+    pack_parser = ckpt_subparsers.add_parser("pack", help="move runs' model_*.pt into a store, leaving pointers")
+    pack_parser.add_argument("run_dirs", type=str, nargs="+")
+    pack_parser.add_argument("--store", type=str, default="logs/.ckpt_store")
+    pack_parser.add_argument("--fp16", action="store_true", help="also store fp16 inference-only copies")
+    pack_parser.add_argument("--keep_optimizer", type=int, default=None, help="newest checkpoints keeping optimizer")
+    pack_parser.add_argument("--keep_files", action="store_true", help="keep the original model_*.pt")
+    pack_parser.set_defaults(func=ckpt_pack)
+
+    list_parser = ckpt_subparsers.add_parser("ls", help="list stored checkpoints")
+    list_parser.add_argument("--store", type=str, default="logs/.ckpt_store")
+    list_parser.add_argument("--prefix", type=str, default="")
+    list_parser.set_defaults(func=ckpt_list)
+
+    prune_parser = ckpt_subparsers.add_parser("prune", help="drop optimizer state from older checkpoints")
+    prune_parser.add_argument("runs", type=str, nargs="*", help="run keys as listed by ls (default: all)")
+    prune_parser.add_argument("--store", type=str, default="logs/.ckpt_store")
+    prune_parser.add_argument("--keep_optimizer", type=int, default=1)
+    prune_parser.add_argument("--grace", type=float, default=3600.0, help="keep objects younger than this, s")
+    prune_parser.set_defaults(func=ckpt_prune)
+
+    gc_parser = ckpt_subparsers.add_parser("gc", help="delete objects no checkpoint refers to")
+    gc_parser.add_argument("--store", type=str, default="logs/.ckpt_store")
+    gc_parser.add_argument("--grace", type=float, default=3600.0, help="keep objects younger than this, s")
+    gc_parser.set_defaults(func=ckpt_gc)
+
+    tb_parser = subparsers.add_parser("tb", help="index tensorboard event files and compare runs, see src/tb_index.py")
+    tb_subparsers = tb_parser.add_subparsers(dest="tb_command", required=True)
+    tb_common = argparse.ArgumentParser(add_help=False)
+    tb_common.add_argument("--index", type=str, default="logs/.tb_index", help="index directory")
+    tb_common.add_argument("--no_update", action="store_true", help="query the index without reading new events")
+
+    index_parser = tb_subparsers.add_parser("index", parents=[tb_common], help="index new events of every run")
+    index_parser.add_argument("roots", type=str, nargs="+", help="run directories or directories containing runs")
+    index_parser.set_defaults(func=tb_index)
+
+    tags_parser = tb_subparsers.add_parser("tags", parents=[tb_common], help="list a run's scalar tags")
+    tags_parser.add_argument("run_dir", type=str)
+    tags_parser.set_defaults(func=tb_tags)
+
+    best_parser = tb_subparsers.add_parser("best", parents=[tb_common], help="best step of a tag per run")
+    best_parser.add_argument("roots", type=str, nargs="+", help="run directories or directories containing runs")
+    best_parser.add_argument("--tag", type=str, default="Train/mean_reward")
+    best_parser.add_argument("--min", action="store_true", help="lower is better, e.g. for losses")
+    best_parser.add_argument("--smooth", type=int, default=1, help="moving average window in points")
+    best_parser.add_argument("--top", type=int, default=None, help="only print the best N runs")
+    best_parser.set_defaults(func=tb_best)
+
+    diff_parser = tb_subparsers.add_parser("diff", parents=[tb_common], help="compare a tag between two runs")
+    diff_parser.add_argument("run_a", type=str)
+    diff_parser.add_argument("run_b", type=str)
+    diff_parser.add_argument("--tag", type=str, default="Train/mean_reward")
+    diff_parser.add_argument("--smooth", type=int, default=1, help="moving average window in points")
+    diff_parser.add_argument("--points", type=int, default=20, help="number of rows to print")
+    diff_parser.set_defaults(func=tb_diff)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
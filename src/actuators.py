@@ -0,0 +1,195 @@
+import argparse
+
+import torch
+import torch.nn as nn
+
+
+def servo_torques(target_pos, dof_pos, dof_vel, kp, kv, strength,
+                  deadband: float, stall_torque: float, no_load_speed: float, torque_limit: float):
+    """
+    Batched hobby-servo model: PD with a position deadband, a linear torque-speed curve and a current limit.
+
+    All tensor arguments broadcast against (num_envs, num_actions).
+
+    :param target_pos: commanded joint positions
+    :param dof_pos: measured joint positions
+    :param dof_vel: measured joint velocities
+    :param kp: proportional gain
+    :param kv: derivative gain
+    :param strength: per-motor torque scaling, applied before saturation; a weak motor (below 1) also saturates
+        proportionally lower, a strong one never beyond the physical limits
+    :param deadband: position error (rad) below which the servo does not react
+    :param stall_torque: torque at zero speed (N*m)
+    :param no_load_speed: speed at which the available torque reaches zero (rad/s)
+    :param torque_limit: torque allowed by the current limit (N*m)
+    :return: applied joint torques
+    """
+    error = target_pos - dof_pos
+    error = torch.sign(error) * torch.clamp(torch.abs(error) - deadband, min=0.0)
+    torques = (kp * error - kv * dof_vel) * strength
+    # the motor can only push as hard as the back-EMF allows in the direction it is already turning
+    speed_ratio = dof_vel / no_load_speed
+    limit = min(stall_torque, torque_limit) * torch.clamp(torch.as_tensor(strength, dtype=torques.dtype), max=1.0)
+    upper = torch.minimum(torch.clamp(stall_torque * (1.0 - speed_ratio), min=0.0), limit)
+    lower = -torch.minimum(torch.clamp(stall_torque * (1.0 + speed_ratio), min=0.0), limit)
+    return torch.clamp(torques, min=lower, max=upper)
+
+
+class ServoActuator:
+    """
+    Maps target joint positions to torques for all envs with the analytic servo model.
+    """
+
+    def __init__(self, cfg: dict, num_envs: int, num_actions: int, device, dtype=torch.float32):
+        """
+        :param cfg: the "actuator" block of env_cfg
+        :param num_envs: number of parallel environments
+        :param num_actions: number of actuated joints
+        :param device: torch device
+        :param dtype: torque dtype
+        """
+        self.deadband = cfg["deadband"]
+        self.stall_torque = cfg["stall_torque"]
+        self.no_load_speed = cfg["no_load_speed"]
+        self.torque_limit = cfg["torque_constant"] * cfg["current_limit"]
+        self.torques = torch.zeros((num_envs, num_actions), device=device, dtype=dtype)
+        self._model = torch.compile(servo_torques) if cfg.get("compile", False) else servo_torques
+
+    def begin_step(self):
+        pass
+
+    def compute(self, target_pos, dof_pos, dof_vel, kp, kv, strength) -> torch.Tensor:
+        self.torques[:] = self._model(
+            target_pos, dof_pos, dof_vel, kp, kv, strength,
+            self.deadband, self.stall_torque, self.no_load_speed, self.torque_limit,
+        )
+        return self.torques
+
+    def reset(self, envs_idx):
+        self.torques[envs_idx] = 0.0
+
+
+class ActuatorNet(nn.Module):
+    """
+    Small MLP shared by all joints, mapping the last few position errors and velocities of a joint to its torque.
+    """
+
+    def __init__(self, history_length=3, hidden_dims=(32, 32)):
+        super().__init__()
+        self.history_length = history_length
+        layers = []
+        in_dim = 2 * history_length
+        for dim in hidden_dims:
+            layers += [nn.Linear(in_dim, dim), nn.Softsign()]
+            in_dim = dim
+        layers.append(nn.Linear(in_dim, 1))
+        self.mlp = nn.Sequential(*layers)
+
+    def forward(self, x):
+        # x: (..., 2 * history_length) -> (...)
+        return self.mlp(x).squeeze(-1)
+
+
+class LearnedActuator:
+    """
+    Maps target joint positions to torques for all envs with a fitted ActuatorNet, clamped by the current limit.
+
+    fit_actuator_net trains on histories sampled at the control rate, so the history only advances once per control
+    step (``begin_step``); the sim substeps in between only refresh the newest sample.
+    """
+
+    def __init__(self, cfg: dict, num_envs: int, num_actions: int, device, dtype=torch.float32):
+        """
+        :param cfg: the "actuator" block of env_cfg, "network_path" points to a TorchScript ActuatorNet
+        :param num_envs: number of parallel environments
+        :param num_actions: number of actuated joints
+        :param device: torch device
+        :param dtype: torque dtype
+        """
+        self.net = torch.jit.load(cfg["network_path"], map_location=device).eval()
+        self.history_length = self.net.history_length
+        self.torque_limit = cfg["torque_constant"] * cfg["current_limit"]
+        self.torques = torch.zeros((num_envs, num_actions), device=device, dtype=dtype)
+        # per joint: [error_t, error_t-1, ..., vel_t, vel_t-1, ...]
+        self.inputs = torch.zeros((num_envs, num_actions, 2 * self.history_length), device=device, dtype=dtype)
+
+    def begin_step(self):
+        # the newest sample of the previous control step becomes the first older one
+        h = self.history_length
+        self.inputs[..., 1:h] = self.inputs[..., 0:h - 1].clone()
+        self.inputs[..., h + 1:] = self.inputs[..., h:2 * h - 1].clone()
+
+    @torch.no_grad()
+    def compute(self, target_pos, dof_pos, dof_vel, kp, kv, strength) -> torch.Tensor:
+        h = self.history_length
+        self.inputs[..., 0] = target_pos - dof_pos
+        self.inputs[..., h] = dof_vel
+        # strength scales the network's torque before the current limit, as in servo_torques
+        limit = self.torque_limit * torch.clamp(torch.as_tensor(strength, dtype=self.torques.dtype), max=1.0)
+        torques = self.net(self.inputs) * strength
+        self.torques[:] = torch.clamp(torques, min=-limit, max=limit)
+        return self.torques
+
+    def reset(self, envs_idx):
+        self.torques[envs_idx] = 0.0
+        self.inputs[envs_idx] = 0.0
+
+
+def make_actuator(cfg: dict, num_envs: int, num_actions: int, device, dtype=torch.float32):
+    """
+    Builds the actuator model selected by cfg["type"], or returns None for Genesis's ideal PD.
+    """
+    if cfg["type"] == "pd":
+        return None
+    if cfg["type"] == "servo":
+        return ServoActuator(cfg, num_envs, num_actions, device, dtype)
+    if cfg["type"] == "net":
+        return LearnedActuator(cfg, num_envs, num_actions, device, dtype)
+    raise ValueError(f"Unknown actuator type '{cfg['type']}', must be 'pd', 'servo' or 'net'")
+
+
+def fit_actuator_net(data_path, out_path, history_length=3, epochs=200, lr=1e-3, batch_size=4096):
+    """
+    Fits an ActuatorNet on logged servo data and saves it as TorchScript.
+
+    :param data_path: .pt file with float tensors "target_pos", "dof_pos", "dof_vel" and "torque" of shape (T, J),
+        sampled at the control rate
+    :param out_path: where to save the scripted network
+    """
+    data = torch.load(data_path)
+    error = data["target_pos"] - data["dof_pos"]
+    vel = data["dof_vel"]
+    steps, h = error.shape[0], history_length
+    # stack the error and velocity history, newest first, and treat every joint as a sample
+    errors = torch.stack([error[h - 1 - i:steps - i] for i in range(h)], dim=-1)
+    vels = torch.stack([vel[h - 1 - i:steps - i] for i in range(h)], dim=-1)
+    inputs = torch.cat([errors, vels], dim=-1).reshape(-1, 2 * history_length)
+    targets = data["torque"][history_length - 1:].reshape(-1)
+
+    net = ActuatorNet(history_length=history_length)
+    optimizer = torch.optim.Adam(net.parameters(), lr=lr)
+    for epoch in range(epochs):
+        perm = torch.randperm(inputs.shape[0])
+        total = 0.0
+        for start in range(0, inputs.shape[0], batch_size):
+            idx = perm[start:start + batch_size]
+            loss = torch.mean(torch.square(net(inputs[idx]) - targets[idx]))
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(idx)
+        if epoch % 20 == 0 or epoch == epochs - 1:
+            print(f"epoch {epoch}: mse {total / inputs.shape[0]:.6f}")
+
+    torch.jit.script(net).save(out_path)
+    print(f"Saved actuator network to {out_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit an actuator network from logged servo data")
+    parser.add_argument("data", type=str)
+    parser.add_argument("-o", "--out", type=str, default="actuator_net.pt")
+    parser.add_argument("--history_length", type=int, default=3)
+    parser.add_argument("--epochs", type=int, default=200)
+    args = parser.parse_args()
+    fit_actuator_net(args.data, args.out, history_length=args.history_length, epochs=args.epochs)
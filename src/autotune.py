@@ -0,0 +1,164 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import torch
+
+# Each probe builds ServobotEnv in a fresh subprocess: Genesis can only be initialized once per process, and the
+# simulator allocates its memory outside torch's caching allocator, so it is measured as device-wide usage.
+
+GIB = 2 ** 30
+
+
+def _device_used_bytes(cpu: bool) -> int:
+    if cpu or not torch.cuda.is_available():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    free, total = torch.cuda.mem_get_info()
+    return total - free
+
+
+def _device_total_bytes(cpu: bool) -> int:
+    if cpu or not torch.cuda.is_available():
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    return torch.cuda.mem_get_info()[1]
+
+
+def rollout_storage_bytes(num_envs: int, num_steps: int, obs_cfg: dict, env_cfg: dict) -> int:
+    """
+    Size of the PPO rollout storage: policy and critic observations, actions with their mean and std, and the
+    per-sample scalars (reward, done, value, return, advantage, log prob), all float32.
+    """
+    obs = obs_cfg["num_obs"] * obs_cfg.get("history_length", 1)
+    per_sample = 2 * obs + 3 * env_cfg["num_actions"] + 6
+    return num_envs * num_steps * per_sample * 4
+
+
+def probe(num_envs: int, steps: int, cpu: bool) -> dict:
+    """
+    Builds the env with ``num_envs`` envs and steps it with random actions.
+
+    Memory is sampled after every warm-up step and after the timed steps, outside the timed section. On GPU the peak
+    is the larger of the highest sampled device-wide usage (which includes the simulator's own allocations) and
+    torch's max_memory_allocated, both above the usage before Genesis was initialized. On CPU it is the peak resident
+    set size of the process.
+
+    :return: {"num_envs", "steps_per_sec" (env steps, summed over envs), "peak_memory_bytes"}
+    """
+    import genesis as gs
+
+    from env import ServobotEnv
+    from train import get_cfgs
+
+    baseline = _device_used_bytes(cpu)
+    gs.init(logging_level="warning", **({"backend": gs.cpu} if cpu else {}))
+    env_cfg, obs_cfg, reward_cfg, command_cfg, _ = get_cfgs()
+    env = ServobotEnv(num_envs, env_cfg, obs_cfg, reward_cfg, command_cfg)
+    env.reset()
+    actions = torch.zeros((num_envs, env.num_actions), device=gs.device)
+    peak = 0
+    for _ in range(5):
+        env.step(actions.normal_(0.0, 0.5))
+        if gs.device.type == "cuda":
+            torch.cuda.synchronize()
+        peak = max(peak, _device_used_bytes(cpu))
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        env.step(actions.normal_(0.0, 0.5))
+    if gs.device.type == "cuda":
+        torch.cuda.synchronize()
+    elapsed = time.perf_counter() - start
+    peak = max(peak, _device_used_bytes(cpu))
+    if cpu or gs.device.type != "cuda":
+        peak_memory = peak
+    else:
+        peak_memory = max(peak - baseline, torch.cuda.max_memory_allocated())
+    return {
+        "num_envs": num_envs,
+        "steps_per_sec": num_envs * steps / elapsed,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def auto_tune(
+    env_cfg: dict,
+    obs_cfg: dict,
+    candidates,
+    target_batch: int,
+    steps_range=(16, 64),
+    batch_tolerance: float = 0.5,
+    memory_ceiling: float = 0.8,
+    probe_steps: int = 50,
+    cpu: bool = False,
+    timeout: float = 600.0,
+) -> dict:
+    """
+    Probes increasing env counts, each in its own subprocess, and picks the one with the best simulated samples/sec
+    whose memory, including the rollout storage it implies, stays under the ceiling. Probing stops at the first
+    batch size that fails (typically out of memory) or exceeds the ceiling.
+
+    num_steps_per_env is target_batch / num_envs clamped to ``steps_range``, so very small or large env counts give
+    a different PPO batch than the target. Candidates whose batch is off by more than ``batch_tolerance`` (relative)
+    are probed and reported but not picked.
+
+    :param candidates: increasing env counts to try
+    :param target_batch: num_envs * num_steps_per_env to aim for, i.e. samples per PPO update
+    :param steps_range: bounds for num_steps_per_env
+    :param batch_tolerance: largest relative deviation of the resulting batch from target_batch
+    :param memory_ceiling: fraction of the device's (or host's, with ``cpu``) total memory that may be used
+    :return: {"num_envs", "num_steps_per_env", "batch", "samples_per_sec", "peak_memory_gib", "memory_ceiling_gib",
+        "target_batch", "probes": [...]}, with num_envs None if no candidate fit
+    """
+    ceiling = memory_ceiling * _device_total_bytes(cpu)
+    probes, best = [], None
+    for num_envs in candidates:
+        num_steps = int(min(max(round(target_batch / num_envs), steps_range[0]), steps_range[1]))
+        cmd = [sys.executable, "-m", "src.autotune", "--probe", str(num_envs), "--steps", str(probe_steps)]
+        if cpu:
+            cmd.append("--cpu")
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            print(f"auto-tune: {num_envs} envs timed out, stopping")
+            break
+        if result.returncode != 0:
+            print(f"auto-tune: {num_envs} envs failed, stopping ({result.stderr.strip().splitlines()[-1:]})")
+            break
+        measured = json.loads(result.stdout.strip().splitlines()[-1])
+        peak = measured["peak_memory_bytes"] + rollout_storage_bytes(num_envs, num_steps, obs_cfg, env_cfg)
+        batch = num_envs * num_steps
+        reaches_target = abs(batch / target_batch - 1.0) <= batch_tolerance
+        entry = {
+            "num_envs": num_envs,
+            "num_steps_per_env": num_steps,
+            "batch": batch,
+            "samples_per_sec": round(measured["steps_per_sec"], 1),
+            "peak_memory_gib": round(peak / GIB, 3),
+        }
+        probes.append(entry)
+        print(
+            f"auto-tune: {num_envs:>6} envs x {num_steps:>3} steps = {batch:>8} batch | "
+            f"{entry['samples_per_sec']:>10.0f} samples/s | {entry['peak_memory_gib']:.2f} GiB"
+            + ("" if reaches_target else f" | batch too far from {target_batch}, not eligible")
+        )
+        if peak > ceiling:
+            print(f"auto-tune: over the {ceiling / GIB:.2f} GiB ceiling, stopping")
+            break
+        if reaches_target and (best is None or entry["samples_per_sec"] > best["samples_per_sec"]):
+            best = entry
+
+    chosen = best or dict.fromkeys(["num_envs", "num_steps_per_env", "batch", "samples_per_sec", "peak_memory_gib"])
+    return {**chosen, "target_batch": target_batch, "memory_ceiling_gib": round(ceiling / GIB, 3), "probes": probes}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single auto-tune probe, prints its measurements as JSON")
+    parser.add_argument("--probe", type=int, required=True, help="number of envs")
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--cpu", action="store_true")
+    args = parser.parse_args()
+    print(json.dumps(probe(args.probe, args.steps, args.cpu)))
@@ -0,0 +1,331 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import pickle
+import time
+
+import torch
+
+# Content-addressed checkpoint store:
+#   <root>/objects/<aa>/<sha256>     raw bytes of one tensor, shared by every checkpoint that contains it
+#   <root>/manifests/<key>.json      structure of one checkpoint, tensors replaced by object references
+# A run directory refers to a stored checkpoint with a small pointer file, model_<it>.ckpt.json, in place of
+# model_<it>.pt. Keys are "<run name>-<hash of run path>/model_<it>", inference-only fp16 copies get the key suffix
+# ".fp16". Saving never deletes objects, the store is shared by concurrently training runs; unreferenced objects are
+# removed by an explicit gc (runs.py ckpt gc), which leaves recently written ones alone.
+POINTER_SUFFIX = ".ckpt.json"
+HALF_SUFFIX = ".fp16"
+GC_GRACE_S = 3600.0
+
+_DTYPES = {str(dtype): dtype for dtype in (
+    torch.float64, torch.float32, torch.float16, torch.bfloat16,
+    torch.int64, torch.int32, torch.int16, torch.int8, torch.uint8, torch.bool,
+)}
+
+
+class CheckpointStore:
+    """
+    Stores rsl_rl checkpoints with every tensor deduplicated by content hash, and loads them lazily: tensors are
+    memory-mapped from their object files and only paged in when read.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifests_dir = os.path.join(root, "manifests")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _manifest_path(self, key: str) -> str:
+        return os.path.join(self.manifests_dir, key + ".json")
+
+    def _put_tensor(self, tensor: torch.Tensor) -> dict:
+        tensor = tensor.detach().cpu().contiguous()
+        data = tensor.reshape(-1).view(torch.uint8).numpy().tobytes()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return {"__tensor__": digest, "dtype": str(tensor.dtype), "shape": list(tensor.shape)}
+
+    def _encode(self, value, half: bool):
+        if isinstance(value, torch.Tensor):
+            if half and value.is_floating_point():
+                value = value.half()
+            return self._put_tensor(value)
+        if isinstance(value, dict):
+            if all(isinstance(key, str) for key in value):
+                return {key: self._encode(item, half) for key, item in value.items()}
+            return {"__dict__": [[self._encode(key, half), self._encode(item, half)] for key, item in value.items()]}
+        if isinstance(value, tuple):
+            return {"__tuple__": [self._encode(item, half) for item in value]}
+        if isinstance(value, list):
+            return [self._encode(item, half) for item in value]
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return {"__pickle__": base64.b64encode(pickle.dumps(value)).decode()}
+
+    def _decode(self, value, map_location, dtype):
+        if isinstance(value, list):
+            return [self._decode(item, map_location, dtype) for item in value]
+        if not isinstance(value, dict):
+            return value
+        if "__tensor__" in value:
+            stored_dtype = _DTYPES[value["dtype"]]
+            numel = 1
+            for size in value["shape"]:
+                numel *= size
+            if numel == 0:
+                tensor = torch.empty(value["shape"], dtype=stored_dtype)
+            else:
+                # private mapping: pages are read on first access and copied only if written to
+                path = self._object_path(value["__tensor__"])
+                tensor = torch.from_file(path, shared=False, size=numel, dtype=stored_dtype).view(value["shape"])
+            if dtype is not None and tensor.is_floating_point():
+                tensor = tensor.to(dtype)
+            return tensor.to(map_location) if map_location is not None else tensor
+        if "__dict__" in value:
+            return {
+                self._decode(key, map_location, dtype): self._decode(item, map_location, dtype)
+                for key, item in value["__dict__"]
+            }
+        if "__tuple__" in value:
+            return tuple(self._decode(item, map_location, dtype) for item in value["__tuple__"])
+        if "__pickle__" in value:
+            return pickle.loads(base64.b64decode(value["__pickle__"]))
+        return {key: self._decode(item, map_location, dtype) for key, item in value.items()}
+
+    def _write_manifest(self, key: str, manifest: dict):
+        path = self._manifest_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def put(self, key: str, checkpoint: dict, half: bool = False, drop_optimizer: bool = False) -> dict:
+        """
+        :param key: "<run key>/<checkpoint name>", see run_key
+        :param checkpoint: dict as saved by an rsl_rl runner
+        :param half: store floating point tensors as fp16
+        :param drop_optimizer: leave out the optimizer state
+        :return: the manifest
+        """
+        if drop_optimizer:
+            checkpoint = {k: v for k, v in checkpoint.items() if "optimizer" not in k}
+        manifest = {
+            "key": key,
+            "created": time.time(),
+            "half": half,
+            "checkpoint": self._encode(checkpoint, half),
+        }
+        self._write_manifest(key, manifest)
+        return manifest
+
+    def put_inference_copy(self, key: str, checkpoint: dict) -> dict:
+        """
+        Stores the policy weights alone in fp16 under ``key + ".fp16"``.
+        """
+        return self.put(key + HALF_SUFFIX, {"model_state_dict": checkpoint["model_state_dict"]}, half=True)
+
+    def has(self, key: str) -> bool:
+        return os.path.exists(self._manifest_path(key))
+
+    def manifest(self, key: str) -> dict:
+        with open(self._manifest_path(key)) as f:
+            return json.load(f)
+
+    def get(self, key: str, map_location=None, dtype=None) -> dict:
+        """
+        :param map_location: device to move tensors to, None keeps them memory-mapped on CPU
+        :param dtype: floating point dtype to cast to, e.g. torch.float32 for fp16 copies
+        """
+        return self._decode(self.manifest(key)["checkpoint"], map_location, dtype)
+
+    def keys(self, prefix: str = "") -> list:
+        keys = []
+        for directory, _, files in os.walk(self.manifests_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    key = os.path.relpath(os.path.join(directory, name), self.manifests_dir)[: -len(".json")]
+                    if key.startswith(prefix):
+                        keys.append(key)
+        return sorted(keys, key=lambda k: (os.path.dirname(k), _iteration(k), k))
+
+    def prune_optimizer(self, run: str, keep_last: int) -> int:
+        """
+        Drops the optimizer state from all but the newest ``keep_last`` full checkpoints of a run.
+
+        :return: number of checkpoints pruned
+        """
+        full = [key for key in self.keys(run + "/") if not key.endswith(HALF_SUFFIX)]
+        pruned = 0
+        for key in full[: max(0, len(full) - keep_last)]:
+            manifest = self.manifest(key)
+            checkpoint = manifest["checkpoint"]
+            optimizer_keys = [k for k in checkpoint if "optimizer" in k]
+            if not optimizer_keys:
+                continue
+            for k in optimizer_keys:
+                del checkpoint[k]
+            self._write_manifest(key, manifest)
+            pruned += 1
+        return pruned
+
+    def delete(self, key: str):
+        os.remove(self._manifest_path(key))
+
+    def referenced_objects(self) -> set:
+        referenced = set()
+
+        def collect(value):
+            if isinstance(value, dict):
+                if "__tensor__" in value:
+                    referenced.add(value["__tensor__"])
+                for item in value.values():
+                    collect(item)
+            elif isinstance(value, list):
+                for item in value:
+                    collect(item)
+
+        for key in self.keys():
+            collect(self.manifest(key)["checkpoint"])
+        return referenced
+
+    def gc(self, grace_s: float = GC_GRACE_S) -> tuple[int, int]:
+        """
+        Deletes objects no manifest refers to. Objects and temporary files younger than ``grace_s`` are kept: another
+        process may have written them for a checkpoint whose manifest it has not written yet.
+
+        :return: (number of objects removed, bytes freed)
+        """
+        cutoff = time.time() - grace_s
+        referenced = self.referenced_objects()
+        removed, freed = 0, 0
+        for directory, _, files in os.walk(self.objects_dir):
+            for name in files:
+                path = os.path.join(directory, name)
+                if name.split(".tmp")[0] in referenced:
+                    continue
+                try:
+                    stat = os.stat(path)
+                    if stat.st_mtime > cutoff:
+                        continue
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue  # renamed or removed by another process meanwhile
+                freed += stat.st_size
+                removed += 1
+        return removed, freed
+
+    def disk_usage(self) -> int:
+        total = 0
+        for directory in (self.objects_dir, self.manifests_dir):
+            for path, _, files in os.walk(directory):
+                total += sum(os.path.getsize(os.path.join(path, name)) for name in files)
+        return total
+
+
+def _iteration(key: str) -> int:
+    name = os.path.basename(key).split(".")[0]
+    digits = name.rsplit("_", 1)[-1]
+    return int(digits) if digits.isdigit() else -1
+
+
+def run_key(run_dir: str) -> str:
+    """
+    Store key prefix of a run directory: its name plus a hash of its absolute path, so that runs with the same name in
+    different log directories do not overwrite each other.
+    """
+    run_path = os.path.abspath(run_dir)
+    return f"{os.path.basename(run_path)}-{hashlib.sha1(run_path.encode()).hexdigest()[:8]}"
+
+
+def write_pointer(path: str, store: CheckpointStore, key: str):
+    """
+    Writes the pointer file that stands in for ``model_<it>.pt`` in a run directory.
+    """
+    with open(path, "w") as f:
+        json.dump({"store": os.path.relpath(store.root, os.path.dirname(os.path.abspath(path))), "key": key}, f)
+
+
+def is_pointer(path: str) -> bool:
+    return path.endswith(POINTER_SUFFIX)
+
+
+def resolve_checkpoint(path: str) -> str:
+    """
+    Returns ``path``, or the store pointer that replaced it when ``model_<it>.pt`` was saved into a store.
+    """
+    pointer = os.path.splitext(path)[0] + POINTER_SUFFIX
+    if not os.path.exists(path) and os.path.exists(pointer):
+        return pointer
+    return path
+
+
+def open_pointer(path: str) -> tuple[CheckpointStore, str]:
+    with open(path) as f:
+        pointer = json.load(f)
+    return CheckpointStore(os.path.join(os.path.dirname(os.path.abspath(path)), pointer["store"])), pointer["key"]
+
+
+def load_checkpoint(path: str, map_location=None, inference: bool = False) -> dict:
+    """
+    Loads a checkpoint from a ``model_*.pt`` file or a store pointer, lazily in the latter case.
+
+    :param inference: prefer the fp16 inference copy when there is one, cast back to fp32
+    """
+    if not is_pointer(path):
+        return torch.load(path, map_location=map_location, weights_only=False)
+    store, key = open_pointer(path)
+    if inference and store.has(key + HALF_SUFFIX):
+        return store.get(key + HALF_SUFFIX, map_location, dtype=torch.float32)
+    return store.get(key, map_location)
+
+
+def checkpoint_buffer(checkpoint: dict) -> io.BytesIO:
+    """
+    Serializes a loaded checkpoint to an in-memory file, for rsl_rl's ``runner.load``, which reads with torch.load.
+    """
+    buffer = io.BytesIO()
+    torch.save(checkpoint, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def make_checkpointing(runner_class, store_root: str, half_copies: bool = False, keep_optimizer: int = 1):
+    """
+    Builds a subclass of an rsl_rl runner whose checkpoints go into a CheckpointStore.
+
+    Every save still goes through the runner's own ``save``, then the file is moved into the store and replaced by
+    a pointer. Only the newest ``keep_optimizer`` checkpoints of the run keep their optimizer state; the objects this
+    frees are only deleted by an explicit ``CheckpointStore.gc``. Load stored checkpoints into a runner with
+    ``runner.load(checkpoint_buffer(load_checkpoint(path)))``.
+    """
+    store = CheckpointStore(store_root)
+
+    class CheckpointingRunner(runner_class):
+        def save(self, path, *args, **kwargs):
+            super().save(path, *args, **kwargs)
+            checkpoint = torch.load(path, map_location="cpu", weights_only=False)
+            run = run_key(os.path.dirname(path))
+            key = f"{run}/{os.path.splitext(os.path.basename(path))[0]}"
+            store.put(key, checkpoint)
+            if half_copies:
+                store.put_inference_copy(key, checkpoint)
+            write_pointer(os.path.splitext(path)[0] + POINTER_SUFFIX, store, key)
+            os.remove(path)
+            store.prune_optimizer(run, keep_optimizer)
+
+    CheckpointingRunner.__name__ = f"Checkpointing{runner_class.__name__}"
+    CheckpointingRunner.__qualname__ = CheckpointingRunner.__name__
+    return CheckpointingRunner
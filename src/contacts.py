@@ -0,0 +1,56 @@
+import torch
+
+
+class FootContacts:
+    """
+    Per-env foot contact state, updated once per control step from one bulk query of the net contact force on every
+    link of the robot, of which only the foot columns are kept.
+
+    A foot is in contact when the vertical component of its net contact force exceeds ``threshold``. Contact is
+    filtered over the last two steps, since the solver can report a foot resting on the ground as briefly airborne.
+    """
+
+    def __init__(self, env, foot_joint_names, threshold: float):
+        """
+        :param env: the ServobotEnv whose robot is queried
+        :param foot_joint_names: joints whose child links are the feet
+        :param threshold: vertical contact force in N above which a foot counts as in contact
+        """
+        self.robot = env.robot
+        self.dt = env.dt
+        self.threshold = threshold
+        device = env.base_pos.device
+        self.num_feet = len(foot_joint_names)
+        self.feet_idx = torch.tensor(
+            [self.robot.get_joint(name).link.idx_local for name in foot_joint_names], device=device, dtype=torch.long
+        )
+        shape = (env.num_envs, self.num_feet)
+        self.forces = torch.zeros(shape + (3,), device=device)
+        self.velocities = torch.zeros(shape + (3,), device=device)
+        self.contact = torch.zeros(shape, device=device, dtype=torch.bool)  # filtered
+        self.last_raw_contact = torch.zeros(shape, device=device, dtype=torch.bool)
+        self.first_contact = torch.zeros(shape, device=device, dtype=torch.bool)  # touched down this step
+        self.air_time = torch.zeros(shape, device=device)  # seconds since lift-off, 0 while in contact
+        self.last_air_time = torch.zeros(shape, device=device)  # duration of the swing that just ended
+
+    def update(self):
+        torch.index_select(self.robot.get_links_net_contact_force(), 1, self.feet_idx, out=self.forces)
+        torch.index_select(self.robot.get_links_vel(), 1, self.feet_idx, out=self.velocities)
+        raw_contact = self.forces[..., 2] > self.threshold
+        torch.logical_or(raw_contact, self.last_raw_contact, out=self.contact)
+        self.last_raw_contact.copy_(raw_contact)
+
+        self.air_time += self.dt
+        torch.logical_and(self.air_time > self.dt, self.contact, out=self.first_contact)
+        torch.where(self.first_contact, self.air_time, self.last_air_time, out=self.last_air_time)
+        self.air_time.masked_fill_(self.contact, 0.0)
+
+    def reset(self, envs_idx):
+        self.contact[envs_idx] = True
+        self.last_raw_contact[envs_idx] = True
+        self.first_contact[envs_idx] = False
+        self.air_time[envs_idx] = 0.0
+        self.last_air_time[envs_idx] = 0.0
+
+    def num_in_contact(self) -> torch.Tensor:
+        return self.contact.sum(dim=1)
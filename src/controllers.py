@@ -1,11 +1,15 @@
+import threading
+import time
+
 import pygame
 
 class Controller:
-    def __init__(self, type="keyboard"):
+    def __init__(self, type="keyboard", verbose=False):
         self.joystick = None
         self.ps4 = (type == "ps4")
         self.xbox = (type == "xbox")
         self.keyboard = (type == "keyboard")
+        self.verbose = verbose  # print key events and commands
         self.target_speed = 0.5  # m/s
         self.screen = None
         self.clock = None
@@ -122,10 +126,12 @@ class Controller:
                     return (0.0, 0.0, 0.0)
                 if event.type == pygame.KEYDOWN:
                     self.keys_down.add(event.key)
-                    print(f"KEYDOWN: {pygame.key.name(event.key)}")
+                    if self.verbose:
+                        print(f"KEYDOWN: {pygame.key.name(event.key)}")
                 if event.type == pygame.KEYUP:
                     self.keys_down.discard(event.key)
-                    print(f"KEYUP: {pygame.key.name(event.key)}")
+                    if self.verbose:
+                        print(f"KEYUP: {pygame.key.name(event.key)}")
             
             # Use our tracked state instead of get_pressed()
             if pygame.K_UP in self.keys_down:
@@ -148,7 +154,7 @@ class Controller:
                 rotate = 1.0
             
             # Debug: print final command
-            if forward != 0.0 or strafe != 0.0 or rotate != 0.0:
+            if self.verbose and (forward != 0.0 or strafe != 0.0 or rotate != 0.0):
                 print(f"Command: forward={forward}, strafe={strafe}, rotate={rotate}")
             
             command = (forward * 0.5, strafe * 0.5, rotate * 0.5)
@@ -214,4 +220,39 @@ class Controller:
             # Display target speed at the bottom in a cool font
             font = pygame.font.SysFont(None, 20)
             speed_text = font.render(f"speed: {self.target_speed:.2f}", True, (255, 255, 255))
-            self.screen.blit(speed_text, (15, 80))
\ No newline at end of file
+            self.screen.blit(speed_text, (15, 80))
+
+
+class ControllerThread:
+    """
+    Polls a Controller on a background thread so input handling and HUD drawing never block the control loop.
+
+    The newest command is published by replacing a single tuple reference, so the control loop reads it with
+    ``latest`` without taking a lock.
+    """
+
+    def __init__(self, controller: Controller, rate_hz: float = 60.0):
+        self.controller = controller
+        self.period = 1.0 / rate_hz
+        self.latest = (0.0, 0.0, 0.0)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="controller", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        # pygame has to be initialized on the thread that polls it
+        self.controller.initialize()
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            command = self.controller.get_command()
+            self.latest = command if command is not None else (0.0, 0.0, 0.0)
+            if not pygame.get_init():
+                break
+            time.sleep(max(0.0, self.period - (time.perf_counter() - start)))
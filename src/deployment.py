@@ -0,0 +1,167 @@
+import math
+
+import torch
+from torch import nn
+
+from src.checkpoints import load_checkpoint
+from src.history import ObservationHistory
+from src.state import rotate_inverse
+
+_ACTIVATIONS = {
+    "elu": nn.ELU,
+    "selu": nn.SELU,
+    "relu": nn.ReLU,
+    "lrelu": nn.LeakyReLU,
+    "tanh": nn.Tanh,
+    "sigmoid": nn.Sigmoid,
+}
+
+
+class ExportedActor(nn.Module):
+    """
+    The deterministic actor of an rsl_rl ActorCritic checkpoint, rebuilt as a plain MLP with its observation
+    normalization folded in, so it can be TorchScript-exported and run without rsl_rl.
+    """
+
+    def __init__(self, model_state_dict: dict, activation: str = "elu"):
+        super().__init__()
+        weights = sorted(
+            (int(key.split(".")[1]), key)
+            for key in model_state_dict
+            if key.startswith("actor.") and key.endswith(".weight")
+        )
+        layers = []
+        for i, (index, key) in enumerate(weights):
+            weight = model_state_dict[key]
+            linear = nn.Linear(weight.shape[1], weight.shape[0])
+            linear.weight.data.copy_(weight)
+            linear.bias.data.copy_(model_state_dict[f"actor.{index}.bias"])
+            layers.append(linear)
+            if i < len(weights) - 1:
+                layers.append(_ACTIVATIONS[activation]())
+        self.actor = nn.Sequential(*layers)
+
+        num_obs = model_state_dict[weights[0][1]].shape[1]
+        mean = model_state_dict.get("actor_obs_normalizer._mean", torch.zeros(1, num_obs))
+        std = model_state_dict.get("actor_obs_normalizer._std", torch.ones(1, num_obs))
+        # EmpiricalNormalization divides by std + eps, identity normalization is mean 0, std + eps 1
+        eps = 1e-2 if "actor_obs_normalizer._std" in model_state_dict else 0.0
+        self.register_buffer("obs_mean", mean.reshape(1, -1).clone())
+        self.register_buffer("obs_scale", 1.0 / (std.reshape(1, -1) + eps))
+
+    def forward(self, obs: torch.Tensor) -> torch.Tensor:
+        return self.actor((obs - self.obs_mean) * self.obs_scale)
+
+
+def export_actor(checkpoint_path: str, activation: str = "elu") -> torch.jit.ScriptModule:
+    """
+    :param checkpoint_path: model_*.pt saved by an rsl_rl runner, or its checkpoint store pointer
+    :param activation: the "activation" of the policy config the checkpoint was trained with
+    :return: the actor as a TorchScript module on CPU
+    """
+    checkpoint = load_checkpoint(checkpoint_path, inference=True)
+    actor = ExportedActor(checkpoint["model_state_dict"], activation).eval()
+    return torch.jit.script(actor)
+
+
+class StaticImu:
+    """
+    Stand-in IMU for a robot resting level and still. A real IMU driver exposes the same ``read()``.
+    """
+
+    def read(self):
+        """
+        :return: (angular velocity in the body frame in rad/s, orientation quaternion wxyz)
+        """
+        return (0.0, 0.0, 0.0), (1.0, 0.0, 0.0, 0.0)
+
+
+def make_imu(imu_cfg, simulated: bool, allow_static: bool = False):
+    """
+    Builds the IMU named by the hardware config's ``imu`` block.
+
+    The static stand-in feeds the policy a level, motionless body whatever the robot does, so on real servos it is
+    refused unless explicitly allowed (e.g. for a robot fixed on a stand). With a simulated bus and no IMU configured,
+    it is the default.
+
+    :param imu_cfg: the ``imu`` block of the hardware config, or None
+    :param simulated: the servo bus is a loopback fake
+    :param allow_static: accept the static IMU on real servos
+    """
+    imu_type = (imu_cfg or {}).get("type") or ("static" if simulated else None)
+    if imu_type is None:
+        raise ValueError("No IMU configured, set imu.type in the hardware config")
+    if imu_type != "static":
+        raise ValueError(f"Unknown IMU type {imu_type}")
+    if not simulated and not allow_static:
+        raise ValueError(
+            "The static IMU reports a level, motionless body regardless of the robot's motion. Refusing to run it on "
+            "real servos, pass --allow-static-imu to do so anyway (robot fixed on a stand)"
+        )
+    return StaticImu()
+
+
+class ObservationBuilder:
+    """
+    Builds policy observations from IMU and servo readings in the layout of ServobotEnv.step:
+    ang_vel (3), projected gravity (3), commands (3), dof_pos (12), dof_vel (12), last actions (12) and, with
+    env_cfg["gait"]["observe_phase"], the gait phase as sin/cos (2), stacked over obs_cfg["history_length"] frames.
+    Also turns actions into joint targets the way the env does.
+    """
+
+    def __init__(self, env_cfg: dict, obs_cfg: dict, command_cfg: dict):
+        self.env_cfg = env_cfg
+        self.command_cfg = command_cfg
+        self.num_actions = env_cfg["num_actions"]
+        scales = obs_cfg["obs_scales"]
+        self.ang_vel_scale = scales["ang_vel"]
+        self.dof_pos_scale = scales["dof_pos"]
+        self.dof_vel_scale = scales["dof_vel"]
+        self.commands_scale = torch.tensor([scales["lin_vel"], scales["lin_vel"], scales["ang_vel"]])
+        self.default_dof_pos = torch.tensor(
+            [env_cfg["default_joint_angles"][name] for name in env_cfg["joint_names"]]
+        )
+        self.history = ObservationHistory(1, obs_cfg["num_obs"], obs_cfg.get("history_length", 1), device="cpu")
+        self.frame = torch.zeros(1, obs_cfg["num_obs"])
+        self.actions = torch.zeros(1, self.num_actions)
+        self.commands = torch.zeros(3)
+        self.gravity = torch.tensor([[0.0, 0.0, -1.0]])
+        gait_cfg = env_cfg.get("gait", {})
+        self.observe_phase = gait_cfg.get("observe_phase", False)
+        self.phase = 0.0
+        self.phase_step = 0.02 / gait_cfg.get("period_s", 0.4)  # one control step of the env
+
+    def set_command(self, command):
+        # command in [-1, 1] per axis, mapped like ServobotEnv.step does for teleop
+        self.commands[1] = -command[0] * self.command_cfg["lin_vel_y_range"][1]
+        self.commands[0] = -command[1] * self.command_cfg["lin_vel_y_range"][1]
+        self.commands[2] = -command[2] * self.command_cfg["ang_vel_range"][1]
+
+    def build(self, ang_vel, quat, dof_pos, dof_vel) -> torch.Tensor:
+        """
+        :return: (1, num_obs * history_length) observation, oldest frame first
+        """
+        n = self.num_actions
+        quat = torch.tensor([quat])
+        frame = self.frame[0]
+        frame[0:3] = torch.tensor(ang_vel) * self.ang_vel_scale
+        frame[3:6] = rotate_inverse(quat[:, 0:1], quat[:, 1:4], self.gravity)[0]
+        frame[6:9] = self.commands * self.commands_scale
+        frame[9:9 + n] = (torch.tensor(dof_pos) - self.default_dof_pos) * self.dof_pos_scale
+        frame[9 + n:9 + 2 * n] = torch.tensor(dof_vel) * self.dof_vel_scale
+        frame[9 + 2 * n:9 + 3 * n] = self.actions[0]
+        if self.observe_phase:
+            self.phase = (self.phase + self.phase_step) % 1.0
+            frame[9 + 3 * n] = math.sin(2 * math.pi * self.phase)
+            frame[10 + 3 * n] = math.cos(2 * math.pi * self.phase)
+        self.history.push(self.frame)
+        return self.history.flat
+
+    def targets(self, actions: torch.Tensor) -> list:
+        """
+        :param actions: (1, num_actions) policy output, remembered for the next observation
+        :return: joint position targets in radians
+        """
+        clip = self.env_cfg["clip_actions"]
+        self.actions.copy_(torch.clamp(actions, -clip, clip))
+        return (self.actions[0] * self.env_cfg["action_scale"] + self.default_dof_pos).tolist()
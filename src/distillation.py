@@ -0,0 +1,258 @@
+import hashlib
+import os
+import statistics
+import time
+from collections import deque
+
+import torch
+from rsl_rl.runners import DistillationRunner
+from torch.utils.tensorboard import SummaryWriter
+
+from src.episode_stats import log_episode_stats
+
+
+class TeacherDataset:
+    """
+    Chunked store of (student observation, teacher action) pairs.
+
+    Every rollout is appended as one chunk. Chunks live in host memory (pinned when sampling for a GPU), oldest
+    evicted first, and only the sampled minibatches are copied to ``device``: at 4096 envs x 24 steps a chunk is about
+    20 MB, so the default 200 chunks would take 4 GB of GPU memory. Chunks can be mirrored to ``storage_dir`` as
+    ``chunk_<teacher_id>_<n>.pt`` so a later run distilling the same teacher starts from the cached labels instead of
+    re-running the teacher; the teacher is told from the file name, chunks of other teachers are never read.
+    """
+
+    def __init__(self, max_chunks: int, device, storage_dir=None, teacher_id: str = ""):
+        """
+        :param max_chunks: number of chunks kept in memory
+        :param device: device samples are returned on
+        :param storage_dir: optional directory to persist chunks to and reload them from
+        :param teacher_id: fingerprint of the teacher, cached chunks from another teacher are ignored
+        """
+        self.max_chunks = max_chunks
+        self.device = torch.device(device)
+        self.pin = self.device.type == "cuda"
+        self.storage_dir = storage_dir
+        self.teacher_id = teacher_id
+        self.chunks = deque(maxlen=max_chunks)
+        self.num_saved = 0
+        # two pinned staging buffers per tensor, alternated so a batch is assembled while the last one is in flight
+        self._staging = [None, None]
+        self._next_staging = 0
+        if storage_dir is not None:
+            os.makedirs(storage_dir, exist_ok=True)
+            self._load_cached()
+
+    def _to_host(self, tensor: torch.Tensor) -> torch.Tensor:
+        tensor = tensor.detach().cpu()
+        return tensor.pin_memory() if self.pin else tensor
+
+    def _chunk_prefix(self) -> str:
+        return f"chunk_{self.teacher_id}_"
+
+    def _load_cached(self):
+        prefix = self._chunk_prefix()
+        names = sorted(n for n in os.listdir(self.storage_dir) if n.startswith(prefix) and n.endswith(".pt"))
+        self.num_saved = int(names[-1][len(prefix):-len(".pt")]) + 1 if names else 0
+        # newest first, only as many as are kept
+        for name in reversed(names[max(len(names) - self.max_chunks, 0):]):
+            chunk = torch.load(os.path.join(self.storage_dir, name), map_location="cpu")
+            self.chunks.appendleft((self._to_host(chunk["obs"]), self._to_host(chunk["actions"])))
+        if self.chunks:
+            print(f"Loaded {len(self.chunks)} cached teacher chunks ({len(self)} samples) from {self.storage_dir}")
+
+    def add(self, obs: torch.Tensor, actions: torch.Tensor):
+        """
+        :param obs: student observations of shape (N, num_student_obs)
+        :param actions: teacher actions of shape (N, num_actions)
+        """
+        obs, actions = self._to_host(obs), self._to_host(actions)
+        self.chunks.append((obs, actions))
+        if self.storage_dir is not None:
+            path = os.path.join(self.storage_dir, f"{self._chunk_prefix()}{self.num_saved:06d}.pt")
+            torch.save({"obs": obs, "actions": actions}, path)
+            self.num_saved += 1
+
+    def __len__(self):
+        return sum(obs.shape[0] for obs, _ in self.chunks)
+
+    def sample(self, batch_size: int):
+        """
+        Draws a uniform minibatch over all stored samples, gathered on the host and copied to ``device`` in one
+        transfer per tensor.
+        """
+        sizes = torch.tensor([obs.shape[0] for obs, _ in self.chunks])
+        offsets = torch.cumsum(sizes, 0) - sizes
+        idx = torch.randint(0, int(sizes.sum()), (batch_size,))
+        chunk_idx = torch.searchsorted(offsets, idx, right=True) - 1
+
+        staging = self._staging[self._next_staging]
+        first_obs, first_actions = self.chunks[0]
+        if staging is None or staging[0].shape[0] != batch_size:
+            staging = tuple(
+                torch.empty((batch_size, *t.shape[1:]), dtype=t.dtype, pin_memory=self.pin)
+                for t in (first_obs, first_actions)
+            )
+            self._staging[self._next_staging] = staging
+        self._next_staging = 1 - self._next_staging
+
+        start = 0
+        for c in torch.unique(chunk_idx).tolist():
+            rows = idx[chunk_idx == c] - offsets[c]
+            end = start + rows.shape[0]
+            for source, out in zip(self.chunks[c], staging):
+                torch.index_select(source, 0, rows, out=out[start:end])
+            start = end
+        # copy=True: on CPU the batch must not alias a staging buffer that a later call overwrites
+        return tuple(t.to(self.device, non_blocking=self.pin, copy=True) for t in staging)
+
+
+class CachedDistillationRunner(DistillationRunner):
+    """
+    DAgger-style distillation that labels student-visited states with the frozen teacher once, in bulk, and keeps
+    the labels in a TeacherDataset that every later update reuses.
+
+    The first ``record_iterations`` rollouts are driven by the teacher, the rest by the student. Settings live in
+    the "cache" block of the train config.
+    """
+
+    def __init__(self, env, train_cfg, log_dir=None, device="cpu"):
+        super().__init__(env, train_cfg, log_dir, device)
+        self.cache_cfg = train_cfg.get("cache", {})
+        if self.alg.policy.is_recurrent:
+            raise ValueError("CachedDistillationRunner needs a feed-forward student, use class_name: StudentTeacher")
+
+    def _teacher_id(self):
+        digest = hashlib.sha256()
+        for name, tensor in sorted(self.alg.policy.teacher.state_dict().items()):
+            digest.update(name.encode())
+            digest.update(tensor.detach().cpu().numpy().tobytes())
+        return digest.hexdigest()[:16]
+
+    @torch.no_grad()
+    def _label(self, teacher_obs: torch.Tensor):
+        # one large batched teacher pass per rollout instead of one call per env step
+        policy = self.alg.policy
+        batch_size = self.cache_cfg.get("label_batch_size", 65536)
+        labels = [
+            policy.teacher(policy.teacher_obs_normalizer(teacher_obs[start:start + batch_size]))
+            for start in range(0, teacher_obs.shape[0], batch_size)
+        ]
+        return torch.cat(labels)
+
+    def learn(self, num_learning_iterations: int, init_at_random_ep_len: bool = False):
+        policy = self.alg.policy
+        if not policy.loaded_teacher:
+            raise ValueError("Teacher model parameters not loaded. Please load a teacher model to distill.")
+
+        if self.log_dir is not None and self.writer is None and not self.disable_logs:
+            self.logger_type = "tensorboard"
+            self.writer = SummaryWriter(log_dir=self.log_dir, flush_secs=10)
+
+        dataset = TeacherDataset(
+            self.cache_cfg.get("max_chunks", 200),
+            self.device,
+            storage_dir=self.cache_cfg.get("storage_dir"),
+            teacher_id=self._teacher_id(),
+        )
+        # a run that starts from cached labels skips the teacher-driven recording phase
+        record_iterations = 0 if len(dataset) > 0 else self.cache_cfg.get("record_iterations", 10)
+        batch_size = self.cache_cfg.get("batch_size", 16384)
+        num_epochs = self.alg_cfg.get("num_learning_epochs", 1)
+        max_grad_norm = self.alg_cfg.get("max_grad_norm")
+
+        if init_at_random_ep_len:
+            self.env.episode_length_buf = torch.randint_like(
+                self.env.episode_length_buf, high=int(self.env.max_episode_length)
+            )
+        obs = self.env.get_observations().to(self.device)
+        policy.train()
+        if self.is_distributed:
+            self.alg.broadcast_parameters()
+
+        rewbuffer, lenbuffer = deque(maxlen=100), deque(maxlen=100)
+        cur_reward_sum = torch.zeros(self.env.num_envs, dtype=torch.float, device=self.device)
+        cur_episode_length = torch.zeros(self.env.num_envs, dtype=torch.float, device=self.device)
+
+        start_iter = self.current_learning_iteration
+        tot_iter = start_iter + num_learning_iterations
+        for it in range(start_iter, tot_iter):
+            start = time.time()
+            use_teacher = it - start_iter < record_iterations
+            student_obs, teacher_obs, teacher_actions = [], [], []
+            with torch.no_grad():
+                for _ in range(self.num_steps_per_env):
+                    student_obs.append(policy.get_student_obs(obs))
+                    if use_teacher:
+                        # the teacher's own actions are its labels, no second pass needed
+                        actions = policy.evaluate(obs)
+                        teacher_actions.append(actions)
+                    else:
+                        teacher_obs.append(policy.get_teacher_obs(obs))
+                        actions = policy.act_inference(obs)
+                    obs, rewards, dones, extras = self.env.step(actions.to(self.env.device))
+                    obs, rewards, dones = obs.to(self.device), rewards.to(self.device), dones.to(self.device)
+                    policy.update_normalization(obs)
+
+                    cur_reward_sum += rewards
+                    cur_episode_length += 1
+                    new_ids = (dones > 0).nonzero(as_tuple=False)
+                    rewbuffer.extend(cur_reward_sum[new_ids][:, 0].cpu().numpy().tolist())
+                    lenbuffer.extend(cur_episode_length[new_ids][:, 0].cpu().numpy().tolist())
+                    cur_reward_sum[new_ids] = 0
+                    cur_episode_length[new_ids] = 0
+
+            label_start = time.time()
+            student_obs = torch.cat(student_obs)
+            labels = torch.cat(teacher_actions) if use_teacher else self._label(torch.cat(teacher_obs))
+            dataset.add(student_obs, labels)
+            collection_time = time.time() - start
+            label_time = time.time() - label_start
+
+            start = time.time()
+            num_updates = max(1, num_epochs * student_obs.shape[0] // batch_size)
+            mean_loss = 0.0
+            for _ in range(num_updates):
+                batch_obs, batch_actions = dataset.sample(batch_size)
+                actions = policy.student(policy.student_obs_normalizer(batch_obs))
+                loss = torch.nn.functional.mse_loss(actions, batch_actions)
+                self.alg.optimizer.zero_grad()
+                loss.backward()
+                if self.is_distributed:
+                    self.alg.reduce_parameters()
+                if max_grad_norm:
+                    torch.nn.utils.clip_grad_norm_(policy.student.parameters(), max_grad_norm)
+                self.alg.optimizer.step()
+                mean_loss += loss.item() / num_updates
+            learn_time = time.time() - start
+
+            self.current_learning_iteration = it
+            self.tot_timesteps += self.num_steps_per_env * self.env.num_envs
+            self.tot_time += collection_time + learn_time
+            if self.writer is not None:
+                self.writer.add_scalar("Loss/behavior", mean_loss, it)
+                self.writer.add_scalar("Distill/dataset_size", len(dataset), it)
+                self.writer.add_scalar("Distill/teacher_driven", float(use_teacher), it)
+                self.writer.add_scalar("Perf/collection time", collection_time, it)
+                self.writer.add_scalar("Perf/teacher_label_time", label_time, it)
+                self.writer.add_scalar("Perf/learning_time", learn_time, it)
+                self.writer.add_scalar("Perf/total_time", self.tot_time, it)
+                self.writer.add_scalar(
+                    "Perf/total_fps",
+                    int(self.num_steps_per_env * self.env.num_envs / (collection_time + learn_time)),
+                    it,
+                )
+                if len(rewbuffer) > 0:
+                    self.writer.add_scalar("Train/mean_reward", statistics.mean(rewbuffer), it)
+                    self.writer.add_scalar("Train/mean_episode_length", statistics.mean(lenbuffer), it)
+                log_episode_stats(self, it)
+                print(
+                    f"it {it}/{tot_iter} | behavior loss {mean_loss:.5f} | dataset {len(dataset)} | "
+                    f"collect {collection_time:.2f}s (labels {label_time:.2f}s) | learn {learn_time:.2f}s | "
+                    f"total {self.tot_time:.1f}s"
+                )
+                if it % self.save_interval == 0:
+                    self.save(os.path.join(self.log_dir, f"model_{it}.pt"))
+
+        if self.writer is not None:
+            self.save(os.path.join(self.log_dir, f"model_{self.current_learning_iteration}.pt"))
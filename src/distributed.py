@@ -0,0 +1,49 @@
+import os
+
+import torch
+import torch.distributed as dist
+
+
+def init_distributed(backend="gloo"):
+    """
+    Joins the process group described by the torchrun environment variables.
+
+    :param backend: torch.distributed backend, "gloo" also works on CPU-only machines
+    :return: (global rank, local rank, world size)
+    """
+    rank = int(os.getenv("RANK", "0"))
+    local_rank = int(os.getenv("LOCAL_RANK", "0"))
+    world_size = int(os.getenv("WORLD_SIZE", "1"))
+    if not dist.is_initialized():
+        dist.init_process_group(backend=backend, rank=rank, world_size=world_size)
+    return rank, local_rank, world_size
+
+
+def make_distributed(runner_class):
+    """
+    Builds a subclass of an rsl_rl runner that uses an already initialized process group, whatever its backend.
+
+    rsl_rl's own multi-GPU setup insists on NCCL and one CUDA device per rank. This keeps its gradient all-reduce
+    and parameter broadcast but skips those checks, so ranks can run on CPU with gloo.
+    """
+
+    class DistributedRunner(runner_class):
+        def _configure_multi_gpu(self):
+            self.gpu_world_size = dist.get_world_size() if dist.is_initialized() else 1
+            self.is_distributed = self.gpu_world_size > 1
+            self.gpu_global_rank = dist.get_rank() if dist.is_initialized() else 0
+            self.gpu_local_rank = int(os.getenv("LOCAL_RANK", "0"))
+            if not self.is_distributed:
+                self.multi_gpu_cfg = None
+                return
+            self.multi_gpu_cfg = {
+                "global_rank": self.gpu_global_rank,
+                "local_rank": self.gpu_local_rank,
+                "world_size": self.gpu_world_size,
+            }
+            if torch.device(self.device).type == "cuda":
+                torch.cuda.set_device(torch.device(self.device))
+
+    DistributedRunner.__name__ = f"Distributed{runner_class.__name__}"
+    DistributedRunner.__qualname__ = DistributedRunner.__name__
+    return DistributedRunner
@@ -0,0 +1,247 @@
+import torch
+
+TERMINATION_CAUSES = ("timeout", "pitch", "roll")
+PERCENTILES = (5, 50, 95)
+
+
+class EpisodeStatistics:
+    """
+    Accumulates per-episode reward terms, episode length and termination causes on device between log flushes:
+    running sums, sums of squares, extrema and fixed-bin histograms, from which means, standard deviations and
+    percentiles are computed only when flushed.
+
+    Histogram ranges come from ``ranges`` when given, otherwise they are calibrated once ``calibration_episodes``
+    full episodes have finished (their spread, padded by half of it on both sides). Episodes cut short by a
+    randomized start (``init_at_random_ep_len``) are not full and do not count towards the calibration. Until then,
+    episodes are kept on device and binned as soon as the ranges are known; a flush before that writes means,
+    standard deviations and extrema only. Values outside the range land in the edge bins, the exact extrema are
+    tracked separately.
+
+    Returns drift as the policy learns, so calibrated ranges are refitted to the window's extrema on every flush
+    where more than ``recalibrate_overflow`` of the episodes fell outside the range, or where the window spans less
+    than a quarter of it. The new range applies from the next window on; ranges given in ``ranges`` stay fixed.
+    """
+
+    def __init__(
+        self,
+        names,
+        num_bins: int,
+        max_episode_length: int,
+        device,
+        ranges=None,
+        calibration_episodes: int = 256,
+        recalibrate_overflow: float = 0.05,
+    ):
+        """
+        :param names: reward term names, one histogram each
+        :param num_bins: number of histogram bins per quantity
+        :param max_episode_length: episode length in control steps, the fixed range of the length histogram
+        :param device: device the accumulators live on
+        :param ranges: optional {name: [low, high]} histogram ranges for reward terms
+        :param calibration_episodes: number of full episodes the other ranges are calibrated from
+        :param recalibrate_overflow: fraction of out-of-range episodes in a window that refits a calibrated range
+        """
+        self.names = list(names)
+        self.num_bins = num_bins
+        self.device = device
+        num_rows = len(self.names) + 1  # reward terms, then episode length
+        self.low = torch.zeros(num_rows, device=device)
+        self.high = torch.ones(num_rows, device=device)
+        self.low[-1], self.high[-1] = 0.0, float(max_episode_length)
+        ranges = ranges or {}
+        for i, name in enumerate(self.names):
+            if name in ranges:
+                self.low[i], self.high[i] = ranges[name]
+        calibrate = [name not in ranges for name in self.names] + [False]
+        self._calibrate = torch.tensor(calibrate, device=device)
+        self._calibrated = not bool(self._calibrate.any())
+        self.calibration_episodes = calibration_episodes
+        self.recalibrate_overflow = recalibrate_overflow
+        self._calibration_count = 0
+        self._calibration_low = torch.full((num_rows,), float("inf"), device=device)
+        self._calibration_high = torch.full((num_rows,), float("-inf"), device=device)
+        self._pending = []  # values recorded in the current window before calibration
+
+        self._row_offset = torch.arange(num_rows, device=device).unsqueeze(1) * num_bins
+        self.sum = torch.zeros(num_rows, device=device)
+        self.sum_squares = torch.zeros(num_rows, device=device)
+        self.min = torch.full((num_rows,), float("inf"), device=device)
+        self.max = torch.full((num_rows,), float("-inf"), device=device)
+        self.histogram = torch.zeros(num_rows * num_bins, device=device)
+        self.overflow = torch.zeros(num_rows, device=device)  # values binned outside [low, high)
+        self.causes = torch.zeros(len(TERMINATION_CAUSES), device=device)
+        self.count = 0
+
+    def reset(self):
+        self.sum.zero_()
+        self.sum_squares.zero_()
+        self.min.fill_(float("inf"))
+        self.max.fill_(float("-inf"))
+        self.histogram.zero_()
+        self.overflow.zero_()
+        self.causes.zero_()
+        self.count = 0
+        self._pending.clear()
+
+    def _bin(self, values: torch.Tensor):
+        scaled = (values - self.low.unsqueeze(1)) / (self.high - self.low).unsqueeze(1) * self.num_bins
+        self.overflow += ((scaled < 0) | (scaled >= self.num_bins)).sum(dim=1)
+        bins = scaled.long().clamp_(0, self.num_bins - 1) + self._row_offset
+        self.histogram.index_add_(0, bins.flatten(), torch.ones_like(values).flatten())
+
+    def _fit_ranges(self, rows: torch.Tensor, low: torch.Tensor, high: torch.Tensor):
+        pad = torch.clamp((high - low) * 0.5, min=1e-3)
+        self.low = torch.where(rows, low - pad, self.low)
+        self.high = torch.where(rows, high + pad, self.high)
+
+    def _recalibrate_ranges(self):
+        # on device from the window's accumulators, no synchronization
+        overflowing = self.overflow > self.recalibrate_overflow * self.count
+        too_wide = (self.max - self.min) * 4.0 < self.high - self.low
+        self._fit_ranges(self._calibrate & (overflowing | too_wide), self.min, self.max)
+
+    def _calibrate_ranges(self, values: torch.Tensor, full: torch.Tensor):
+        # the only place that synchronizes with the device, and only until the ranges are fixed
+        full_values = values[:, full]
+        self._calibration_count += full_values.shape[1]
+        if full_values.shape[1] > 0:
+            torch.minimum(self._calibration_low, full_values.amin(dim=1), out=self._calibration_low)
+            torch.maximum(self._calibration_high, full_values.amax(dim=1), out=self._calibration_high)
+        self._pending.append(values)
+        if self._calibration_count < self.calibration_episodes:
+            return
+        self._fit_ranges(self._calibrate, self._calibration_low, self._calibration_high)
+        self._calibrated = True
+        for pending in self._pending:
+            self._bin(pending)
+        self._pending.clear()
+
+    def record(self, terms: torch.Tensor, lengths: torch.Tensor, causes: torch.Tensor, full: torch.Tensor = None):
+        """
+        Adds a batch of finished episodes. Does not synchronize with the device once the ranges are calibrated.
+
+        :param terms: (num_terms, n) per-episode value of every reward term
+        :param lengths: (n,) episode lengths in control steps
+        :param causes: (n, len(TERMINATION_CAUSES)) termination cause flags, an episode can have several
+        :param full: (n,) whether each episode ran from a reset, all of them if None
+        """
+        values = torch.cat([terms, lengths.to(terms.dtype).unsqueeze(0)])
+        if self._calibrated:
+            self._bin(values)
+        else:
+            if full is None:
+                full = torch.ones(values.shape[1], device=values.device, dtype=torch.bool)
+            self._calibrate_ranges(values, full)
+
+        self.count += values.shape[1]
+        self.sum += values.sum(dim=1)
+        self.sum_squares += values.square().sum(dim=1)
+        torch.minimum(self.min, values.amin(dim=1), out=self.min)
+        torch.maximum(self.max, values.amax(dim=1), out=self.max)
+        self.causes += causes.sum(dim=0)
+
+    def summary(self) -> dict:
+        """
+        Copies the accumulators to the host in one transfer.
+
+        :return: {quantity: {mean, std, sum, sum_squares, min, max, p5, p50, p95, edges, counts}}, with the
+            quantities being the reward terms and "length", and {"termination_<cause>": fraction of episodes} for
+            each cause. Before the ranges are calibrated, the percentiles, edges and counts are left out.
+        """
+        num_rows = len(self.names) + 1
+        packed = torch.cat(
+            [self.sum, self.sum_squares, self.min, self.max, self.low, self.high, self.histogram, self.causes]
+        ).cpu()
+        sums, squares, mins, maxs, lows, highs = packed[: 6 * num_rows].view(6, num_rows)
+        histograms = packed[6 * num_rows: 6 * num_rows + self.histogram.numel()].view(num_rows, self.num_bins)
+        causes = packed[6 * num_rows + self.histogram.numel():]
+
+        result = {}
+        for i, name in enumerate(self.names + ["length"]):
+            mean = sums[i] / self.count
+            edges = torch.linspace(lows[i].item(), highs[i].item(), self.num_bins + 1)
+            cdf = torch.cumsum(histograms[i], 0)
+            stats = {
+                "mean": mean.item(),
+                "std": torch.sqrt(torch.clamp(squares[i] / self.count - mean ** 2, min=0.0)).item(),
+                "sum": sums[i].item(),
+                "sum_squares": squares[i].item(),
+                "min": mins[i].item(),
+                "max": maxs[i].item(),
+            }
+            result[name] = stats
+            if not self._calibrated:
+                continue
+            stats["edges"], stats["counts"] = edges, histograms[i]
+            for q in PERCENTILES:
+                # linear interpolation inside the bin holding the q-th percentile, clipped to the exact extrema
+                target = q / 100.0 * self.count
+                b = int(torch.searchsorted(cdf, torch.tensor(target, dtype=cdf.dtype)).item())
+                b = min(b, self.num_bins - 1)
+                below = cdf[b - 1].item() if b > 0 else 0.0
+                fraction = (target - below) / max(histograms[i, b].item(), 1.0)
+                value = edges[b].item() + fraction * (edges[b + 1] - edges[b]).item()
+                stats[f"p{q}"] = min(max(value, stats["min"]), stats["max"])
+        for cause, count in zip(TERMINATION_CAUSES, causes.tolist()):
+            result[f"termination_{cause}"] = count / self.count
+        return result
+
+    def flush(self, writer, step: int):
+        """
+        Writes everything accumulated since the last flush to a TensorBoard writer as scalars and histograms, then
+        starts a new accumulation window.
+        """
+        if self.count == 0:
+            return
+        for name, stats in self.summary().items():
+            tag = "Episode/" + (name if name == "length" or name.startswith("termination") else "rew_" + name)
+            if not isinstance(stats, dict):
+                writer.add_scalar(tag, stats, step)
+                continue
+            writer.add_scalar(tag, stats["mean"], step)
+            writer.add_scalar(tag + "_std", stats["std"], step)
+            if "edges" not in stats:
+                continue
+            for q in PERCENTILES:
+                writer.add_scalar(f"{tag}_p{q}", stats[f"p{q}"], step)
+            writer.add_histogram_raw(
+                tag,
+                min=stats["min"],
+                max=stats["max"],
+                num=self.count,
+                sum=stats["sum"],
+                sum_squares=stats["sum_squares"],
+                bucket_limits=stats["edges"][1:].tolist(),
+                bucket_counts=stats["counts"].tolist(),
+                global_step=step,
+            )
+        if self._calibrated:
+            self._recalibrate_ranges()
+        self.reset()
+
+
+def log_episode_stats(runner, it: int):
+    """
+    Flushes the env's episode statistics into the runner's writer every ``log_interval`` iterations (the "runner"
+    block of the train config).
+    """
+    stats = getattr(runner.env, "episode_stats", None)
+    if stats is None or runner.writer is None:
+        return
+    if it % runner.cfg.get("runner", {}).get("log_interval", 1) == 0:
+        stats.flush(runner.writer, it)
+
+
+def make_episode_logging(runner_class):
+    """
+    Builds a subclass of a stock rsl_rl runner that also flushes the env's episode statistics when it logs.
+    """
+
+    class EpisodeLoggingRunner(runner_class):
+        def log(self, locs, *args, **kwargs):
+            super().log(locs, *args, **kwargs)
+            log_episode_stats(self, locs["it"])
+
+    EpisodeLoggingRunner.__name__ = f"EpisodeLogging{runner_class.__name__}"
+    EpisodeLoggingRunner.__qualname__ = EpisodeLoggingRunner.__name__
+    return EpisodeLoggingRunner
@@ -0,0 +1,182 @@
+import argparse
+import itertools
+import math
+
+import torch
+
+# Trot: diagonal legs in phase, each leg swings for the first half of its cycle and is on the ground for the
+# second half. Leg order follows the joint order, fl, fr, bl, br.
+TROT_OFFSETS = (0.0, 0.5, 0.5, 0.0)
+SWING_FRACTION = 0.5
+
+
+def foot_offsets(phase: float, command, period: float, step_height: float, hip_xy, leg_offset: float):
+    """
+    Foot displacement of one leg from its stance position at a point of the gait cycle, in the body frame.
+
+    The foot moves backward on the ground at the commanded body velocity (linear plus yaw about the body center)
+    and swings forward along the same line, lifted on a half sine.
+
+    :param phase: gait phase in [0, 1)
+    :param command: (lin_vel_x, lin_vel_y, ang_vel_z) in m/s and rad/s
+    :param period: gait cycle duration in s
+    :param step_height: swing apex above the stance height in m
+    :param hip_xy: (x, y) of the leg's hip relative to the body center in m
+    :param leg_offset: phase offset of the leg in the cycle
+    :return: (dx, dy, dz) in m
+    """
+    vx, vy, wz = command
+    # body velocity at the hip, a foot on the ground moves at minus this relative to the body
+    hip_vx, hip_vy = vx - wz * hip_xy[1], vy + wz * hip_xy[0]
+    stance_time = period * (1.0 - SWING_FRACTION)
+    half_x, half_y = 0.5 * hip_vx * stance_time, 0.5 * hip_vy * stance_time
+
+    leg_phase = (phase + leg_offset) % 1.0
+    if leg_phase < SWING_FRACTION:
+        s = leg_phase / SWING_FRACTION  # swing from back to front
+        forward = -1.0 + 2.0 * s
+        lift = step_height * math.sin(math.pi * s)
+    else:
+        s = (leg_phase - SWING_FRACTION) / (1.0 - SWING_FRACTION)  # stance from front to back
+        forward = 1.0 - 2.0 * s
+        lift = 0.0
+    return forward * half_x, forward * half_y, lift
+
+
+def build_table(
+    default_dof_pos,
+    lin_vel_x_range,
+    lin_vel_y_range,
+    ang_vel_range,
+    period: float,
+    phase_bins: int = 32,
+    command_bins=(9, 9, 9),
+    stance_height: float = 0.14,
+    step_height: float = 0.03,
+    hip_xy=((0.1, 0.06), (0.1, -0.06), (-0.1, 0.06), (-0.1, -0.06)),
+    lateral_signs=(1.0, -1.0, 1.0, -1.0),
+):
+    """
+    Sweeps foot trajectories over a phase x command grid and solves IK for each grid point.
+
+    Joint angles are stored as default_dof_pos plus the IK deviation from the stance solution, so the table uses the
+    simulator's joint zero whatever the IK's own zero is. IK expects per-leg foot positions (x lateral, y forward,
+    z vertical), so body y displacements are multiplied by each leg's lateral sign. Unreachable points keep the
+    stance angles.
+
+    :return: ((phase_bins, *command_bins, num_joints) tensor of joint angles, number of unreachable points)
+    """
+    import numpy as np
+
+    from src.kinematics import IK
+
+    ik = IK()
+    stance = np.array([0.0, 0.0, -stance_height] * 4)
+    stance_cfg = ik.solve(stance.copy())
+    default_dof_pos = np.asarray(default_dof_pos, dtype=np.float64)
+    axes = [
+        np.linspace(low, high, n)
+        for (low, high), n in zip((lin_vel_x_range, lin_vel_y_range, ang_vel_range), command_bins)
+    ]
+    table = np.zeros((phase_bins, *command_bins, len(default_dof_pos)))
+    unreachable = 0
+    for p, i, j, k in itertools.product(range(phase_bins), *(range(n) for n in command_bins)):
+        command = (axes[0][i], axes[1][j], axes[2][k])
+        positions = stance.copy()
+        for leg in range(4):
+            dx, dy, dz = foot_offsets(p / phase_bins, command, period, step_height, hip_xy[leg], TROT_OFFSETS[leg])
+            positions[3 * leg:3 * leg + 3] += (lateral_signs[leg] * dy, dx, dz)
+        cfg = ik.solve(positions)
+        if not np.all(np.isfinite(cfg)):
+            unreachable += 1
+            cfg = stance_cfg
+        table[p, i, j, k] = default_dof_pos + (cfg - stance_cfg)
+    return torch.tensor(table, dtype=torch.float32), unreachable
+
+
+class GaitTable:
+    """
+    Reference joint angles over a phase x (lin_vel_x, lin_vel_y, ang_vel_z) grid, read with multilinear
+    interpolation: 16 batched gathers per lookup, no IK at run time. Phase wraps around, commands are clamped to the
+    grid.
+    """
+
+    def __init__(self, path: str, device):
+        data = torch.load(path, map_location=device)
+        table = data["table"]
+        self.shape = table.shape[:-1]
+        self.num_joints = table.shape[-1]
+        self.table = table.reshape(-1, self.num_joints)
+        self.joint_names = data["joint_names"]
+        self.command_low = torch.tensor([r[0] for r in data["command_ranges"]], device=device)
+        self.command_high = torch.tensor([r[1] for r in data["command_ranges"]], device=device)
+        strides = [1]
+        for size in reversed(self.shape[1:]):
+            strides.insert(0, strides[0] * size)
+        self.strides = strides
+        self.metadata = {key: value for key, value in data.items() if key != "table"}
+
+    def lookup(self, phase: torch.Tensor, commands: torch.Tensor) -> torch.Tensor:
+        """
+        :param phase: (num_envs,) gait phase in [0, 1)
+        :param commands: (num_envs, 3) commanded lin_vel_x, lin_vel_y, ang_vel_z
+        :return: (num_envs, num_joints) reference joint angles
+        """
+        num_phases = self.shape[0]
+        coordinate = phase * num_phases
+        low = torch.floor(coordinate)
+        corners = [((low.long() % num_phases, (low.long() + 1) % num_phases), coordinate - low)]
+        scaled = (commands - self.command_low) / (self.command_high - self.command_low)
+        for d, size in enumerate(self.shape[1:]):
+            coordinate = torch.clamp(scaled[:, d], 0.0, 1.0) * (size - 1)
+            low = torch.clamp(torch.floor(coordinate), max=size - 2)
+            corners.append(((low.long(), low.long() + 1), coordinate - low))
+
+        result = torch.zeros((phase.shape[0], self.num_joints), device=phase.device)
+        for bits in itertools.product((0, 1), repeat=len(corners)):
+            flat = 0
+            weight = 1.0
+            for bit, ((low_idx, high_idx), frac), stride in zip(bits, corners, self.strides):
+                flat = flat + (high_idx if bit else low_idx) * stride
+                weight = weight * (frac if bit else 1.0 - frac)
+            result.addcmul_(weight.unsqueeze(1), self.table[flat])
+        return result
+
+
+if __name__ == "__main__":
+    from train import get_cfgs
+
+    parser = argparse.ArgumentParser(description="Precompute the trot reference table for the gait_tracking reward")
+    parser.add_argument("-o", "--output", type=str, default="gait_table.pt")
+    parser.add_argument("--phase_bins", type=int, default=32)
+    parser.add_argument("--command_bins", type=int, nargs=3, default=[9, 9, 9])
+    parser.add_argument("--stance_height", type=float, default=0.14, help="hip to foot height when standing, m")
+    parser.add_argument("--step_height", type=float, default=0.03, help="swing apex above stance, m")
+    args = parser.parse_args()
+
+    env_cfg, _, _, command_cfg, _ = get_cfgs()
+    period = env_cfg["gait"]["period_s"]
+    ranges = [command_cfg["lin_vel_x_range"], command_cfg["lin_vel_y_range"], command_cfg["ang_vel_range"]]
+    default_dof_pos = [env_cfg["default_joint_angles"][name] for name in env_cfg["joint_names"]]
+    table, unreachable = build_table(
+        default_dof_pos,
+        *ranges,
+        period=period,
+        phase_bins=args.phase_bins,
+        command_bins=args.command_bins,
+        stance_height=args.stance_height,
+        step_height=args.step_height,
+    )
+    torch.save(
+        {
+            "table": table,
+            "joint_names": env_cfg["joint_names"],
+            "command_ranges": ranges,
+            "period_s": period,
+            "stance_height": args.stance_height,
+            "step_height": args.step_height,
+        },
+        args.output,
+    )
+    total = table.shape[:-1].numel()
+    print(f"Wrote {args.output}: {tuple(table.shape)}, {unreachable}/{total} grid points unreachable")
@@ -0,0 +1,84 @@
+import torch
+
+
+class ObservationHistory:
+    """
+    GPU ring buffer holding the last N observation frames of every env.
+
+    Each frame is written twice, at slot ``head`` and ``head + N`` of a buffer that is 2N frames long. The N most
+    recent frames are then always the contiguous window ``[head + 1, head + N]``, so the ordered history can be
+    returned as a view without rolling or concatenating anything on the step path.
+    """
+
+    def __init__(self, num_envs: int, frame_dim: int, length: int, device, dtype=torch.float32):
+        """
+        :param num_envs: number of parallel environments
+        :param frame_dim: size of a single observation frame
+        :param length: number of frames kept per env (N)
+        :param device: torch device the buffer lives on
+        :param dtype: buffer dtype
+        """
+        if length < 1:
+            raise ValueError(f"History length must be at least 1, got {length}")
+        self.num_envs = num_envs
+        self.frame_dim = frame_dim
+        self.length = length
+        self.buf = torch.zeros((num_envs, 2 * length, frame_dim), device=device, dtype=dtype)
+        # index of the most recently written frame, in [0, length)
+        self.head = length - 1
+
+    def push(self, frame: torch.Tensor):
+        """
+        Write the newest frame for all envs.
+
+        :param frame: tensor of shape (num_envs, frame_dim)
+        """
+        self.head = (self.head + 1) % self.length
+        self.buf[:, self.head] = frame
+        self.buf[:, self.head + self.length] = frame
+
+    def reset(self, envs_idx):
+        """
+        Zero-fill the history of the given envs.
+
+        :param envs_idx: indices of the envs being reset
+        """
+        self.buf[envs_idx] = 0.0
+
+    @property
+    def frames(self) -> torch.Tensor:
+        """
+        View of shape (num_envs, length, frame_dim), oldest frame first.
+        """
+        start = self.head + 1
+        return self.buf[:, start:start + self.length]
+
+    @property
+    def flat(self) -> torch.Tensor:
+        """
+        View of shape (num_envs, length * frame_dim), oldest frame first.
+
+        The view aliases the ring buffer and changes with the next ``push``; clone it to keep an observation.
+        """
+        # the window is contiguous in its last two dims, so this is a view and not a copy
+        return self.frames.view(self.num_envs, self.length * self.frame_dim)
+
+    def strided(self, stride: int) -> torch.Tensor:
+        """
+        View of every ``stride``-th frame, always ending at the newest one.
+
+        :param stride: step between selected frames
+        :return: tensor of shape (num_envs, ceil(length / stride), frame_dim)
+        """
+        start = self.head + 1 + (self.length - 1) % stride
+        return self.buf[:, start:self.head + 1 + self.length:stride]
+
+    @property
+    def latest(self) -> torch.Tensor:
+        """
+        View of the newest frame, shape (num_envs, frame_dim).
+        """
+        return self.buf[:, self.head]
+
+    def nbytes(self) -> int:
+        return self.buf.element_size() * self.buf.nelement()
@@ -0,0 +1,70 @@
+import torch
+
+
+class DelayQueue:
+    """
+    Preallocated circular queue that delays a batched signal by a per-env number of steps.
+
+    Every env shares the same write head; reads gather slot ``head - delay[env]`` for each env in one indexed
+    select, so envs with different delays never need Python-side branching.
+    """
+
+    def __init__(self, num_envs: int, dim: int, max_delay: int, device, dtype=torch.float32):
+        """
+        :param num_envs: number of parallel environments
+        :param dim: size of the delayed signal
+        :param max_delay: largest supported delay in steps (K)
+        :param device: torch device the queue lives on
+        :param dtype: queue dtype
+        """
+        if max_delay < 0:
+            raise ValueError(f"Maximum delay must be non-negative, got {max_delay}")
+        self.num_envs = num_envs
+        self.size = max_delay + 1
+        self.buf = torch.zeros((self.size * num_envs, dim), device=device, dtype=dtype)
+        self.delay = torch.zeros((num_envs,), device=device, dtype=torch.long)
+        self.head = 0
+        self.out = torch.zeros((num_envs, dim), device=device, dtype=dtype)
+        # row of env i in slot s is s * num_envs + i
+        self._env_rows = torch.arange(num_envs, device=device, dtype=torch.long)
+        self._read_rows = torch.zeros_like(self._env_rows)
+
+    def push(self, value: torch.Tensor) -> torch.Tensor:
+        """
+        Write the newest value for all envs and return the delayed one.
+
+        :param value: tensor of shape (num_envs, dim)
+        :return: tensor of shape (num_envs, dim), reused between calls
+        """
+        self.head = (self.head + 1) % self.size
+        self.buf[self.head * self.num_envs:(self.head + 1) * self.num_envs] = value
+        if self.size == 1:
+            self.out[:] = value
+            return self.out
+        # slot = (head - delay) mod size, then offset into the flattened buffer
+        self._read_rows.copy_(self.delay).neg_().add_(self.head + self.size)
+        self._read_rows.remainder_(self.size).mul_(self.num_envs).add_(self._env_rows)
+        torch.index_select(self.buf, 0, self._read_rows, out=self.out)
+        return self.out
+
+    def reset(self, envs_idx):
+        """
+        Clear the queued values of the given envs.
+
+        :param envs_idx: indices of the envs being reset
+        """
+        self.buf.view(self.size, self.num_envs, -1)[:, envs_idx] = 0.0
+
+    def resample_delay(self, envs_idx, delay_range):
+        """
+        Draw new integer delays for the given envs, uniformly in [low, high].
+
+        :param envs_idx: indices of the envs being reset
+        :param delay_range: inclusive [low, high] delay in steps
+        """
+        low, high = delay_range
+        if low < 0 or high >= self.size:
+            raise ValueError(f"Delay range {delay_range} does not fit in a queue of {self.size - 1} steps")
+        self.delay[envs_idx] = torch.randint(
+            low, high + 1, (len(envs_idx),), device=self.delay.device, dtype=torch.long
+        )
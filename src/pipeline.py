@@ -0,0 +1,180 @@
+import contextlib
+import copy
+import os
+import statistics
+import threading
+import time
+from collections import deque
+
+import torch
+from rsl_rl.runners import OnPolicyRunner
+from rsl_rl.storage import RolloutStorage
+from torch.utils.tensorboard import SummaryWriter
+
+from src.episode_stats import log_episode_stats
+
+
+class PipelinedOnPolicyRunner(OnPolicyRunner):
+    """
+    OnPolicyRunner that overlaps rollout collection with the PPO update.
+
+    While the learner updates on rollout k-1 in a background thread, the env collects rollout k into a second
+    storage buffer with a snapshot of the policy from before that update, so every rollout is one iteration stale.
+    The lag is corrected as in decoupled PPO: the PPO ratio is taken against the learner's policy at the start of
+    the update (the proximal policy), and advantages are weighted by the truncated importance ratio between the
+    proximal and the behavior (snapshot) policy. Settings live in the "pipeline" block of the train config.
+    """
+
+    def __init__(self, env, train_cfg, log_dir=None, device="cpu"):
+        super().__init__(env, train_cfg, log_dir, device)
+        self.pipeline_cfg = train_cfg.get("pipeline", {})
+        self.max_importance_weight = self.pipeline_cfg.get("max_importance_weight", 2.0)
+        if self.alg.policy.is_recurrent:
+            raise ValueError("PipelinedOnPolicyRunner does not support recurrent policies")
+        if self.alg.rnd is not None:
+            raise ValueError("PipelinedOnPolicyRunner does not support RND")
+
+    def _make_actor(self):
+        # shallow copy of the algorithm with its own policy snapshot, transition and storage: act(),
+        # process_env_step() and compute_returns() then never touch what the learner is using
+        actor = copy.copy(self.alg)
+        actor.policy = copy.deepcopy(self.alg.policy)
+        actor.transition = RolloutStorage.Transition()
+        actor.storage = copy.deepcopy(self.alg.storage)
+        return actor
+
+    def _sync_actor(self, actor):
+        # normalizer statistics were gathered by the actor, everything else is trained by the learner
+        learner_state = self.alg.policy.state_dict()
+        for key, value in actor.policy.state_dict().items():
+            if "normalizer" in key:
+                learner_state[key] = value
+        self.alg.policy.load_state_dict(learner_state)
+        actor.policy.load_state_dict(learner_state)
+
+    @torch.no_grad()
+    def _correct_policy_lag(self, storage):
+        policy = self.alg.policy
+        obs = storage.observations.flatten(0, 1)
+        actions = storage.actions.flatten(0, 1)
+        policy.act(obs)
+        proximal_log_prob = policy.get_actions_log_prob(actions).view_as(storage.actions_log_prob)
+        weights = torch.clamp(torch.exp(proximal_log_prob - storage.actions_log_prob), max=self.max_importance_weight)
+        # returns and advantages were computed under inference mode, so replace instead of updating in place
+        storage.advantages = storage.advantages * weights
+        storage.actions_log_prob.copy_(proximal_log_prob)
+        storage.mu.copy_(policy.action_mean.view_as(storage.mu))
+        storage.sigma.copy_(policy.action_std.view_as(storage.sigma))
+        return weights.mean().item()
+
+    def _update(self, storage, stream, result):
+        # an exception would otherwise end the thread silently, learn() re-raises it after the join
+        try:
+            if stream is not None:
+                stream.wait_stream(torch.cuda.current_stream(self.device))
+            with torch.cuda.stream(stream) if stream is not None else contextlib.nullcontext():
+                start = time.time()
+                result["importance_weight"] = self._correct_policy_lag(storage)
+                self.alg.storage = storage
+                result["loss_dict"] = self.alg.update()
+                result["learn_time"] = time.time() - start
+        except Exception as error:
+            result["error"] = error
+
+    def learn(self, num_learning_iterations: int, init_at_random_ep_len: bool = False):
+        if self.log_dir is not None and self.writer is None and not self.disable_logs:
+            self.logger_type = "tensorboard"
+            self.writer = SummaryWriter(log_dir=self.log_dir, flush_secs=10)
+
+        if init_at_random_ep_len:
+            self.env.episode_length_buf = torch.randint_like(
+                self.env.episode_length_buf, high=int(self.env.max_episode_length)
+            )
+        obs = self.env.get_observations().to(self.device)
+        self.train_mode()
+        if self.is_distributed:
+            self.alg.broadcast_parameters()
+
+        actor = self._make_actor()
+        storages = [self.alg.storage, actor.storage]
+        stream = torch.cuda.Stream(self.device) if torch.device(self.device).type == "cuda" else None
+
+        rewbuffer, lenbuffer = deque(maxlen=100), deque(maxlen=100)
+        cur_reward_sum = torch.zeros(self.env.num_envs, dtype=torch.float, device=self.device)
+        cur_episode_length = torch.zeros(self.env.num_envs, dtype=torch.float, device=self.device)
+
+        start_iter = self.current_learning_iteration
+        tot_iter = start_iter + num_learning_iterations
+        pending = None
+        # one extra pass so the last rollout also gets its update
+        for it in range(start_iter, tot_iter + 1):
+            start = time.time()
+            result = {}
+            learner = None
+            if pending is not None:
+                learner = threading.Thread(target=self._update, args=(pending, stream, result))
+                learner.start()
+
+            collection_time = 0.0
+            if it < tot_iter:
+                actor.storage = storages[it % 2]
+                with torch.inference_mode():
+                    for _ in range(self.num_steps_per_env):
+                        actions = actor.act(obs)
+                        obs, rewards, dones, extras = self.env.step(actions.to(self.env.device))
+                        obs, rewards, dones = obs.to(self.device), rewards.to(self.device), dones.to(self.device)
+                        actor.process_env_step(obs, rewards, dones, extras)
+
+                        cur_reward_sum += rewards
+                        cur_episode_length += 1
+                        new_ids = (dones > 0).nonzero(as_tuple=False)
+                        rewbuffer.extend(cur_reward_sum[new_ids][:, 0].cpu().numpy().tolist())
+                        lenbuffer.extend(cur_episode_length[new_ids][:, 0].cpu().numpy().tolist())
+                        cur_reward_sum[new_ids] = 0
+                        cur_episode_length[new_ids] = 0
+                    actor.compute_returns(obs)
+                collection_time = time.time() - start
+
+            if learner is not None:
+                learner.join()
+                if "error" in result:
+                    raise result["error"]
+                if stream is not None:
+                    torch.cuda.current_stream(self.device).wait_stream(stream)
+            self._sync_actor(actor)
+            pending = actor.storage if it < tot_iter else None
+            if learner is None:
+                continue
+
+            # the update that just finished belongs to the previous iteration
+            self.current_learning_iteration = it - 1
+            iteration_time = time.time() - start
+            self.tot_timesteps += self.num_steps_per_env * self.env.num_envs
+            self.tot_time += iteration_time
+            if self.writer is not None:
+                self._log(it - 1, tot_iter, result, collection_time, iteration_time, rewbuffer, lenbuffer)
+                if (it - 1) % self.save_interval == 0:
+                    self.save(os.path.join(self.log_dir, f"model_{it - 1}.pt"))
+
+        if self.writer is not None:
+            self.save(os.path.join(self.log_dir, f"model_{self.current_learning_iteration}.pt"))
+
+    def _log(self, it, tot_iter, result, collection_time, iteration_time, rewbuffer, lenbuffer):
+        log_episode_stats(self, it)
+        for key, value in result["loss_dict"].items():
+            self.writer.add_scalar(f"Loss/{key}", value, it)
+        self.writer.add_scalar("Loss/learning_rate", self.alg.learning_rate, it)
+        self.writer.add_scalar("Policy/mean_noise_std", self.alg.policy.action_std.mean().item(), it)
+        self.writer.add_scalar("Policy/lag_importance_weight", result["importance_weight"], it)
+        self.writer.add_scalar("Perf/total_fps", int(self.num_steps_per_env * self.env.num_envs / iteration_time), it)
+        self.writer.add_scalar("Perf/collection time", collection_time, it)
+        self.writer.add_scalar("Perf/learning_time", result["learn_time"], it)
+        self.writer.add_scalar("Perf/total_time", self.tot_time, it)
+        if len(rewbuffer) > 0:
+            self.writer.add_scalar("Train/mean_reward", statistics.mean(rewbuffer), it)
+            self.writer.add_scalar("Train/mean_episode_length", statistics.mean(lenbuffer), it)
+        print(
+            f"it {it}/{tot_iter} | collect {collection_time:.2f}s | learn {result['learn_time']:.2f}s "
+            f"(overlapped, iteration {iteration_time:.2f}s) | lag weight {result['importance_weight']:.3f}"
+            + (f" | mean reward {statistics.mean(rewbuffer):.2f}" if len(rewbuffer) > 0 else "")
+        )
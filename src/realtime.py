@@ -0,0 +1,83 @@
+import math
+import time
+from collections import deque
+
+
+class RealtimeScheduler:
+    """
+    Paces a loop to a fixed period against absolute deadlines, so time lost in one tick is not carried into the
+    next, and keeps jitter and missed-deadline statistics.
+    """
+
+    def __init__(self, period: float, spin_s: float = 0.001, window: int = 1000):
+        """
+        :param period: loop period in seconds
+        :param spin_s: the last part of every wait is busy-waited instead of slept, for tighter wake-ups
+        :param window: number of recent ticks the statistics are computed over
+        """
+        self.period = period
+        self.spin_s = spin_s
+        self.ticks = 0
+        self.missed = 0
+        self.lateness = deque(maxlen=window)  # wake-up time minus deadline, s
+        self.busy = deque(maxlen=window)  # time spent in the loop body, s
+        self._deadline = None
+        self._tick_start = None
+
+    def start(self):
+        self._tick_start = time.perf_counter()
+        self._deadline = self._tick_start + self.period
+
+    def wait(self):
+        """
+        Blocks until the next deadline. A tick that overran its deadline counts as missed, and the schedule skips
+        ahead to the next deadline still in the future instead of trying to catch up.
+        """
+        if self._deadline is None:
+            self.start()
+        now = time.perf_counter()
+        self.busy.append(now - self._tick_start)
+        self.ticks += 1
+
+        if now > self._deadline:
+            self.missed += 1
+            self._deadline += math.ceil((now - self._deadline) / self.period) * self.period
+        remaining = self._deadline - now
+        if remaining > self.spin_s:
+            time.sleep(remaining - self.spin_s)
+        while time.perf_counter() < self._deadline:
+            pass
+
+        self._tick_start = time.perf_counter()
+        self.lateness.append(self._tick_start - self._deadline)
+        self._deadline += self.period
+
+    def stats(self) -> dict:
+        """
+        :return: loop statistics in milliseconds over the recent window
+        """
+        lateness = sorted(self.lateness)
+        busy = sorted(self.busy)
+        if not lateness:
+            return {"ticks": self.ticks, "missed": self.missed}
+        return {
+            "ticks": self.ticks,
+            "missed": self.missed,
+            "missed_pct": 100.0 * self.missed / self.ticks,
+            "jitter_mean_ms": 1e3 * sum(lateness) / len(lateness),
+            "jitter_p99_ms": 1e3 * lateness[int(0.99 * (len(lateness) - 1))],
+            "jitter_max_ms": 1e3 * lateness[-1],
+            "busy_mean_ms": 1e3 * sum(busy) / len(busy),
+            "busy_max_ms": 1e3 * busy[-1],
+        }
+
+    def report(self) -> str:
+        s = self.stats()
+        if "jitter_mean_ms" not in s:
+            return f"{s['ticks']} ticks"
+        return (
+            f"{s['ticks']} ticks @ {1 / self.period:.0f} Hz | missed {s['missed']} ({s['missed_pct']:.1f}%) | "
+            f"jitter mean {s['jitter_mean_ms']:.2f} ms, p99 {s['jitter_p99_ms']:.2f} ms, "
+            f"max {s['jitter_max_ms']:.2f} ms | loop body mean {s['busy_mean_ms']:.2f} ms, "
+            f"max {s['busy_max_ms']:.2f} ms"
+        )
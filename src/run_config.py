@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import pickle
+from dataclasses import dataclass, field
+from typing import Any
+
+import yaml
+
+# Schema history:
+#   1: positional pickle [env_cfg, obs_cfg, reward_cfg, command_cfg, train_cfg] in cfgs.pkl
+#   2: versioned config.yaml; PD gains named default_kp/default_kv and train_cfg always has obs_groups
+SCHEMA_VERSION = 2
+CONFIG_FILE = "config.yaml"
+LEGACY_CONFIG_FILE = "cfgs.pkl"
+
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def _content_hash(sections: dict) -> str:
+    canonical = json.dumps(sections, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def _migrate_1_to_2(cfg: dict) -> dict:
+    env = cfg["env"]
+    for old, new in (("kp", "default_kp"), ("kv", "default_kv")):
+        if old in env and new not in env:
+            env[new] = env.pop(old)
+    cfg["train"].setdefault("obs_groups", {"policy": ["policy"], "critic": ["policy"]})
+    return cfg
+
+
+# MIGRATIONS[v] upgrades a config dict from schema v to v + 1
+MIGRATIONS = {
+    1: _migrate_1_to_2,
+}
+
+
+@dataclass
+class RunConfig:
+    """
+    Every config a run was trained with, stored as schema-versioned YAML with a content hash.
+    """
+
+    env: dict[str, Any]
+    obs: dict[str, Any]
+    reward: dict[str, Any]
+    command: dict[str, Any]
+    train: dict[str, Any]
+    schema_version: int = field(default=SCHEMA_VERSION)
+
+    def sections(self) -> dict:
+        return {"env": self.env, "obs": self.obs, "reward": self.reward, "command": self.command, "train": self.train}
+
+    def content_hash(self) -> str:
+        return _content_hash(self.sections())
+
+    def as_tuple(self):
+        return self.env, self.obs, self.reward, self.command, self.train
+
+    def save(self, run_dir: str) -> str:
+        """
+        Writes ``config.yaml`` into ``run_dir``.
+
+        :return: the content hash
+        """
+        content_hash = self.content_hash()
+        document = {"schema_version": self.schema_version, "content_hash": content_hash, **self.sections()}
+        with open(os.path.join(run_dir, CONFIG_FILE), "w") as f:
+            yaml.dump(document, f, Dumper=_Dumper, sort_keys=False)
+        return content_hash
+
+    @classmethod
+    def from_dict(cls, cfg: dict, version: int) -> "RunConfig":
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"Config schema version {version} is newer than this code ({SCHEMA_VERSION})")
+        while version < SCHEMA_VERSION:
+            cfg = MIGRATIONS[version](cfg)
+            version += 1
+        return cls(**{key: cfg[key] for key in ("env", "obs", "reward", "command", "train")})
+
+    @classmethod
+    def load(cls, run_dir: str) -> "RunConfig":
+        """
+        Loads ``config.yaml`` from a run directory, or migrates a legacy ``cfgs.pkl`` if that is all there is.
+        """
+        path = os.path.join(run_dir, CONFIG_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                document = yaml.load(f, Loader=_Loader)
+            version = document.pop("schema_version")
+            stored_hash = document.pop("content_hash", None)
+            if stored_hash is not None and stored_hash != _content_hash(document):
+                print(f"Warning: {path} was edited after it was written (content hash mismatch)")
+            return cls.from_dict(document, version)
+
+        legacy_path = os.path.join(run_dir, LEGACY_CONFIG_FILE)
+        if not os.path.exists(legacy_path):
+            raise FileNotFoundError(f"No {CONFIG_FILE} or {LEGACY_CONFIG_FILE} in {run_dir}")
+        with open(legacy_path, "rb") as f:
+            env_cfg, obs_cfg, reward_cfg, command_cfg, train_cfg = pickle.load(f)
+        legacy = {"env": env_cfg, "obs": obs_cfg, "reward": reward_cfg, "command": command_cfg, "train": train_cfg}
+        return cls.from_dict(legacy, 1)
@@ -0,0 +1,332 @@
+import math
+import os
+import pty
+import select
+import socket
+import struct
+import threading
+import time
+import tty
+
+# Feetech STS-style half-duplex serial protocol:
+#   instruction packet  0xFF 0xFF id length instruction params... checksum
+#   status packet       0xFF 0xFF id length error params... checksum
+# with length = len(params) + 2 and checksum = ~(id + length + instruction/error + sum(params)) & 0xFF
+HEADER = b"\xff\xff"
+BROADCAST_ID = 0xFE
+INST_PING = 0x01
+INST_READ = 0x02
+INST_WRITE = 0x03
+INST_SYNC_READ = 0x82
+INST_SYNC_WRITE = 0x83
+
+ADDR_GOAL_POSITION = 0x2A  # 2 bytes
+ADDR_PRESENT_POSITION = 0x38  # 2 bytes, followed by present speed (2 bytes)
+
+TICKS_PER_REV = 4096
+CENTER_TICKS = 2048
+TICKS_PER_RAD = TICKS_PER_REV / (2 * math.pi)
+
+
+def checksum(body: bytes) -> int:
+    return ~sum(body) & 0xFF
+
+
+def make_packet(servo_id: int, instruction: int, params: bytes = b"") -> bytes:
+    body = bytes([servo_id, len(params) + 2, instruction]) + params
+    return HEADER + body + bytes([checksum(body)])
+
+
+def encode_signed(value: int) -> int:
+    # sign-magnitude 16 bit, bit 15 is the sign
+    return (abs(value) & 0x7FFF) | (0x8000 if value < 0 else 0)
+
+
+def decode_signed(value: int) -> int:
+    return -(value & 0x7FFF) if value & 0x8000 else value
+
+
+class BusError(IOError):
+    pass
+
+
+class FdTransport:
+    """
+    Byte transport over a file descriptor: a socket, a pseudo-tty or a serial device opened with os.open.
+    """
+
+    def __init__(self, fd: int, timeout: float = 0.01):
+        """
+        :param fd: open file descriptor, owned by the transport from now on
+        :param timeout: seconds a read waits for data before giving up
+        """
+        self.fd = fd
+        self.timeout = timeout
+
+    def write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    def read(self, size: int) -> bytes:
+        """
+        Reads exactly ``size`` bytes, or fewer if the timeout expires first.
+        """
+        data = bytearray()
+        deadline = time.perf_counter() + self.timeout
+        while len(data) < size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or not select.select([self.fd], [], [], remaining)[0]:
+                break
+            chunk = os.read(self.fd, size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return bytes(data)
+
+    def reset_input(self):
+        while select.select([self.fd], [], [], 0)[0] and os.read(self.fd, 4096):
+            pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SerialTransport:
+    """
+    Byte transport over a real serial port through pyserial, which is only needed on the robot.
+    """
+
+    def __init__(self, port: str, baudrate: int, timeout: float = 0.01):
+        import serial
+
+        # low_latency asks the USB-serial driver not to batch bytes for up to 16 ms
+        self.serial = serial.serial_for_url(port, baudrate=baudrate, timeout=timeout)
+        if hasattr(self.serial, "set_low_latency_mode"):
+            try:
+                self.serial.set_low_latency_mode(True)
+            except (ValueError, OSError):
+                pass
+
+    def write(self, data: bytes):
+        self.serial.write(data)
+
+    def read(self, size: int) -> bytes:
+        return self.serial.read(size)
+
+    def reset_input(self):
+        self.serial.reset_input_buffer()
+
+    def close(self):
+        self.serial.close()
+
+
+def open_transport(port: str, baudrate: int, timeout: float = 0.01):
+    """
+    Opens a serial port with pyserial, or a pseudo-tty (``/dev/pts/N``, as served by FakeServoBus) directly.
+    """
+    if port.startswith("/dev/pts/"):
+        fd = os.open(port, os.O_RDWR | os.O_NOCTTY)
+        tty.setraw(fd)
+        return FdTransport(fd, timeout)
+    return SerialTransport(port, baudrate, timeout)
+
+
+def read_packet(transport) -> tuple[int, int, bytes]:
+    """
+    Reads one packet, resynchronizing on the 0xFF 0xFF header.
+
+    :return: (id, instruction or error byte, params)
+    """
+    previous = b""
+    while True:
+        byte = transport.read(1)
+        if not byte:
+            raise BusError("timed out waiting for a packet header")
+        if previous == b"\xff" and byte == b"\xff":
+            break
+        previous = byte
+    head = transport.read(2)
+    if len(head) < 2:
+        raise BusError("truncated packet")
+    servo_id, length = head
+    rest = transport.read(length)
+    if len(rest) < length:
+        raise BusError(f"truncated packet from id {servo_id}")
+    if checksum(head + rest[:-1]) != rest[-1]:
+        raise BusError(f"bad checksum from id {servo_id}")
+    return servo_id, rest[0], rest[1:-1]
+
+
+class ServoBus:
+    """
+    Driver for a chain of position-controlled servos sharing one serial bus. Every control tick is one SYNC_READ
+    of all present positions and speeds and one SYNC_WRITE of all goal positions, instead of a request/response
+    round trip per servo.
+    """
+
+    def __init__(self, transport, ids, directions=None, offsets=None):
+        """
+        :param transport: byte transport, see open_transport and FdTransport
+        :param ids: servo ids, in the joint order of the policy
+        :param directions: +1 or -1 per servo, the sign between joint angle and servo angle
+        :param offsets: joint angle in radians at the servo's center position, per servo
+        """
+        self.transport = transport
+        self.ids = list(ids)
+        self.directions = list(directions or [1] * len(self.ids))
+        self.offsets = list(offsets or [0.0] * len(self.ids))
+        self._sync_read = make_packet(
+            BROADCAST_ID, INST_SYNC_READ, bytes([ADDR_PRESENT_POSITION, 4, *self.ids])
+        )
+        self._write_head = bytes([ADDR_GOAL_POSITION, 2])
+        self._goal = struct.Struct("<BH")
+
+    def ping(self, servo_id: int) -> bool:
+        self.transport.write(make_packet(servo_id, INST_PING))
+        try:
+            return read_packet(self.transport)[0] == servo_id
+        except BusError:
+            return False
+
+    def write_positions(self, positions):
+        """
+        Sends all goal positions in one SYNC_WRITE. Servos do not reply to broadcast packets.
+
+        :param positions: joint angles in radians, one per servo
+        """
+        params = bytearray(self._write_head)
+        for servo_id, position, direction, offset in zip(self.ids, positions, self.directions, self.offsets):
+            ticks = CENTER_TICKS + round(direction * (position - offset) * TICKS_PER_RAD)
+            params += self._goal.pack(servo_id, min(max(ticks, 0), TICKS_PER_REV - 1))
+        self.transport.write(make_packet(BROADCAST_ID, INST_SYNC_WRITE, bytes(params)))
+
+    def read_state(self):
+        """
+        Reads all present positions and speeds with one SYNC_READ.
+
+        :return: (joint angles in rad, joint velocities in rad/s), one per servo in the order of ``ids``
+        """
+        self.transport.reset_input()
+        self.transport.write(self._sync_read)
+        positions, velocities = [], []
+        for servo_id, direction, offset in zip(self.ids, self.directions, self.offsets):
+            reply_id, error, params = read_packet(self.transport)
+            if reply_id != servo_id or len(params) != 4:
+                raise BusError(f"expected 4 bytes from id {servo_id}, got {len(params)} from id {reply_id}")
+            if error:
+                raise BusError(f"servo {servo_id} reports error 0x{error:02x}")
+            ticks, speed = struct.unpack("<HH", params)
+            positions.append(offset + direction * (ticks - CENTER_TICKS) / TICKS_PER_RAD)
+            velocities.append(direction * decode_signed(speed) / TICKS_PER_RAD)
+        return positions, velocities
+
+    def close(self):
+        self.transport.close()
+
+
+class FakeServoBus:
+    """
+    Loopback stand-in for the servo chain, served on a thread over a socket pair or a pseudo-tty. Each fake servo
+    slews toward its goal at a limited speed, and the wire time of every packet at ``baudrate`` is simulated, so the
+    whole deployment loop, timing included, runs without hardware.
+
+    The device also timestamps the state it serves and the goals it receives, which gives the true end-to-end
+    latency from sensor sample to actuation command.
+    """
+
+    def __init__(self, ids, baudrate: int = 1_000_000, max_speed: float = 6.5, kind: str = "socket"):
+        """
+        :param ids: ids of the fake servos
+        :param baudrate: simulated bus speed in bit/s, 0 to disable wire time
+        :param max_speed: slew rate of the fake servos in rad/s
+        :param kind: "socket" (socketpair) or "pty" (pseudo-tty, opened by path like a real serial port)
+        """
+        self.ids = list(ids)
+        self.byte_time = 10.0 / baudrate if baudrate else 0.0  # start + 8 data + stop bits
+        self.max_speed = max_speed * TICKS_PER_RAD
+        self.position = {servo_id: float(CENTER_TICKS) for servo_id in self.ids}
+        self.speed = {servo_id: 0.0 for servo_id in self.ids}
+        self.goal = {servo_id: float(CENTER_TICKS) for servo_id in self.ids}
+        self.last_update = time.perf_counter()
+        self.last_sample_time = None
+        self.latencies = []  # state served -> goals received, s
+        self.num_sync_writes = 0
+        self.num_sync_reads = 0
+
+        if kind == "socket":
+            device, client = socket.socketpair()
+            self.device = FdTransport(device.detach(), timeout=0.1)
+            self.client_transport = FdTransport(client.detach())
+            self.port = None
+        elif kind == "pty":
+            master, slave = pty.openpty()
+            tty.setraw(master)
+            self.port = os.ttyname(slave)
+            self._slave = slave  # keeps the pty alive until a client opens it
+            self.device = FdTransport(master, timeout=0.1)
+            self.client_transport = None
+        else:
+            raise ValueError(f"Unknown fake bus kind {kind}, use 'socket' or 'pty'")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.device.close()
+        if self.port is not None:
+            os.close(self._slave)
+
+    def _advance(self):
+        now = time.perf_counter()
+        dt, self.last_update = now - self.last_update, now
+        for servo_id in self.ids:
+            error = self.goal[servo_id] - self.position[servo_id]
+            step = max(-self.max_speed * dt, min(self.max_speed * dt, error))
+            self.position[servo_id] += step
+            self.speed[servo_id] = step / dt if dt > 0 else 0.0
+
+    def _wire(self, num_bytes: int):
+        if self.byte_time:
+            time.sleep(num_bytes * self.byte_time)
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                servo_id, instruction, params = read_packet(self.device)
+            except BusError:
+                continue
+            self._wire(len(params) + 6)
+            self._advance()
+            if instruction == INST_SYNC_WRITE:
+                address, size = params[0], params[1]
+                if address == ADDR_GOAL_POSITION and size == 2:
+                    for target_id, ticks in struct.iter_unpack("<BH", params[2:]):
+                        if target_id in self.goal:
+                            self.goal[target_id] = float(ticks)
+                    if self.last_sample_time is not None:
+                        self.latencies.append(time.perf_counter() - self.last_sample_time)
+                        self.last_sample_time = None
+                self.num_sync_writes += 1
+            elif instruction == INST_SYNC_READ:
+                address, size = params[0], params[1]
+                if address != ADDR_PRESENT_POSITION or size != 4:
+                    continue
+                self.last_sample_time = time.perf_counter()
+                replies = bytearray()
+                for target_id in params[2:]:
+                    if target_id not in self.position:
+                        continue
+                    ticks = int(round(self.position[target_id]))
+                    speed = encode_signed(int(round(self.speed[target_id])))
+                    replies += make_packet(target_id, 0, struct.pack("<HH", ticks, speed))
+                self._wire(len(replies))
+                self.device.write(bytes(replies))
+                self.num_sync_reads += 1
+            elif instruction == INST_PING and servo_id in self.position:
+                self.device.write(make_packet(servo_id, 0))
@@ -0,0 +1,261 @@
+import array
+import hashlib
+import json
+import os
+import struct
+
+# Incremental index of the scalar series in tensorboard event files, readable without tensorboard, protobuf or torch.
+#   <index root>/<run name>-<hash of run path>/meta.json    source event files with the byte offset read up to, and
+#                                                           the tags with their column file and number of points
+#   <index root>/<run name>-<hash of run path>/c<n>.step    int64 steps of one tag
+#   <index root>/<run name>-<hash of run path>/c<n>.value   float32 values of one tag
+# Updating a run only reads the records appended since the last update. Queries load the two columns of the tags
+# they ask for, one run at a time.
+EVENT_FILE_PREFIX = "events.out.tfevents."
+META_FILE = "meta.json"
+
+# tensorflow DataType enum values of scalar tensor summaries
+_DT_FLOAT, _DT_DOUBLE = 1, 2
+
+
+def _varint(buf, pos: int):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf):
+    """
+    Yields (field number, wire type, value) of a serialized protobuf message. Varints are returned as ints, every
+    other wire type as a memoryview of its bytes.
+    """
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        wire_type = key & 7
+        if wire_type == 0:
+            value, pos = _varint(buf, pos)
+        elif wire_type == 1:
+            value, pos = buf[pos:pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = _varint(buf, pos)
+            value, pos = buf[pos:pos + length], pos + length
+        elif wire_type == 5:
+            value, pos = buf[pos:pos + 4], pos + 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield key >> 3, wire_type, value
+
+
+def _tensor_scalar(buf):
+    # TensorProto: dtype = 1, tensor_content = 4, float_val = 5, double_val = 6
+    dtype, content, value = None, None, None
+    for number, wire_type, field in _fields(buf):
+        if number == 1:
+            dtype = field
+        elif number == 4:
+            content = field
+        elif number == 5:
+            value = struct.unpack_from("<f", field)[0] if len(field) >= 4 else None
+        elif number == 6:
+            value = struct.unpack_from("<d", field)[0] if len(field) >= 8 else None
+    if value is None and content is not None:
+        if dtype == _DT_FLOAT and len(content) == 4:
+            value = struct.unpack("<f", content)[0]
+        elif dtype == _DT_DOUBLE and len(content) == 8:
+            value = struct.unpack("<d", content)[0]
+    return value
+
+
+def decode_scalars(event):
+    """
+    Scalars of one serialized Event (step = 2, summary = 5), from simple_value or scalar float tensor summaries.
+    Histograms, images and text are skipped.
+
+    :return: (step, [(tag, value), ...])
+    """
+    step, scalars = 0, []
+    for number, _, field in _fields(event):
+        if number == 2:
+            step = field
+        elif number == 5:
+            for value_number, _, value in _fields(field):
+                if value_number != 1:
+                    continue
+                # Summary.Value: tag = 1, simple_value = 2, tensor = 8
+                tag, scalar = None, None
+                for item_number, _, item in _fields(value):
+                    if item_number == 1:
+                        tag = bytes(item).decode()
+                    elif item_number == 2:
+                        scalar = struct.unpack("<f", item)[0]
+                    elif item_number == 8:
+                        scalar = _tensor_scalar(item)
+                if tag is not None and scalar is not None:
+                    scalars.append((tag, scalar))
+    return step, scalars
+
+
+def read_records(path: str, offset: int = 0):
+    """
+    Yields (offset after the record, record bytes) of the TFRecords in an event file, starting at ``offset``.
+    Stops at a record that is still being written, it is picked up by the next read. CRCs are not checked.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            header = f.read(12)  # uint64 length, uint32 masked crc of the length
+            if len(header) < 12:
+                return
+            (length,) = struct.unpack_from("<Q", header)
+            data = f.read(length + 4)  # record, uint32 masked crc of the record
+            if len(data) < length + 4:
+                return
+            offset += 16 + length
+            yield offset, memoryview(data)[:length]
+
+
+def find_runs(roots) -> list:
+    """
+    Directories under ``roots`` (or the roots themselves) that contain event files, skipping hidden directories.
+    """
+    runs = []
+    for root in roots:
+        for directory, subdirs, files in os.walk(root):
+            subdirs[:] = sorted(d for d in subdirs if not d.startswith("."))
+            if any(name.startswith(EVENT_FILE_PREFIX) for name in files):
+                runs.append(directory)
+    return runs
+
+
+class RunIndex:
+    """
+    Columnar scalar index of one run directory.
+    """
+
+    def __init__(self, run_dir: str, index_root: str):
+        self.run_dir = run_dir
+        run_path = os.path.abspath(run_dir)
+        name = os.path.basename(run_path)
+        self.path = os.path.join(index_root, f"{name}-{hashlib.sha1(run_path.encode()).hexdigest()[:8]}")
+        meta_path = os.path.join(self.path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {"run_dir": run_path, "files": {}, "tags": {}}
+
+    def _column_path(self, column: str, kind: str) -> str:
+        return os.path.join(self.path, f"{column}.{kind}")
+
+    def _clear(self):
+        for entry in self.meta["tags"].values():
+            for kind in ("step", "value"):
+                if os.path.exists(self._column_path(entry["column"], kind)):
+                    os.remove(self._column_path(entry["column"], kind))
+        self.meta["files"], self.meta["tags"] = {}, {}
+
+    def update(self) -> int:
+        """
+        Appends the scalars written since the last update.
+
+        :return: number of new points
+        """
+        names = sorted(name for name in os.listdir(self.run_dir) if name.startswith(EVENT_FILE_PREFIX))
+        indexed = {os.path.join(self.run_dir, name): offset for name, offset in self.meta["files"].items()}
+        if any(not os.path.exists(path) or os.path.getsize(path) < offset for path, offset in indexed.items()):
+            # an event file was removed or rewritten, rebuild the run
+            self._clear()
+
+        new = {}
+        for name in names:
+            offset = self.meta["files"].get(name, 0)
+            for offset, record in read_records(os.path.join(self.run_dir, name), offset):
+                step, scalars = decode_scalars(record)
+                for tag, value in scalars:
+                    if tag not in new:
+                        new[tag] = (array.array("q"), array.array("f"))
+                    new[tag][0].append(step)
+                    new[tag][1].append(value)
+            self.meta["files"][name] = offset
+        if not new and os.path.exists(os.path.join(self.path, META_FILE)):
+            return 0
+
+        os.makedirs(self.path, exist_ok=True)
+        for tag, (steps, values) in new.items():
+            entry = self.meta["tags"].setdefault(tag, {"column": f"c{len(self.meta['tags'])}", "count": 0})
+            for kind, column in (("step", steps), ("value", values)):
+                path = self._column_path(entry["column"], kind)
+                with open(path, "ab") as f:
+                    # drop points appended by an update that crashed before it wrote meta.json
+                    f.truncate(entry["count"] * column.itemsize)
+                    column.tofile(f)
+            entry["count"] += len(steps)
+        tmp_path = os.path.join(self.path, META_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+        return sum(len(steps) for steps, _ in new.values())
+
+    def tags(self) -> list:
+        return sorted(self.meta["tags"])
+
+    def num_points(self) -> int:
+        return sum(entry["count"] for entry in self.meta["tags"].values())
+
+    def series(self, tag: str):
+        """
+        :return: (steps, values) arrays, empty if the run never logged ``tag``
+        """
+        steps, values = array.array("q"), array.array("f")
+        entry = self.meta["tags"].get(tag)
+        if entry is not None:
+            for column, kind in ((steps, "step"), (values, "value")):
+                with open(self._column_path(entry["column"], kind), "rb") as f:
+                    column.fromfile(f, entry["count"])
+        return steps, values
+
+
+def smooth(values, window: int) -> list:
+    """
+    Trailing moving average over ``window`` points.
+    """
+    if window <= 1:
+        return list(values)
+    smoothed, total = [], 0.0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+        smoothed.append(total / min(i + 1, window))
+    return smoothed
+
+
+def best(steps, values, minimize: bool = False, window: int = 1):
+    """
+    :return: (step, smoothed value) of the best point, or None for an empty series
+    """
+    if not steps:
+        return None
+    smoothed = smooth(values, window)
+    pick = min if minimize else max
+    i = pick(range(len(smoothed)), key=smoothed.__getitem__)
+    return steps[i], smoothed[i]
+
+
+def align(series_a, series_b, window: int = 1) -> list:
+    """
+    Points of two (steps, values) series at the steps both logged. A step logged twice, e.g. by a resumed run,
+    keeps its last value.
+
+    :return: [(step, value a, value b), ...] in step order
+    """
+    by_step = []
+    for steps, values in (series_a, series_b):
+        by_step.append(dict(zip(steps, smooth(values, window))))
+    return [(step, by_step[0][step], by_step[1][step]) for step in sorted(by_step[0].keys() & by_step[1].keys())]
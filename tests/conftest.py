@@ -0,0 +1,25 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def genesis():
+    """
+    Genesis initialized once for the whole test session on CPU, it cannot be initialized twice in one process.
+    """
+    gs = pytest.importorskip("genesis")
+    gs.init(logging_level="warning", backend=gs.cpu)
+    return gs
+
+
+@pytest.fixture
+def make_env(genesis):
+    def make(num_envs=2, env_overrides=None, obs_overrides=None):
+        from env import ServobotEnv
+        from train import get_cfgs
+
+        env_cfg, obs_cfg, reward_cfg, command_cfg, _ = get_cfgs()
+        env_cfg.update(env_overrides or {})
+        obs_cfg.update(obs_overrides or {})
+        return ServobotEnv(num_envs, env_cfg, obs_cfg, reward_cfg, command_cfg)
+
+    return make
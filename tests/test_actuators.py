@@ -0,0 +1,62 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.actuators import ActuatorNet, LearnedActuator, ServoActuator, make_actuator, servo_torques
+
+SERVO_CFG = {"deadband": 0.01, "stall_torque": 2.0, "no_load_speed": 5.0, "torque_constant": 0.5, "current_limit": 2.0}
+
+
+def _torques(error, vel=0.0, kp=20.0, kv=0.0, strength=1.0):
+    return servo_torques(
+        torch.tensor([error]), torch.tensor([0.0]), torch.tensor([vel]), kp, kv, torch.tensor([strength]),
+        deadband=0.01, stall_torque=2.0, no_load_speed=5.0, torque_limit=1.0,
+    ).item()
+
+
+def test_servo_deadband_and_limits():
+    assert _torques(0.005) == 0.0
+    assert _torques(0.02) == pytest.approx(20.0 * 0.01)
+    assert _torques(1.0) == pytest.approx(1.0)  # current limit
+    assert _torques(-1.0) == pytest.approx(-1.0)
+    # at the no-load speed there is no torque left in the direction of motion, only against it
+    assert _torques(1.0, vel=5.0) == pytest.approx(0.0)
+    assert _torques(-1.0, vel=5.0) == pytest.approx(-1.0)
+
+
+def test_servo_strength_never_exceeds_limits():
+    # a strong motor pushes harder below saturation but saturates at the same limits
+    assert _torques(0.02, strength=1.2) == pytest.approx(1.2 * 20.0 * 0.01)
+    assert _torques(1.0, strength=1.2) == pytest.approx(1.0)
+    assert _torques(-1.0, vel=2.5, strength=1.2) == pytest.approx(-1.0)
+    # a weak one saturates proportionally lower
+    assert _torques(1.0, strength=0.8) == pytest.approx(0.8)
+
+
+def test_make_actuator_types():
+    assert make_actuator({"type": "pd"}, 2, 12, "cpu") is None
+    assert isinstance(make_actuator({"type": "servo", **SERVO_CFG}, 2, 12, "cpu"), ServoActuator)
+    with pytest.raises(ValueError):
+        make_actuator({"type": "ideal"}, 2, 12, "cpu")
+
+
+def test_learned_history_advances_once_per_control_step(tmp_path):
+    path = str(tmp_path / "net.pt")
+    torch.jit.script(ActuatorNet(history_length=3)).save(path)
+    actuator = LearnedActuator({"network_path": path, **SERVO_CFG}, 1, 2, "cpu")
+    zeros, ones = torch.zeros(1, 2), torch.ones(1, 2)
+
+    for control_step in range(1, 3):
+        actuator.begin_step()
+        for substep in range(4):
+            # error = target, velocity = 10 * target
+            target = ones * (10 * control_step + substep)
+            actuator.compute(target, zeros, target * 10, 20.0, 0.5, ones)
+    errors = actuator.inputs[0, 0, :3].tolist()
+    velocities = actuator.inputs[0, 0, 3:].tolist()
+    # newest first: the latest substep, then the last substep of the previous control step, then the initial zeros
+    assert errors == [23.0, 13.0, 0.0]
+    assert velocities == [230.0, 130.0, 0.0]
+
+    actuator.reset(torch.tensor([0]))
+    assert actuator.inputs.abs().sum() == 0
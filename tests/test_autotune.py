@@ -0,0 +1,48 @@
+import json
+import subprocess
+
+import pytest
+
+pytest.importorskip("torch")
+
+from src import autotune
+
+OBS_CFG = {"num_obs": 45, "history_length": 1}
+ENV_CFG = {"num_actions": 12}
+
+
+def test_rollout_storage_bytes():
+    per_sample = 2 * 45 + 3 * 12 + 6
+    assert autotune.rollout_storage_bytes(1000, 24, OBS_CFG, ENV_CFG) == 1000 * 24 * per_sample * 4
+
+
+def _fake_probes(monkeypatch, measurements, total_bytes=10 * autotune.GIB):
+    # measurements: {num_envs: (steps_per_sec, peak_memory_bytes) or None for a failed probe}
+    def run(cmd, **kwargs):
+        num_envs = int(cmd[cmd.index("--probe") + 1])
+        if measurements[num_envs] is None:
+            return subprocess.CompletedProcess(cmd, 1, "", "CUDA out of memory")
+        sps, peak = measurements[num_envs]
+        out = json.dumps({"num_envs": num_envs, "steps_per_sec": sps, "peak_memory_bytes": peak})
+        return subprocess.CompletedProcess(cmd, 0, out + "\n", "")
+
+    monkeypatch.setattr(autotune.subprocess, "run", run)
+    monkeypatch.setattr(autotune, "_device_total_bytes", lambda cpu: total_bytes)
+
+
+def test_picks_fastest_with_batch_near_target(monkeypatch):
+    gib = autotune.GIB
+    _fake_probes(monkeypatch, {1024: (1e5, gib), 4096: (3e5, gib), 16384: (9e5, gib), 65536: None})
+    result = autotune.auto_tune(ENV_CFG, OBS_CFG, [1024, 4096, 16384, 65536], target_batch=4096 * 24)
+    # 16384 envs clamp to 16 steps, a batch of 262144, 2.7x the target
+    assert result["num_envs"] == 4096 and result["num_steps_per_env"] == 24 and result["batch"] == 4096 * 24
+    assert [p["num_envs"] for p in result["probes"]] == [1024, 4096, 16384]
+    assert result["probes"][2]["batch"] == 16384 * 16
+
+
+def test_stops_at_memory_ceiling(monkeypatch):
+    gib = autotune.GIB
+    _fake_probes(monkeypatch, {2048: (2e5, gib), 4096: (3e5, 9 * gib)})
+    result = autotune.auto_tune(ENV_CFG, OBS_CFG, [2048, 4096], target_batch=4096 * 24)
+    assert result["num_envs"] == 2048
+    assert result["memory_ceiling_gib"] == pytest.approx(8.0)
@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.checkpoints import (
+    CheckpointStore,
+    load_checkpoint,
+    resolve_checkpoint,
+    run_key,
+    write_pointer,
+)
+
+
+def _checkpoint(it, shared):
+    return {
+        "model_state_dict": {"actor.0.weight": torch.randn(4, 3), "teacher.weight": shared},
+        "optimizer_state_dict": {"state": {0: {"exp_avg": torch.randn(4, 3)}}, "param_groups": [{"lr": 1e-3}]},
+        "iter": it,
+        "infos": None,
+        "shape": (4, 3),
+    }
+
+
+def _num_objects(store):
+    return sum(len(files) for _, _, files in os.walk(store.objects_dir))
+
+
+def test_put_get_roundtrip(tmp_path):
+    store = CheckpointStore(str(tmp_path / "store"))
+    checkpoint = _checkpoint(10, torch.randn(5))
+    store.put("run/model_10", checkpoint)
+    loaded = store.get("run/model_10")
+    assert loaded["iter"] == 10 and loaded["infos"] is None and loaded["shape"] == (4, 3)
+    assert torch.equal(loaded["model_state_dict"]["actor.0.weight"], checkpoint["model_state_dict"]["actor.0.weight"])
+    exp_avg = loaded["optimizer_state_dict"]["state"][0]["exp_avg"]  # int keys survive the JSON manifest
+    assert torch.equal(exp_avg, checkpoint["optimizer_state_dict"]["state"][0]["exp_avg"])
+    assert loaded["optimizer_state_dict"]["param_groups"] == [{"lr": 1e-3}]
+
+
+def test_shared_tensors_stored_once(tmp_path):
+    store = CheckpointStore(str(tmp_path / "store"))
+    shared = torch.randn(100)
+    store.put("run/model_0", _checkpoint(0, shared))
+    objects = _num_objects(store)
+    store.put("run/model_1", _checkpoint(1, shared.clone()))
+    assert _num_objects(store) == objects + 2  # new actor weight and exp_avg, the teacher is deduplicated
+
+
+def test_inference_copy_is_fp16_policy_only(tmp_path):
+    store = CheckpointStore(str(tmp_path / "store"))
+    checkpoint = _checkpoint(0, torch.randn(5))
+    store.put_inference_copy("run/model_0", checkpoint)
+    copy = store.get("run/model_0.fp16")
+    assert set(copy) == {"model_state_dict"}
+    assert copy["model_state_dict"]["actor.0.weight"].dtype == torch.float16
+    as_fp32 = store.get("run/model_0.fp16", dtype=torch.float32)["model_state_dict"]["actor.0.weight"]
+    assert torch.allclose(as_fp32, checkpoint["model_state_dict"]["actor.0.weight"], atol=1e-2)
+
+
+def test_prune_and_gc(tmp_path):
+    store = CheckpointStore(str(tmp_path / "store"))
+    for it in (0, 50, 100):
+        store.put(f"run/model_{it}", _checkpoint(it, torch.randn(5)))
+    assert store.keys("run/") == ["run/model_0", "run/model_50", "run/model_100"]
+    assert store.prune_optimizer("run", keep_last=1) == 2
+    assert "optimizer_state_dict" not in store.get("run/model_50")
+    assert "optimizer_state_dict" in store.get("run/model_100")
+
+    before = _num_objects(store)
+    # objects just written may belong to another process' checkpoint in progress
+    assert store.gc() == (0, 0)
+    removed, freed = store.gc(grace_s=0.0)
+    assert removed == 2 and freed > 0 and _num_objects(store) == before - 2
+    for key in store.keys():
+        store.get(key)["model_state_dict"]["actor.0.weight"].sum()
+
+
+def test_run_key_distinguishes_same_name(tmp_path):
+    assert run_key(str(tmp_path / "a" / "walk")) != run_key(str(tmp_path / "b" / "walk"))
+    assert run_key(str(tmp_path / "a" / "walk")).startswith("walk-")
+
+
+def test_pointer_resolution(tmp_path):
+    store = CheckpointStore(str(tmp_path / "store"))
+    run_dir = tmp_path / "logs" / "run"
+    run_dir.mkdir(parents=True)
+    checkpoint = _checkpoint(7, torch.randn(5))
+    key = f"{run_key(str(run_dir))}/model_7"
+    store.put(key, checkpoint)
+    store.put_inference_copy(key, checkpoint)
+    write_pointer(str(run_dir / "model_7.ckpt.json"), store, key)
+
+    path = resolve_checkpoint(str(run_dir / "model_7.pt"))
+    assert path.endswith("model_7.ckpt.json")
+    assert load_checkpoint(path)["iter"] == 7
+    weight = load_checkpoint(path, inference=True)["model_state_dict"]["actor.0.weight"]
+    assert weight.dtype == torch.float32
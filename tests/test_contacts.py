@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.contacts import FootContacts
+
+
+class _Robot:
+    # two envs, links 0-2, the feet are links 1 and 2
+    def __init__(self):
+        self.forces = torch.zeros(2, 3, 3)
+        self.velocities = torch.zeros(2, 3, 3)
+
+    def get_joint(self, name):
+        return SimpleNamespace(link=SimpleNamespace(idx_local={"left": 1, "right": 2}[name]))
+
+    def get_links_net_contact_force(self):
+        return self.forces
+
+    def get_links_vel(self):
+        return self.velocities
+
+
+def _contacts():
+    robot = _Robot()
+    env = SimpleNamespace(robot=robot, dt=0.02, num_envs=2, base_pos=torch.zeros(2, 3))
+    return robot, FootContacts(env, ["left", "right"], threshold=1.0)
+
+
+def test_contact_is_filtered_over_two_steps():
+    robot, contacts = _contacts()
+    robot.forces[0, 1, 2] = 5.0
+    contacts.update()
+    assert contacts.contact[0].tolist() == [True, False]
+    robot.forces[0, 1, 2] = 0.0  # one step reported airborne
+    contacts.update()
+    assert contacts.contact[0].tolist() == [True, False]
+    contacts.update()
+    assert contacts.contact[0].tolist() == [False, False]
+
+
+def test_air_time_of_finished_swing():
+    robot, contacts = _contacts()
+    for _ in range(2):
+        contacts.update()  # both feet airborne
+    robot.forces[:, 2, 2] = 5.0
+    contacts.update()
+    assert contacts.first_contact[:, 1].all() and not contacts.first_contact[:, 0].any()
+    assert contacts.last_air_time[:, 1].tolist() == pytest.approx([0.06, 0.06])
+    assert contacts.air_time[:, 1].tolist() == [0.0, 0.0]
+    assert contacts.num_in_contact().tolist() == [1, 1]
+    contacts.update()
+    assert not contacts.first_contact.any()
+
+
+def test_reset_counts_feet_as_grounded():
+    robot, contacts = _contacts()
+    contacts.update()
+    contacts.reset(torch.tensor([1]))
+    assert contacts.contact[1].all() and not contacts.contact[0].any()
+    assert contacts.air_time[1].sum() == 0
@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("torch")
+
+from src.deployment import StaticImu, make_imu
+
+
+def test_static_imu_refused_on_real_servos():
+    with pytest.raises(ValueError, match="--allow-static-imu"):
+        make_imu({"type": "static"}, simulated=False)
+    assert isinstance(make_imu({"type": "static"}, simulated=False, allow_static=True), StaticImu)
+
+
+def test_imu_required_on_real_servos():
+    with pytest.raises(ValueError, match="No IMU configured"):
+        make_imu({"type": None}, simulated=False, allow_static=True)
+    assert isinstance(make_imu(None, simulated=True), StaticImu)
+
+
+def test_unknown_imu_type():
+    with pytest.raises(ValueError, match="Unknown IMU type"):
+        make_imu({"type": "bno055"}, simulated=True)
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("rsl_rl")
+
+from src.distillation import TeacherDataset
+
+
+def _chunk(start, size=8):
+    obs = torch.arange(start, start + size, dtype=torch.float32).unsqueeze(1).repeat(1, 3)
+    return obs, obs[:, :2] * 10
+
+
+def test_sample_keeps_pairs_and_chunks_on_host():
+    dataset = TeacherDataset(max_chunks=3, device="cpu")
+    for start in (0, 100, 200, 300):
+        dataset.add(*_chunk(start))
+    assert len(dataset) == 24  # the oldest chunk was evicted
+    assert all(obs.device.type == "cpu" for obs, _ in dataset.chunks)
+    obs, actions = dataset.sample(64)
+    assert obs.shape == (64, 3) and actions.shape == (64, 2)
+    assert torch.equal(actions, obs[:, :2] * 10)
+    assert obs.min() >= 100
+
+
+def test_sample_does_not_alias_staging():
+    dataset = TeacherDataset(max_chunks=2, device="cpu")
+    dataset.add(*_chunk(0))
+    batches = [dataset.sample(16) for _ in range(3)]
+    kept = batches[0][0].clone()
+    dataset.sample(16)
+    assert torch.equal(batches[0][0], kept)
+
+
+def test_cache_reloads_newest_chunks_of_same_teacher(tmp_path, monkeypatch):
+    writer = TeacherDataset(max_chunks=10, device="cpu", storage_dir=str(tmp_path), teacher_id="a")
+    for start in (0, 100, 200):
+        writer.add(*_chunk(start))
+    TeacherDataset(max_chunks=10, device="cpu", storage_dir=str(tmp_path), teacher_id="b").add(*_chunk(900))
+
+    loaded = []
+    load = torch.load
+    monkeypatch.setattr(torch, "load", lambda path, **kwargs: loaded.append(path) or load(path, **kwargs))
+    reader = TeacherDataset(max_chunks=2, device="cpu", storage_dir=str(tmp_path), teacher_id="a")
+    assert [obs[0, 0].item() for obs, _ in reader.chunks] == [100.0, 200.0]
+    assert reader.num_saved == 3
+    # only the kept chunks of this teacher were read
+    assert sorted(os.path.basename(path) for path in loaded) == ["chunk_a_000001.pt", "chunk_a_000002.pt"]
+    assert len(TeacherDataset(max_chunks=5, device="cpu", storage_dir=str(tmp_path), teacher_id="c")) == 0
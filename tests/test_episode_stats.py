@@ -0,0 +1,89 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.episode_stats import EpisodeStatistics, TERMINATION_CAUSES
+
+
+def _record(stats, terms, lengths, full=None, cause=0):
+    terms = torch.as_tensor(terms, dtype=torch.float32)
+    causes = torch.zeros((terms.shape[1], len(TERMINATION_CAUSES)), dtype=torch.bool)
+    causes[:, cause] = True
+    stats.record(terms, torch.as_tensor(lengths), causes, None if full is None else torch.as_tensor(full))
+
+
+class _Writer:
+    def __init__(self):
+        self.scalars, self.histograms = {}, {}
+
+    def add_scalar(self, tag, value, step):
+        self.scalars[tag] = value
+
+    def add_histogram_raw(self, tag, **kwargs):
+        self.histograms[tag] = kwargs
+
+
+def test_moments_and_percentiles():
+    stats = EpisodeStatistics(["a"], num_bins=100, max_episode_length=1000, device="cpu", ranges={"a": [0.0, 1.0]})
+    values = torch.linspace(0.0, 1.0, 1001)
+    _record(stats, values.unsqueeze(0), torch.full((1001,), 500))
+    summary = stats.summary()
+    assert summary["a"]["mean"] == pytest.approx(0.5, abs=1e-4)
+    assert summary["a"]["std"] == pytest.approx(values.std(unbiased=False).item(), abs=1e-3)
+    for q in (5, 50, 95):
+        assert summary["a"][f"p{q}"] == pytest.approx(q / 100, abs=0.02)
+    assert summary["length"]["p50"] == pytest.approx(500, abs=1000 / 32 + 1)
+    assert summary["termination_timeout"] == 1.0 and summary["termination_pitch"] == 0.0
+
+
+def test_truncated_episodes_do_not_collapse_calibration():
+    stats = EpisodeStatistics(["a"], num_bins=10, max_episode_length=1000, device="cpu", calibration_episodes=4)
+    # a randomized start ends a few episodes after one step with near-zero sums
+    _record(stats, [[0.0, 0.0001]], [1, 1], full=[False, False])
+    assert stats.summary()["a"].keys().isdisjoint({"p50", "edges"})
+    _record(stats, [[-2.0, 2.0, 0.5, 1.0]], [1000] * 4, full=[True] * 4)
+    summary = stats.summary()
+    # spread 4 padded by 2 on both sides, calibrated from the full episodes only
+    assert summary["a"]["edges"][0].item() == pytest.approx(-4.0)
+    assert summary["a"]["edges"][-1].item() == pytest.approx(4.0)
+    assert summary["a"]["counts"].sum().item() == 6  # the pending episodes were binned too
+
+
+def test_flush_before_calibration_writes_moments_only():
+    stats = EpisodeStatistics(["a"], num_bins=10, max_episode_length=1000, device="cpu", calibration_episodes=100)
+    _record(stats, [[1.0, 3.0]], [10, 20])
+    writer = _Writer()
+    stats.flush(writer, 0)
+    assert writer.scalars["Episode/rew_a"] == pytest.approx(2.0)
+    assert "Episode/rew_a_p50" not in writer.scalars and not writer.histograms
+    assert stats.count == 0 and not stats._pending
+
+
+def test_flush_writes_histograms_and_resets():
+    stats = EpisodeStatistics(["a"], num_bins=8, max_episode_length=100, device="cpu", ranges={"a": [0.0, 8.0]})
+    _record(stats, [[0.5, 1.5, 1.5, 7.5]], [100] * 4, cause=2)
+    writer = _Writer()
+    stats.flush(writer, 3)
+    assert writer.histograms["Episode/rew_a"]["bucket_counts"] == [1.0, 2.0, 0, 0, 0, 0, 0, 1.0]
+    assert writer.scalars["Episode/termination_roll"] == 1.0
+    assert stats.count == 0 and stats.histogram.sum() == 0
+
+
+def test_calibrated_ranges_follow_drift():
+    stats = EpisodeStatistics(
+        ["a", "b"], num_bins=10, max_episode_length=100, device="cpu", ranges={"b": [0.0, 1.0]}, calibration_episodes=2
+    )
+    _record(stats, [[0.0, 1.0], [0.0, 1.0]], [100, 100])
+    stats.flush(_Writer(), 0)
+    assert (stats.low[0].item(), stats.high[0].item()) == pytest.approx((-0.5, 1.5))
+
+    # returns grow past the calibrated range: refitted after the flush, the fixed range stays
+    _record(stats, [[10.0, 20.0], [10.0, 20.0]], [100, 100])
+    writer = _Writer()
+    stats.flush(writer, 1)
+    assert writer.histograms["Episode/rew_a"]["bucket_counts"][-1] == 2.0
+    assert (stats.low[0].item(), stats.high[0].item()) == pytest.approx((5.0, 25.0))
+    assert (stats.low[1].item(), stats.high[1].item()) == (0.0, 1.0)
+    _record(stats, [[12.0, 18.0], [0.5, 0.5]], [100, 100])
+    assert stats.summary()["a"]["counts"][2:8].sum().item() == 2.0
+    assert stats.overflow[0].item() == 0.0
@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.gait import GaitTable, foot_offsets
+
+SHAPE = (4, 3, 3, 3)
+RANGES = [[-1.0, 1.0], [-0.5, 0.5], [-2.0, 2.0]]
+
+
+@pytest.fixture
+def table(tmp_path):
+    # each entry holds its own grid coordinates, so multilinear interpolation reproduces them exactly
+    grid = torch.stack(torch.meshgrid(*(torch.arange(n, dtype=torch.float32) for n in SHAPE), indexing="ij"), dim=-1)
+    path = str(tmp_path / "gait_table.pt")
+    torch.save({"table": grid, "joint_names": ["p", "x", "y", "yaw"], "command_ranges": RANGES}, path)
+    return GaitTable(path, "cpu")
+
+
+def _lookup(table, phase, command):
+    return table.lookup(torch.tensor([phase]), torch.tensor([command])).squeeze(0).tolist()
+
+
+def test_exact_at_grid_points(table):
+    assert _lookup(table, 0.0, [-1.0, -0.5, -2.0]) == pytest.approx([0, 0, 0, 0])
+    assert _lookup(table, 0.25, [0.0, 0.5, 2.0]) == pytest.approx([1, 1, 2, 2])
+    assert _lookup(table, 0.75, [1.0, 0.0, -2.0]) == pytest.approx([3, 2, 1, 0])
+
+
+def test_interpolates_between_grid_points(table):
+    assert _lookup(table, 0.125, [0.5, -0.25, 1.0]) == pytest.approx([0.5, 1.5, 0.5, 1.5])
+
+
+def test_phase_wraps(table):
+    # halfway between the last phase bin and the first
+    assert _lookup(table, 0.875, [0.0, 0.0, 0.0])[0] == pytest.approx(1.5)
+    assert _lookup(table, 1.25, [0.0, 0.0, 0.0]) == pytest.approx(_lookup(table, 0.25, [0.0, 0.0, 0.0]))
+
+
+def test_commands_clamp_to_grid(table):
+    assert _lookup(table, 0.0, [5.0, -5.0, 3.0]) == pytest.approx([0, 2, 0, 2])
+
+
+def test_batched_lookup(table):
+    phase = torch.tensor([0.0, 0.5])
+    commands = torch.tensor([[-1.0, -0.5, -2.0], [1.0, 0.5, 2.0]])
+    first, second = table.lookup(phase, commands).tolist()
+    assert first == pytest.approx([0, 0, 0, 0])
+    assert second == pytest.approx([2, 2, 2, 2])
+
+
+def test_foot_offsets():
+    period, height = 0.5, 0.03
+    # standing still only lifts the swing leg, peaking mid-swing
+    assert foot_offsets(0.25, (0.0, 0.0, 0.0), period, height, (0.1, 0.06), 0.0) == pytest.approx((0, 0, height))
+    # a foot lands ahead of the hip and is pushed back by the commanded speed over the stance
+    half_stride = 0.5 * 0.4 * period * 0.5
+    assert foot_offsets(0.5, (0.4, 0.0, 0.0), period, height, (0.1, 0.06), 0.0) == pytest.approx((half_stride, 0, 0))
+    assert foot_offsets(0.0, (0.4, 0.0, 0.0), period, height, (0.1, 0.06), 0.5)[0] == pytest.approx(half_stride)
+    # yawing moves a front-left hip backward and left
+    dx, dy, _ = foot_offsets(0.5, (0.0, 0.0, 1.0), period, height, (0.1, 0.06), 0.0)
+    assert dx < 0 and dy > 0
+    assert math.hypot(dx, dy) == pytest.approx(0.5 * math.hypot(0.1, 0.06) * period * 0.5)
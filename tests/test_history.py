@@ -0,0 +1,58 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.history import ObservationHistory
+
+
+def _frame(num_envs, frame_dim, value):
+    return torch.full((num_envs, frame_dim), float(value))
+
+
+@pytest.mark.parametrize("length", [1, 3, 4])
+def test_frames_oldest_first(length):
+    history = ObservationHistory(2, 5, length, device="cpu")
+    for value in range(1, 8):
+        history.push(_frame(2, 5, value))
+        expected = [max(0, value - length + 1 + i) for i in range(length)]
+        assert history.frames[0, :, 0].tolist() == expected
+        assert history.latest[0, 0].item() == value
+    assert history.flat.shape == (2, length * 5)
+    assert torch.equal(history.flat[1], history.frames[1].reshape(-1))
+
+
+def test_strided_ends_at_newest():
+    history = ObservationHistory(1, 1, 5, device="cpu")
+    for value in range(1, 6):
+        history.push(_frame(1, 1, value))
+    assert history.strided(2)[0, :, 0].tolist() == [1, 3, 5]
+    assert history.strided(3)[0, :, 0].tolist() == [2, 5]
+
+
+def test_reset_only_zeroes_given_envs():
+    history = ObservationHistory(3, 2, 2, device="cpu")
+    history.push(_frame(3, 2, 1))
+    history.reset(torch.tensor([1]))
+    assert history.flat[1].abs().sum() == 0
+    assert history.flat[0].abs().sum() > 0 and history.flat[2].abs().sum() > 0
+
+
+@pytest.mark.parametrize("length", [1, 3])
+def test_flat_aliases_buffer(length):
+    history = ObservationHistory(2, 4, length, device="cpu")
+    history.push(_frame(2, 4, 1))
+    view, copy = history.flat, history.flat.clone()
+    history.push(_frame(2, 4, 2))
+    # the view moves with the ring buffer, which is why the env hands out copies
+    assert not torch.equal(view, copy)
+
+
+@pytest.mark.parametrize("length", [1, 3])
+def test_env_observation_unchanged_by_next_step(make_env, length):
+    env = make_env(obs_overrides={"history_length": length})
+    env.reset()
+    actions = torch.zeros((env.num_envs, env.num_actions), device=env.base_pos.device)
+    obs, *_ = env.step(actions.normal_(0.0, 0.5))
+    kept = obs["policy"].clone()
+    env.step(actions.normal_(0.0, 0.5))
+    assert torch.equal(obs["policy"], kept)
@@ -0,0 +1,38 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.latency import DelayQueue
+
+
+def _push(queue, value):
+    return queue.push(torch.full((queue.num_envs, 1), float(value))).squeeze(1).tolist()
+
+
+def test_per_env_delays():
+    queue = DelayQueue(3, 1, max_delay=2, device="cpu")
+    queue.delay[:] = torch.tensor([0, 1, 2])
+    outputs = [_push(queue, value) for value in range(1, 6)]
+    # delayed envs read zeros until their first value comes out
+    assert outputs == [[1, 0, 0], [2, 1, 0], [3, 2, 1], [4, 3, 2], [5, 4, 3]]
+
+
+def test_zero_max_delay_passes_through():
+    queue = DelayQueue(2, 1, max_delay=0, device="cpu")
+    assert _push(queue, 7) == [7, 7]
+
+
+def test_reset_clears_only_given_envs():
+    queue = DelayQueue(2, 1, max_delay=1, device="cpu")
+    queue.delay[:] = 1
+    _push(queue, 1)
+    queue.reset(torch.tensor([0]))
+    assert _push(queue, 2) == [0, 1]
+
+
+def test_resample_delay_range():
+    queue = DelayQueue(64, 1, max_delay=3, device="cpu")
+    queue.resample_delay(torch.arange(64), [1, 3])
+    assert queue.delay.min() >= 1 and queue.delay.max() <= 3
+    with pytest.raises(ValueError):
+        queue.resample_delay(torch.arange(64), [0, 4])
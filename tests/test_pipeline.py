@@ -0,0 +1,25 @@
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("rsl_rl")
+
+from src.pipeline import PipelinedOnPolicyRunner
+
+
+class _FailingAlg:
+    def update(self):
+        raise FloatingPointError("nan in the value loss")
+
+
+def test_update_error_reaches_learn_thread():
+    runner = object.__new__(PipelinedOnPolicyRunner)
+    runner.alg = _FailingAlg()
+    runner._correct_policy_lag = lambda storage: 1.0
+    result = {}
+    learner = threading.Thread(target=runner._update, args=(None, None, result))
+    learner.start()
+    learner.join()
+    assert isinstance(result["error"], FloatingPointError)
+    assert "loss_dict" not in result
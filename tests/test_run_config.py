@@ -0,0 +1,61 @@
+import os
+import pickle
+
+import pytest
+
+from src.run_config import CONFIG_FILE, LEGACY_CONFIG_FILE, SCHEMA_VERSION, RunConfig
+
+
+def _legacy_cfgs():
+    env = {"kp": 20.0, "kv": 0.5, "num_actions": 12}
+    return [env, {"num_obs": 45}, {"scales": {"tracking_lin_vel": 1.0}}, {"num_commands": 3}, {"seed": 1}]
+
+
+def test_migrates_legacy_pickle(tmp_path):
+    with open(tmp_path / LEGACY_CONFIG_FILE, "wb") as f:
+        pickle.dump(_legacy_cfgs(), f)
+    cfg = RunConfig.load(str(tmp_path))
+    assert cfg.schema_version == SCHEMA_VERSION
+    assert cfg.env["default_kp"] == 20.0 and cfg.env["default_kv"] == 0.5
+    assert "kp" not in cfg.env and "kv" not in cfg.env
+    assert cfg.train["obs_groups"] == {"policy": ["policy"], "critic": ["policy"]}
+    assert cfg.obs == {"num_obs": 45}
+
+
+def test_save_load_round_trip(tmp_path):
+    cfg = RunConfig(*_legacy_cfgs())
+    content_hash = cfg.save(str(tmp_path))
+    loaded = RunConfig.load(str(tmp_path))
+    assert loaded == cfg
+    assert loaded.content_hash() == content_hash
+
+
+def test_content_hash_ignores_key_order():
+    env, obs, reward, command, train = _legacy_cfgs()
+    base = RunConfig(env, obs, reward, command, train).content_hash()
+    reordered = dict(reversed(list(env.items())))
+    assert RunConfig(reordered, obs, reward, command, train).content_hash() == base
+    assert RunConfig({**env, "kp": 21.0}, obs, reward, command, train).content_hash() != base
+
+
+def test_warns_on_edited_config(tmp_path, capsys):
+    RunConfig(*_legacy_cfgs()).save(str(tmp_path))
+    path = os.path.join(tmp_path, CONFIG_FILE)
+    with open(path) as f:
+        text = f.read()
+    with open(path, "w") as f:
+        f.write(text.replace("num_actions: 12", "num_actions: 8"))
+    assert RunConfig.load(str(tmp_path)).env["num_actions"] == 8
+    assert "content hash mismatch" in capsys.readouterr().out
+
+
+def test_rejects_newer_schema():
+    env, obs, reward, command, train = _legacy_cfgs()
+    document = {"env": env, "obs": obs, "reward": reward, "command": command, "train": train}
+    with pytest.raises(ValueError):
+        RunConfig.from_dict(document, SCHEMA_VERSION + 1)
+
+
+def test_missing_config(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        RunConfig.load(str(tmp_path))
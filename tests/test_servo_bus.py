@@ -0,0 +1,113 @@
+import math
+import struct
+import time
+
+import pytest
+
+from src.servo_bus import (
+    BROADCAST_ID,
+    CENTER_TICKS,
+    INST_PING,
+    INST_SYNC_WRITE,
+    TICKS_PER_RAD,
+    BusError,
+    FakeServoBus,
+    ServoBus,
+    decode_signed,
+    encode_signed,
+    make_packet,
+    read_packet,
+)
+
+
+class _BufferTransport:
+    def __init__(self, data=b""):
+        self.data = bytearray(data)
+        self.written = []
+
+    def read(self, size):
+        chunk, self.data = bytes(self.data[:size]), self.data[size:]
+        return chunk
+
+    def write(self, data):
+        self.written.append(bytes(data))
+
+    def reset_input(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_make_packet_layout():
+    assert make_packet(1, INST_PING) == bytes([0xFF, 0xFF, 0x01, 0x02, 0x01, 0xFB])
+    packet = make_packet(3, 0x03, bytes([0x2A, 0x00, 0x08]))
+    assert packet[3] == 5 and (sum(packet[2:]) & 0xFF) == 0xFF  # checksum complements the body
+
+
+def test_read_packet_resynchronizes_on_header():
+    transport = _BufferTransport(b"\x00\xff\x12" + make_packet(7, 0, b"\x01\x02"))
+    assert read_packet(transport) == (7, 0, b"\x01\x02")
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        (b"", "timed out"),
+        (make_packet(7, 0, b"\x01\x02")[:-2], "truncated"),
+        (make_packet(7, 0, b"\x01\x02")[:-1] + b"\x00", "checksum"),
+    ],
+)
+def test_read_packet_errors(data, message):
+    with pytest.raises(BusError, match=message):
+        read_packet(_BufferTransport(data))
+
+
+@pytest.mark.parametrize("value", [0, 1, -1, 300, -32767])
+def test_signed_roundtrip(value):
+    assert decode_signed(encode_signed(value)) == value
+
+
+def test_sync_write_applies_direction_offset_and_clamp():
+    transport = _BufferTransport()
+    bus = ServoBus(transport, [1, 2, 3], directions=[1, -1, 1], offsets=[0.0, 0.5, 0.0])
+    bus.write_positions([0.1, 0.6, 100.0])
+    (packet,) = transport.written
+    servo_id, instruction, params = read_packet(_BufferTransport(packet))
+    assert (servo_id, instruction) == (BROADCAST_ID, INST_SYNC_WRITE)
+    goals = dict(struct.iter_unpack("<BH", params[2:]))
+    assert goals[1] == CENTER_TICKS + round(0.1 * TICKS_PER_RAD)
+    assert goals[2] == CENTER_TICKS - round(0.1 * TICKS_PER_RAD)
+    assert goals[3] == 4095
+
+
+def test_read_state_rejects_reply_from_wrong_servo():
+    transport = _BufferTransport(make_packet(2, 0, struct.pack("<HH", CENTER_TICKS, 0)))
+    with pytest.raises(BusError):
+        ServoBus(transport, [1]).read_state()
+
+
+@pytest.mark.parametrize("kind", ["socket", "pty"])
+def test_loopback_round_trip(kind):
+    fake = FakeServoBus([1, 2], baudrate=0, kind=kind).start()
+    try:
+        from src.servo_bus import open_transport
+
+        transport = fake.client_transport or open_transport(fake.port, 1_000_000, 0.05)
+        bus = ServoBus(transport, [1, 2], offsets=[0.2, 0.0])
+        assert bus.ping(2) and not bus.ping(9)
+        positions, velocities = bus.read_state()
+        assert positions == pytest.approx([0.2, 0.0]) and velocities == pytest.approx([0.0, 0.0])
+
+        bus.write_positions([0.2, 0.3])
+        deadline = time.perf_counter() + 2.0
+        while time.perf_counter() < deadline:
+            positions, _ = bus.read_state()
+            if positions[1] == pytest.approx(0.3, abs=2 / TICKS_PER_RAD):
+                break
+            time.sleep(0.01)
+        assert positions == pytest.approx([0.2, 0.3], abs=2 / TICKS_PER_RAD)
+        assert fake.num_sync_writes == 1 and len(fake.latencies) == 1
+        bus.close()
+    finally:
+        fake.stop()
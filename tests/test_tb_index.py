@@ -0,0 +1,107 @@
+import os
+import struct
+
+from src.tb_index import EVENT_FILE_PREFIX, RunIndex, align, best, decode_scalars, find_runs, smooth
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number, wire_type, payload):
+    key = _varint(number << 3 | wire_type)
+    if wire_type == 0:
+        return key + _varint(payload)
+    if wire_type == 2:
+        return key + _varint(len(payload)) + payload
+    return key + payload
+
+
+def _event(step, scalars):
+    # Event: step = 2, summary = 5; Summary.value = 1; Summary.Value: tag = 1, simple_value = 2
+    values = b"".join(
+        _field(1, 2, _field(1, 2, tag.encode()) + _field(2, 5, struct.pack("<f", value))) for tag, value in scalars
+    )
+    return _field(2, 0, step) + _field(5, 2, values)
+
+
+def _record(event):
+    # crcs are not checked by the reader
+    return struct.pack("<Q", len(event)) + b"\0" * 4 + event + b"\0" * 4
+
+
+def _write(path, events, mode="ab"):
+    with open(path, mode) as f:
+        for step, scalars in events:
+            f.write(_record(_event(step, scalars)))
+
+
+def test_decode_scalars():
+    step, scalars = decode_scalars(memoryview(_event(300, [("Train/mean_reward", 1.5), ("Loss/value", 0.25)])))
+    assert step == 300
+    assert scalars == [("Train/mean_reward", 1.5), ("Loss/value", 0.25)]
+
+
+def test_incremental_update(tmp_path):
+    run_dir, index_root = tmp_path / "run", str(tmp_path / "index")
+    run_dir.mkdir()
+    events = str(run_dir / (EVENT_FILE_PREFIX + "1"))
+    _write(events, [(0, [("reward", 1.0)]), (1, [("reward", 2.0), ("loss", 0.5)])])
+    index = RunIndex(str(run_dir), index_root)
+    assert index.update() == 3
+    assert index.update() == 0
+
+    # a record that is still being written is left for the next update
+    record = _record(_event(2, [("reward", 3.0)]))
+    with open(events, "ab") as f:
+        f.write(record[:10])
+    assert index.update() == 0
+    with open(events, "ab") as f:
+        f.write(record[10:])
+
+    # a fresh index picks up from the stored offsets
+    index = RunIndex(str(run_dir), index_root)
+    assert index.update() == 1
+    assert index.tags() == ["loss", "reward"]
+    assert index.num_points() == 4
+    steps, values = index.series("reward")
+    assert list(steps) == [0, 1, 2] and list(values) == [1.0, 2.0, 3.0]
+    assert [list(column) for column in index.series("missing")] == [[], []]
+
+
+def test_rewritten_file_rebuilds(tmp_path):
+    run_dir, index_root = tmp_path / "run", str(tmp_path / "index")
+    run_dir.mkdir()
+    events = str(run_dir / (EVENT_FILE_PREFIX + "1"))
+    _write(events, [(step, [("reward", float(step))]) for step in range(5)])
+    index = RunIndex(str(run_dir), index_root)
+    index.update()
+    _write(events, [(0, [("reward", 10.0)])], mode="wb")
+    assert index.update() == 1
+    steps, values = index.series("reward")
+    assert list(steps) == [0] and list(values) == [10.0]
+
+
+def test_find_runs_skips_hidden(tmp_path):
+    for name in ("a", "b/c", ".hidden", "empty"):
+        os.makedirs(tmp_path / name)
+    for name in ("a", "b/c", ".hidden"):
+        _write(str(tmp_path / name / (EVENT_FILE_PREFIX + "1")), [(0, [("reward", 1.0)])])
+    assert find_runs([str(tmp_path)]) == [str(tmp_path / "a"), str(tmp_path / "b" / "c")]
+
+
+def test_smooth_best_align():
+    assert smooth([1.0, 3.0, 5.0, 7.0], 2) == [1.0, 2.0, 4.0, 6.0]
+    assert best([0, 1, 2, 3], [1.0, 5.0, 2.0, 4.0]) == (1, 5.0)
+    assert best([0, 1, 2, 3], [1.0, 5.0, 2.0, 4.0], minimize=True) == (0, 1.0)
+    assert best([], []) is None
+    # a resumed run logs step 1 twice, the last value wins
+    assert align(([0, 1, 1, 2], [1.0, 2.0, 3.0, 4.0]), ([1, 2, 3], [5.0, 6.0, 7.0])) == [(1, 3.0, 5.0), (2, 4.0, 6.0)]
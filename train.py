@@ -1,18 +1,16 @@
 import argparse
+import math
 import os
-import pickle
 import shutil
+import time
 import yaml
 from datetime import datetime
 
-from rsl_rl.runners import OnPolicyRunner, DistillationRunner
-
 # from src.kinematics import IK
 
-import numpy as np
-import genesis as gs
+from src.run_config import RunConfig
 
-from env import ServobotEnv
+# torch, genesis and rsl_rl are imported inside main() so that --help and get_cfgs() stay fast
 
 JOINT_NAMES = [
     "fl_hip",
@@ -83,13 +81,25 @@ def get_cfgs():
         "default_joint_angles": {
             JOINT_NAMES[i]: c
             for (i, c) in enumerate(
-                [-0.2, -np.pi / 4 , 0.2, 0.0, np.pi / 4, 0.0, 0.2, -np.pi / 4, 0.0, -0.2, np.pi / 4, 0.0]
+                [-0.2, -math.pi / 4 , 0.2, 0.0, math.pi / 4, 0.0, 0.2, -math.pi / 4, 0.0, -0.2, math.pi / 4, 0.0]
             )
         },
         "joint_names": JOINT_NAMES,
         # PD
         "default_kp": 20.0,
         "default_kv": 0.5,
+        # actuator model: "pd" (Genesis ideal PD), "servo" (analytic servo model) or "net" (fitted ActuatorNet)
+        "actuator": {
+            "type": "pd",
+            "decimation": 4,  # actuator/sim steps per control step, other types than "pd" only
+            "deadband": 0.005,  # rad
+            "stall_torque": 2.0,  # N*m
+            "no_load_speed": 6.5,  # rad/s
+            "torque_constant": 0.8,  # N*m/A
+            "current_limit": 2.0,  # A
+            "network_path": None,  # TorchScript ActuatorNet for type "net", see src/actuators.py
+            "compile": False,
+        },
         # termination
         "termination_if_roll_greater_than": 45,  # degree --- WAY HIGHER NOW! RUN MY BEAUTIFUL CREATURE, RUN
         "termination_if_pitch_greater_than": 45,
@@ -100,7 +110,33 @@ def get_cfgs():
         "resampling_time_s": 4.0,
         "action_scale": 0.25,
         "simulate_action_latency": True,
+        # per-env delays in control steps, drawn uniformly in [low, high] on every reset
+        "latency": {
+            "action_delay_steps": [1, 1],
+            "obs_delay_steps": [0, 0],
+        },
         "clip_actions": 100.0,
+        # on-device episode statistics, flushed to TensorBoard every log_interval iterations
+        "episode_stats": {
+            "num_bins": 32,
+            "ranges": {},  # {reward term: [low, high]}, unlisted terms are calibrated from the first full episodes
+            "calibration_episodes": 256,
+            # refit a calibrated range when more than this fraction of a log window's episodes fall outside it
+            "recalibrate_overflow": 0.05,
+        },
+        # foot contact sensing for the feet_* rewards, the feet are the child links of these joints. Off by default,
+        # enable it together with feet_* reward scales
+        "foot_contacts": {
+            "enabled": False,
+            "foot_joint_names": ["fl_bot", "fr_bot", "bl_bot", "br_bot"],
+            "threshold": 0.2,  # N, vertical contact force
+        },
+        # trot reference for the gait_tracking reward, build the table with python -m src.gait
+        "gait": {
+            "table_path": None,
+            "period_s": 0.4,
+            "observe_phase": False,  # append sin/cos of the phase to the observation, num_obs grows by 2
+        },
         "domain_rand": {
             "kp_range": [15.0, 25.0],
             "kv_range": [0.3, 0.7],
@@ -111,17 +147,35 @@ def get_cfgs():
     }
     obs_cfg = {
         "num_obs": 45,
+        # number of stacked frames fed to the policy (1 = current frame only)
+        "history_length": 1,
         "obs_scales": {
             "lin_vel": 2.0,
             "ang_vel": 0.25,
             "dof_pos": 1.0,
             "dof_vel": 0.05,
         },
+        # uniform sensor noise in physical units, scaled per env by a level drawn on every reset
+        "noise": {
+            "add_noise": False,
+            "noise_level_range": [0.5, 1.5],
+            "noise_scales": {
+                "ang_vel": 0.2,
+                "gravity": 0.05,
+                "dof_pos": 0.01,
+                "dof_vel": 1.5,
+            },
+        },
     }
     reward_cfg = {
         "tracking_sigma": 0.25,
         "base_height_target": 0.18,
         "feet_height_target": 0.075,
+        "feet_air_time_target": 0.2,  # s
+        "feet_contact_target": 2,  # feet on the ground while moving
+        # with env_cfg["foot_contacts"]["enabled"], add e.g. "feet_air_time": 1.0, "feet_slip": -0.05 and
+        # "feet_contact_count": -0.05 scales
+        "gait_tracking_sigma": 0.25,  # rad^2, add a "gait_tracking" scale once env_cfg["gait"]["table_path"] is set
         "reward_scales": {
             "tracking_lin_vel": 1.75,
             "tracking_ang_vel": 0.75,
@@ -173,20 +227,98 @@ def main():
     )
     parser.add_argument("--view", action="store_true", help="shows view)")
     parser.add_argument("--randomize", action="store_true", help="Enable domain randomization")
+    parser.add_argument(
+        "--distributed",
+        action="store_true",
+        help="Data-parallel training, launch with torchrun. -B is the total number of envs across all ranks",
+    )
+    parser.add_argument("--backend", type=str, default="gloo", choices=["gloo", "nccl"], help="torch.distributed backend")
+    parser.add_argument("--cpu", action="store_true", help="Run the simulator and learner on CPU")
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Overlap rollout collection with the PPO update (OnPolicyRunner configs only)",
+    )
+    parser.add_argument(
+        "--auto-tune",
+        action="store_true",
+        help="Probe increasing env counts and train with the best samples/sec under --memory-ceiling (overrides -B "
+        "and num_steps_per_env, the chosen values are recorded in metadata.yaml)",
+    )
+    parser.add_argument(
+        "--memory-ceiling", type=float, default=0.8, help="Fraction of device memory --auto-tune may plan for"
+    )
+    parser.add_argument(
+        "--ckpt_store",
+        type=str,
+        default=None,
+        help="Save checkpoints into this content-addressed store (shared across runs) instead of full model_*.pt",
+    )
+    parser.add_argument("--ckpt_fp16", action="store_true", help="Also store fp16 inference-only copies")
+    parser.add_argument(
+        "--ckpt_keep_optimizer", type=int, default=1, help="Number of newest stored checkpoints keeping optimizer state"
+    )
     args = parser.parse_args()
 
-    gs.init(
-        logging_level="warning",
-    )
+    import torch
+    import genesis as gs
+    from rsl_rl.runners import OnPolicyRunner, DistillationRunner
+
+    from env import ServobotEnv
+    from src.distillation import CachedDistillationRunner
+    from src.pipeline import PipelinedOnPolicyRunner
+    from src.distributed import init_distributed, make_distributed
+    from src.episode_stats import make_episode_logging
+    from src.autotune import auto_tune
+    from src.checkpoints import checkpoint_buffer, is_pointer, load_checkpoint, make_checkpointing, resolve_checkpoint
+
+    rank, local_rank, world_size = init_distributed(args.backend) if args.distributed else (0, 0, 1)
+    if args.num_envs % world_size != 0:
+        raise ValueError(f"--num_envs {args.num_envs} must be divisible by the number of ranks ({world_size})")
+    if args.distributed and not args.cpu and torch.cuda.is_available():
+        torch.cuda.set_device(local_rank)
 
     env_cfg, obs_cfg, reward_cfg, command_cfg, symmetry_cfg = get_cfgs()
     with open(args.train_cfg, "r") as file:
         train_cfg = yaml.safe_load(file)
 
+    tune_result = None
+    if args.auto_tune:
+        if args.distributed:
+            raise ValueError("--auto-tune is not supported with --distributed, pick -B per node with a single process")
+        # keep the samples per PPO update that -B and the config's num_steps_per_env imply
+        tune_result = auto_tune(
+            env_cfg,
+            obs_cfg,
+            candidates=[512, 1024, 2048, 4096, 8192, 16384, 32768, 65536],
+            target_batch=args.num_envs * train_cfg["num_steps_per_env"],
+            memory_ceiling=args.memory_ceiling,
+            cpu=args.cpu,
+        )
+        if tune_result["num_envs"] is None:
+            raise RuntimeError("--auto-tune: no env count fits under the memory ceiling with a batch near the target")
+        args.num_envs = tune_result["num_envs"]
+        train_cfg["num_steps_per_env"] = tune_result["num_steps_per_env"]
+        print(
+            f"auto-tune: training with {args.num_envs} envs x {train_cfg['num_steps_per_env']} steps per env "
+            f"= {tune_result['batch']} samples per update (target {tune_result['target_batch']})"
+        )
+
+    # every rank simulates its own partition of the envs with its own seed
+    seed = train_cfg.get("seed", 1) + rank
+    torch.manual_seed(seed)
+    gs.init(
+        seed=seed,
+        logging_level="warning",
+        **({"backend": gs.cpu} if args.cpu else {}),
+    )
+
     exp_name = train_cfg["runner"]["experiment_name"]
 
     # Determine log directory
-    if args.save_dir:
+    if rank != 0:
+        log_dir = None
+    elif args.save_dir:
         # Use custom directory name
         log_dir = f"logs/{args.save_dir}"
     else:
@@ -200,35 +332,37 @@ def main():
         else:
             log_dir = f"logs/{exp_name}_{timestamp}"
 
-    # Create new directory (never overwrite)
-    if os.path.exists(log_dir):
-        print(f"Warning: {log_dir} already exists. Adding timestamp suffix.")
-        log_dir = f"{log_dir}_{datetime.now().strftime('%H%M%S')}"
+    # only rank 0 writes logs, configs and checkpoints
+    if rank == 0:
+        # Create new directory (never overwrite)
+        if os.path.exists(log_dir):
+            print(f"Warning: {log_dir} already exists. Adding timestamp suffix.")
+            log_dir = f"{log_dir}_{datetime.now().strftime('%H%M%S')}"
 
-    os.makedirs(log_dir, exist_ok=True)
-    print(f"Saving to: {log_dir}")
+        os.makedirs(log_dir, exist_ok=True)
+        print(f"Saving to: {log_dir}")
 
-    # Copy configs for reproducibility
-    os.makedirs(f"{log_dir}/configs", exist_ok=True)
-    shutil.copy(args.train_cfg, f"{log_dir}/configs/train.yaml")
+        # Copy configs for reproducibility
+        os.makedirs(f"{log_dir}/configs", exist_ok=True)
+        shutil.copy(args.train_cfg, f"{log_dir}/configs/train.yaml")
 
-    # Save metadata
-    metadata = {
-        "timestamp": datetime.now().isoformat(),
-        "resumed_from": args.resume,
-        "num_envs": args.num_envs,
-        "max_iterations": args.max_iterations,
-    }
-    with open(f"{log_dir}/metadata.yaml", "w") as f:
-        yaml.dump(metadata, f)
+        # Save metadata
+        metadata = {
+            "timestamp": datetime.now().isoformat(),
+            "resumed_from": args.resume,
+            "num_envs": args.num_envs,
+            "max_iterations": args.max_iterations,
+            "world_size": world_size,
+        }
+        if tune_result is not None:
+            metadata["auto_tune"] = tune_result
+        with open(f"{log_dir}/metadata.yaml", "w") as f:
+            yaml.dump(metadata, f)
 
-    pickle.dump(
-        [env_cfg, obs_cfg, reward_cfg, command_cfg, train_cfg],
-        open(f"{log_dir}/cfgs.pkl", "wb"),
-    )
+        RunConfig(env_cfg, obs_cfg, reward_cfg, command_cfg, train_cfg).save(log_dir)
 
     env = ServobotEnv(
-        num_envs=args.num_envs,
+        num_envs=args.num_envs // world_size,
         env_cfg=env_cfg,
         obs_cfg=obs_cfg,
         reward_cfg=reward_cfg,
@@ -237,15 +371,43 @@ def main():
         num_viewer_envs=1,
     )
     runner_class = eval(train_cfg.pop("runner_class_name"))
+    if args.pipelined:
+        if runner_class is not OnPolicyRunner:
+            raise ValueError(f"--pipelined needs an OnPolicyRunner config, got {runner_class.__name__}")
+        runner_class = PipelinedOnPolicyRunner
+    if runner_class in (OnPolicyRunner, DistillationRunner):
+        # the custom runners flush the env's episode statistics themselves
+        runner_class = make_episode_logging(runner_class)
+    if args.ckpt_store:
+        runner_class = make_checkpointing(runner_class, args.ckpt_store, args.ckpt_fp16, args.ckpt_keep_optimizer)
+    if args.distributed:
+        runner_class = make_distributed(runner_class)
     runner = runner_class(env, train_cfg, log_dir, device=gs.device)
 
     # Load checkpoint if resuming
     if args.resume:
-        print(f"Loading checkpoint from: {args.resume}")
-        runner.load(args.resume)
+        resume_path = resolve_checkpoint(args.resume)
+        print(f"Loading checkpoint from: {resume_path}")
+        if is_pointer(resume_path):
+            # older stored checkpoints may have had their optimizer state pruned
+            checkpoint = load_checkpoint(resume_path)
+            runner.load(checkpoint_buffer(checkpoint), load_optimizer="optimizer_state_dict" in checkpoint)
+        else:
+            runner.load(resume_path)
 
+    start = time.perf_counter()
     runner.learn(num_learning_iterations=args.max_iterations, init_at_random_ep_len=True)
-    print("=" * 60, "\n Training complete! \n Saved robot policy to:", log_dir, "\n", "=" * 60)
+    elapsed = time.perf_counter() - start
+
+    if rank == 0:
+        # record achieved throughput, used by benchmark.py to compare training modes
+        metadata["throughput"] = {
+            "samples_per_sec": args.num_envs * train_cfg["num_steps_per_env"] * args.max_iterations / elapsed,
+            "iterations_per_hour": args.max_iterations / elapsed * 3600,
+        }
+        with open(f"{log_dir}/metadata.yaml", "w") as f:
+            yaml.dump(metadata, f)
+        print("=" * 60, "\n Training complete! \n Saved robot policy to:", log_dir, "\n", "=" * 60)
 
 
 if __name__ == "__main__":